@@ -0,0 +1,90 @@
+"""Compare the pytz and zoneinfo timezone backends on the same work.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_backends
+
+In the suite run by benchmarks.run, each case times zoneinfo, with pytz as
+its baseline: a slowdown under 1 means zoneinfo is faster.
+"""
+import datetime
+import random
+
+import saturn
+from benchmarks.suite import case, ops_per_sec
+
+ZONES = ['US/Eastern', 'Europe/Berlin', 'Australia/Sydney', 'Asia/Kolkata', 'America/Sao_Paulo', 'UTC']
+N = 1000
+
+_rng = random.Random(0)
+_NAIVES = [datetime.datetime(2000, 1, 1) + datetime.timedelta(seconds=_rng.randrange(10 ** 9)) for _ in range(N)]
+_TZS = [_rng.choice(ZONES) for _ in range(N)]
+
+
+def _with_backend(backend, work):
+    """A setup function running work, a function of pre-built inputs, under backend."""
+    def setup():
+        with saturn.tz_backend(backend):
+            saturn.warm_timezones(ZONES)
+            run = work()
+
+        def timed():
+            with saturn.tz_backend(backend):
+                return run()
+        return timed
+    return setup
+
+
+def _datetime():
+    fields = [(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, tz) for dt, tz in zip(_NAIVES, _TZS)]
+    return lambda: [saturn.datetime(y, mo, d, h, mi, s, tz=tz) for y, mo, d, h, mi, s, tz in fields]
+
+
+def _fix_naive():
+    return lambda: [saturn.fix_naive(dt, tz) for dt, tz in zip(_NAIVES, _TZS)]
+
+
+def _move_tz():
+    dts = [saturn.fix_naive(dt) for dt in _NAIVES]
+    return lambda: [saturn.move_tz(dt, tz) for dt, tz in zip(dts, _TZS)]
+
+
+def _add():
+    dts = [saturn.fix_naive(dt, tz) for dt, tz in zip(_NAIVES, _TZS)]
+    return lambda: [saturn.add(dt, hours=36) for dt in dts]
+
+
+def _range_dt():
+    start, end = saturn.datetime(2018, 1, 1, tz='US/Eastern'), saturn.datetime(2019, 1, 1, tz='US/Eastern')
+    return lambda: list(saturn.range_dt(start, end, interval='hour'))
+
+
+WORK = [('datetime', _datetime, N), ('fix_naive', _fix_naive, N), ('move_tz', _move_tz, N),
+        ('add', _add, N), ('range_dt', _range_dt, 8760)]
+
+for _name, _work, _ops in WORK:
+    case('{0}_zoneinfo'.format(_name), covers=[_name, 'tz_backend', 'set_tz_backend', 'get_tz_backend'],
+         baseline=_with_backend('pytz', _work), ops=_ops)(_with_backend('zoneinfo', _work))
+
+
+def _set_tz_backend():
+    """set_tz_backend and get_tz_backend themselves."""
+    def run():
+        saturn.set_tz_backend('zoneinfo')
+        saturn.set_tz_backend('pytz')
+        return saturn.get_tz_backend()
+    return run
+
+
+case('set_tz_backend', covers=['set_tz_backend', 'get_tz_backend'])(_set_tz_backend)
+
+
+def main():
+    print('{0:<12}{1:>16}{2:>16}{3:>10}'.format('function', 'pytz ops/s', 'zoneinfo ops/s', 'speedup'))
+    for name, work, ops in WORK:
+        rates = [ops_per_sec(_with_backend(backend, work)(), ops) for backend in ('pytz', 'zoneinfo')]
+        print('{0:<12}{1:>16,.0f}{2:>16,.0f}{3:>9.1f}x'.format(name, rates[0], rates[1], rates[1] / rates[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Time `import saturn` with python -X importtime, in fresh interpreters.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import
+
+pytz and saturn.from_arrow load on first use, so they shouldn't show up here.
+The import is also part of the suite run by benchmarks.run.
+"""
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from benchmarks.suite import case
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code: str, importtime: bool=False) -> str:
+    flags = ['-X', 'importtime'] if importtime else []
+    return subprocess.run([sys.executable] + flags + ['-c', code], cwd=ROOT, check=True,
+                          stderr=subprocess.PIPE, universal_newlines=True).stderr
+
+
+def import_times(module: str='saturn') -> Dict[str, Tuple[int, int]]:
+    """Self and cumulative microseconds spent importing each module, when
+    importing module."""
+    times = {}
+    for line in _run('import ' + module, importtime=True).splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_us), int(cumulative_us)
+    return times
+
+
+def median_import_us(module: str='saturn', runs: int=20) -> float:
+    return statistics.median(import_times(module)[module][1] for _ in range(runs))
+
+
+def _interpreter(code: str):
+    return lambda: _run(code)
+
+
+@case('import', covers=[], baseline=lambda: _interpreter('import datetime'))
+def _import():
+    """A fresh interpreter importing saturn, against one importing datetime."""
+    return _interpreter('import saturn')
+
+
+def main(runs: int=20, top: int=15):
+    if os.environ.get('PYTHONDONTWRITEBYTECODE'):
+        print('PYTHONDONTWRITEBYTECODE is set, so modules are compiled on every import.\n')
+    print('import saturn: {0:,.0f} us, median of {1} runs\n'.format(median_import_us('saturn', runs), runs))
+    times: List[Tuple[str, Tuple[int, int]]] = sorted(import_times('saturn').items(), key=lambda item: -item[1][0])
+    print('{0:<32}{1:>10}{2:>14}'.format('module', 'self us', 'cumulative us'))
+    for name, (self_us, cumulative_us) in times[:top]:
+        print('{0:<32}{1:>10,}{2:>14,}'.format(name, self_us, cumulative_us))
+    for lazy in ('pytz', 'saturn.from_arrow'):
+        if lazy in dict(times):
+            print('\n{0} was imported eagerly.'.format(lazy))
+
+
+if __name__ == '__main__':
+    main()
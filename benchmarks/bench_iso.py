@@ -0,0 +1,49 @@
+"""Compare from_iso's fixed-position scanner with the general, multi-format ISO parser.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_iso
+
+The comparison is also part of the suite run by benchmarks.run.
+"""
+import timeit
+
+from benchmarks.suite import case
+from saturn import from_arrow
+
+SAMPLES = [
+    '2016-04-29',
+    '2016-04-29T20:12',
+    '2016-04-29T20:12:05',
+    '2016-04-29 20:12:05',
+    '2016-04-29T20:12:05.807558',
+    '2016-04-29T20:12:05.807558+00:00',
+    '2016-04-29T20:12:05-05:00',
+    '2016-04-29T20:12:05Z',
+]
+
+
+def _parse_iso_general():
+    return lambda: [from_arrow.parse_iso_general(iso_str) for iso_str in SAMPLES]
+
+
+@case('from_iso_scanner', covers=['from_iso'], baseline=_parse_iso_general, ops=len(SAMPLES))
+def _parse_iso():
+    return lambda: [from_arrow.parse_iso(iso_str) for iso_str in SAMPLES]
+
+
+def best_of(func, number, repeat=5):
+    """Best time per call, in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def main(number=20000):
+    print('{0:<36}{1:>12}{2:>12}{3:>10}'.format('input', 'general us', 'fast us', 'speedup'))
+    for iso_str in SAMPLES:
+        general = best_of(lambda: from_arrow.parse_iso_general(iso_str), number)
+        fast = best_of(lambda: from_arrow.parse_iso(iso_str), number)
+        print('{0:<36}{1:>12.2f}{2:>12.2f}{3:>9.1f}x'.format(iso_str, general, fast, general / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,625 @@
+"""Benchmarks of saturn's exports, with datetime and pytz baselines doing the
+same work directly."""
+import datetime
+import io
+import random
+import time
+from array import array
+
+import pytz
+
+import saturn
+from benchmarks.suite import case
+
+_rng = random.Random(0)
+
+# A spread of zones: with and without DST, north and south, fixed offsets.
+ZONES = pytz.common_timezones[::20] + ['UTC', 'US/Eastern', 'Europe/Berlin', 'Australia/Sydney', 'Asia/Kolkata']
+
+# saturn format, strftime equivalent, sample.
+FORMATS = [
+    ('YYYY-MM-DD HH:mm:ss', '%Y-%m-%d %H:%M:%S', '2016-04-29 20:12:05'),
+    ('DD/MM/YYYY', '%d/%m/%Y', '29/04/2016'),
+    ('MMMM DD, YYYY hh:mm A', '%B %d, %Y %I:%M %p', 'April 29, 2016 08:12 PM'),
+    ('YYYY-MM-DDTHH:mm:ssZ', '%Y-%m-%dT%H:%M:%S%z', '2016-04-29T20:12:05-0500'),
+    ('YYYYMMDDHHmmss', '%Y%m%d%H%M%S', '20160429201205'),
+]
+
+N = 1000
+
+
+def _datetimes(n=N, tz='UTC'):
+    start = saturn.datetime(2010, 1, 1, tz=tz)
+    return [start + datetime.timedelta(seconds=_rng.randrange(10 ** 9)) for _ in range(n)]
+
+
+def _strings(fmt, n=N):
+    return [saturn.to_str(dt, fmt) for dt in _datetimes(n)]
+
+
+def _epochs_us(n=10000):
+    return [_rng.randrange(0, 2 * 10 ** 15) for _ in range(n)]
+
+
+# Construction
+
+def _datetime_baseline():
+    tz = pytz.timezone('US/Eastern')
+    return lambda: tz.localize(datetime.datetime(2016, 1, 1, 16, 9, 30))
+
+
+@case('datetime', baseline=_datetime_baseline)
+def _datetime():
+    return lambda: saturn.datetime(2016, 1, 1, 16, 9, 30, tz='US/Eastern')
+
+
+@case('time', baseline=lambda: lambda: datetime.time(16, 9, 30, tzinfo=pytz.utc))
+def _time():
+    return lambda: saturn.time(16, 9, 30)
+
+
+@case('combine', baseline=lambda: lambda: pytz.utc.localize(
+    datetime.datetime.combine(datetime.date(2016, 1, 1), datetime.time(9))))
+def _combine():
+    date_, time_ = saturn.date(2016, 1, 1), saturn.time(9)
+    return lambda: saturn.combine(date_, time_)
+
+
+def _now_baseline():
+    return lambda: datetime.datetime.now(pytz.utc)
+
+
+def _now_many_baseline():
+    now, utc = datetime.datetime.now, pytz.utc
+    return lambda: [now(utc) for _ in range(N)]
+
+
+@case('now', baseline=_now_baseline)
+def _now():
+    return saturn.now
+
+
+@case('now_us', covers=['now_us', 'now_ns', 'SystemClock', 'Clock', 'get_clock'],
+      baseline=lambda: lambda: time.time_ns() // 1000)
+def _now_us():
+    return saturn.now_us
+
+
+@case('CoarseClock', covers=['CoarseClock', 'set_clock'], baseline=_now_many_baseline, ops=N)
+def _coarse_clock():
+    clock = saturn.CoarseClock(granularity=0.01)
+
+    def run():
+        saturn.set_clock(clock)
+        try:
+            return [saturn.now() for _ in range(N)]
+        finally:
+            saturn.set_clock(None)
+    return run
+
+
+@case('MonotonicClock', covers=['MonotonicClock', 'using_clock'], baseline=_now_many_baseline, ops=N)
+def _monotonic_clock():
+    clock = saturn.MonotonicClock()
+
+    def run():
+        with saturn.using_clock(clock):
+            return [saturn.now() for _ in range(N)]
+    return run
+
+
+@case('FrozenClock', ops=N)
+def _frozen_clock():
+    clock = saturn.FrozenClock(saturn.datetime(2016, 4, 29))
+
+    def run():
+        with saturn.using_clock(clock):
+            for _ in range(N):
+                clock.advance(seconds=1)
+                saturn.now_us()
+    return run
+
+
+@case('today', covers=['today', 'date', 'timedelta'], baseline=lambda: datetime.date.today)
+def _today():
+    return lambda: saturn.today() - saturn.timedelta(days=1) + saturn.timedelta(days=1)
+
+
+def _fix_naive_baseline():
+    tz = pytz.timezone('US/Eastern')
+    naive = datetime.datetime(2016, 1, 1, 9)
+    return lambda: tz.localize(naive)
+
+
+@case('fix_naive', baseline=_fix_naive_baseline)
+def _fix_naive():
+    naive = datetime.datetime(2016, 1, 1, 9)
+    return lambda: saturn.fix_naive(naive, 'US/Eastern')
+
+
+@case('split', baseline=lambda: lambda: (lambda dt: (dt.date(), dt.timetz()))(saturn.datetime(2016, 1, 1)))
+def _split():
+    return lambda: saturn.split(saturn.datetime(2016, 1, 1))
+
+
+# Timezones
+
+def _timezone_baseline():
+    return lambda: [pytz.timezone(zone) for zone in ZONES]
+
+
+@case('timezone', covers=['timezone', 'warm_timezones'], baseline=_timezone_baseline, ops=len(ZONES))
+def _timezone():
+    saturn.warm_timezones(ZONES)
+    return lambda: [saturn.timezone(zone) for zone in ZONES]
+
+
+def _move_tz_baseline():
+    dts = _datetimes()
+    zones = [pytz.timezone(_rng.choice(ZONES)) for _ in dts]
+    return lambda: [dt.astimezone(tz) for dt, tz in zip(dts, zones)]
+
+
+@case('move_tz', baseline=_move_tz_baseline, ops=N)
+def _move_tz():
+    dts = _datetimes()
+    zones = [_rng.choice(ZONES) for _ in dts]
+    return lambda: [saturn.move_tz(dt, tz) for dt, tz in zip(dts, zones)]
+
+
+def _move_tz_many_baseline():
+    tz = pytz.timezone('US/Eastern')
+    epochs = _epochs_us()
+    return lambda: [datetime.datetime.fromtimestamp(e / 10 ** 6, tz) for e in epochs]
+
+
+@case('move_tz_many', baseline=_move_tz_many_baseline, ops=10000)
+def _move_tz_many():
+    epochs = _epochs_us()
+    return lambda: saturn.move_tz_many(epochs, 'US/Eastern')
+
+
+def _localize_many_baseline():
+    tz = pytz.timezone('US/Eastern')
+    naives = [datetime.datetime(1970, 1, 1) + datetime.timedelta(microseconds=e) for e in _epochs_us()]
+    return lambda: [tz.localize(dt) for dt in naives]
+
+
+@case('localize_many', baseline=_localize_many_baseline, ops=10000)
+def _localize_many():
+    epochs = _epochs_us()
+    return lambda: saturn.localize_many(epochs, 'US/Eastern')
+
+
+# Formatting and parsing
+
+def _to_str_baseline():
+    dts = _datetimes()
+    return lambda: [dt.strftime(fmt) for _, fmt, _ in FORMATS for dt in dts]
+
+
+@case('to_str', baseline=_to_str_baseline, ops=N * len(FORMATS))
+def _to_str():
+    dts = _datetimes()
+    return lambda: [saturn.to_str(dt, fmt) for fmt, _, _ in FORMATS for dt in dts]
+
+
+@case('compile_formatter', baseline=_to_str_baseline, ops=N * len(FORMATS))
+def _compile_formatter():
+    dts = _datetimes()
+    formatters = [saturn.compile_formatter(fmt) for fmt, _, _ in FORMATS]
+    return lambda: [formatter.format(dt) for formatter in formatters for dt in dts]
+
+
+def _sorted_log_times():
+    start = saturn.datetime(2016, 1, 1)
+    return [start + datetime.timedelta(seconds=7 * i) for i in range(N)]
+
+
+def _write_formatted_baseline():
+    dts = _sorted_log_times()
+    return lambda: io.StringIO().write(''.join(dt.strftime('%Y-%m-%d %H:%M:%S') + '\n' for dt in dts))
+
+
+@case('write_formatted', baseline=_write_formatted_baseline, ops=N)
+def _write_formatted():
+    dts = _sorted_log_times()
+    return lambda: saturn.write_formatted(dts, 'YYYY-MM-DD HH:mm:ss', io.StringIO())
+
+
+@case('write_formatted_epoch_us', covers=['write_formatted'], baseline=_write_formatted_baseline, ops=N)
+def _write_formatted_epoch_us():
+    epochs = saturn.to_epoch_us_many(_sorted_log_times())
+    return lambda: saturn.write_formatted(epochs, 'YYYY-MM-DD HH:mm:ss', io.StringIO())
+
+
+def _from_str_baseline():
+    samples = [(strftime_fmt, s) for fmt, strftime_fmt, _ in FORMATS for s in
+               [dt.strftime(strftime_fmt) for dt in _datetimes(N // len(FORMATS))]]
+    strptime = datetime.datetime.strptime
+    return lambda: [strptime(s, fmt) for fmt, s in samples]
+
+
+def _from_str_samples():
+    return [(fmt, s) for fmt, _, _ in FORMATS for s in _strings(fmt, N // len(FORMATS))]
+
+
+@case('from_str', baseline=_from_str_baseline, ops=N)
+def _from_str():
+    samples = _from_str_samples()
+    return lambda: [saturn.from_str(s, fmt) for fmt, s in samples]
+
+
+@case('compile_format', covers=['compile_format', 'CompiledFormat'], baseline=_from_str_baseline, ops=N)
+def _compile_format():
+    samples = [(saturn.compile_format(fmt), s) for fmt, s in _from_str_samples()]
+    return lambda: [compiled.from_str(s) for compiled, s in samples]
+
+
+@case('compile_format_multiple', covers=['compile_format', 'CompiledFormat'], ops=N)
+def _compile_format_multiple():
+    compiled = saturn.compile_format([fmt for fmt, _, _ in FORMATS])
+    samples = [s for _, s in _from_str_samples()]
+    return lambda: [compiled.from_str(s) for s in samples]
+
+
+LOCALE_FORMAT = 'dddd D MMMM YYYY HH:mm'
+
+
+@case('locale_round_trip', covers=['get_locale'], ops=N * 2)
+def _locale_round_trip():
+    dts = _datetimes()
+    locales = [saturn.get_locale(name) for name in ('fr', 'de', 'es')]
+    formatters = [saturn.compile_formatter(LOCALE_FORMAT, locale) for locale in locales]
+    parsers = [saturn.compile_format(LOCALE_FORMAT, locale) for locale in locales]
+    samples = [(parsers[i % 3], formatters[i % 3].format(dt)) for i, dt in enumerate(dts)]
+    return lambda: ([formatters[i % 3].format(dt) for i, dt in enumerate(dts)],
+                    [parser.from_str(s) for parser, s in samples])
+
+
+def _from_str_many_baseline():
+    strings = [dt.strftime('%Y-%m-%d %H:%M:%S') for dt in _datetimes()]
+    strptime = datetime.datetime.strptime
+    return lambda: [pytz.utc.localize(strptime(s, '%Y-%m-%d %H:%M:%S')) for s in strings]
+
+
+@case('from_str_many', baseline=_from_str_many_baseline, ops=N)
+def _from_str_many():
+    strings = _strings('YYYY-MM-DD HH:mm:ss')
+    return lambda: saturn.from_str_many(strings, 'YYYY-MM-DD HH:mm:ss')
+
+
+@case('from_str_many_epoch_us', covers=['from_str_many'], baseline=_from_str_many_baseline, ops=N)
+def _from_str_many_epoch_us():
+    strings = _strings('YYYY-MM-DD HH:mm:ss')
+    return lambda: saturn.from_str_many(strings, 'YYYY-MM-DD HH:mm:ss', out='epoch_us')
+
+
+def _log_lines():
+    return ''.join('{0} INFO request handled\n'.format(s) for s in _strings('YYYY-MM-DD HH:mm:ss')).encode()
+
+
+def _iter_parse_file_baseline():
+    data = _log_lines()
+    strptime = datetime.datetime.strptime
+
+    def parse():
+        return [pytz.utc.localize(strptime(line[:19].decode(), '%Y-%m-%d %H:%M:%S')) for line in io.BytesIO(data)]
+    return parse
+
+
+@case('iter_parse_file', baseline=_iter_parse_file_baseline, ops=N)
+def _iter_parse_file():
+    data = _log_lines()
+    return lambda: list(saturn.iter_parse_file(io.BytesIO(data), 'YYYY-MM-DD HH:mm:ss'))
+
+
+@case('infer_format', ops=1)
+def _infer_format():
+    samples = _strings('DD/MM/YYYY', 100)
+    return lambda: saturn.infer_format(samples)
+
+
+@case('clear_caches', covers=['clear_caches', 'cache_info'], baseline=_from_str_baseline, ops=N)
+def _clear_caches():
+    """from_str from cold caches: each format is compiled again."""
+    samples = _from_str_samples()
+
+    def run():
+        saturn.clear_caches()
+        result = [saturn.from_str(s, fmt) for fmt, s in samples]
+        saturn.cache_info()
+        return result
+    return run
+
+
+def _to_iso_baseline():
+    dts = _datetimes()
+    return lambda: [dt.isoformat() for dt in dts]
+
+
+@case('to_iso', baseline=_to_iso_baseline, ops=N)
+def _to_iso():
+    dts = _datetimes()
+    return lambda: [saturn.to_iso(dt) for dt in dts]
+
+
+def _from_iso_baseline():
+    strings = [dt.isoformat() for dt in _datetimes()]
+    return lambda: [datetime.datetime.fromisoformat(s) for s in strings]
+
+
+@case('from_iso', baseline=_from_iso_baseline, ops=N)
+def _from_iso():
+    strings = [dt.isoformat() for dt in _datetimes()]
+    return lambda: [saturn.from_iso(s) for s in strings]
+
+
+# Epochs
+
+def _to_epoch_baseline():
+    dts = _datetimes()
+    return lambda: [dt.timestamp() for dt in dts]
+
+
+@case('to_epoch', baseline=_to_epoch_baseline, ops=N)
+def _to_epoch():
+    dts = _datetimes()
+    return lambda: [saturn.to_epoch(dt) for dt in dts]
+
+
+def _from_epoch_baseline():
+    epochs = [e / 10 ** 6 for e in _epochs_us(N)]
+    return lambda: [datetime.datetime.fromtimestamp(e, pytz.utc) for e in epochs]
+
+
+@case('from_epoch', baseline=_from_epoch_baseline, ops=N)
+def _from_epoch():
+    epochs = [e / 10 ** 6 for e in _epochs_us(N)]
+    return lambda: [saturn.from_epoch(e) for e in epochs]
+
+
+def _to_epoch_us_baseline():
+    dts = _datetimes()
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+    return lambda: [(dt - epoch) // datetime.timedelta(microseconds=1) for dt in dts]
+
+
+@case('to_epoch_us', covers=['to_epoch_us', 'to_epoch_ns'], baseline=_to_epoch_us_baseline, ops=N)
+def _to_epoch_us():
+    dts = _datetimes()
+    return lambda: [saturn.to_epoch_us(dt) for dt in dts]
+
+
+@case('to_epoch_us_many', baseline=_to_epoch_us_baseline, ops=N)
+def _to_epoch_us_many():
+    dts = _datetimes()
+    return lambda: saturn.to_epoch_us_many(dts)
+
+
+def _from_epoch_us_baseline():
+    epochs = _epochs_us(N)
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+    return lambda: [epoch + datetime.timedelta(microseconds=e) for e in epochs]
+
+
+@case('from_epoch_us', baseline=_from_epoch_us_baseline, ops=N)
+def _from_epoch_us():
+    epochs = _epochs_us(N)
+    return lambda: [saturn.from_epoch_us(e) for e in epochs]
+
+
+@case('from_epoch_us_many', baseline=_from_epoch_us_baseline, ops=N)
+def _from_epoch_us_many():
+    epochs = array('q', _epochs_us(N))
+    return lambda: saturn.from_epoch_us_many(epochs)
+
+
+# Arithmetic
+
+def _add_baseline():
+    dts = _datetimes()
+    return lambda: [dt + datetime.timedelta(days=1, hours=2) - datetime.timedelta(minutes=3) for dt in dts]
+
+
+@case('add', covers=['add', 'subtract'], baseline=_add_baseline, ops=N)
+def _add():
+    dts = _datetimes()
+    return lambda: [saturn.subtract(saturn.add(dt, days=1, hours=2), minutes=3) for dt in dts]
+
+
+# Ranges
+
+_WEEK = (saturn.datetime(2018, 1, 1), saturn.datetime(2018, 1, 8))
+_MINUTES_IN_WEEK = 7 * 24 * 60
+
+
+def _range_baseline():
+    start, end = _WEEK
+    step = datetime.timedelta(minutes=1)
+
+    def run():
+        result, dt = [], start
+        while dt < end:
+            result.append(dt)
+            dt += step
+        return result
+    return run
+
+
+@case('range_dt', covers=['range_dt', 'DatetimeRange'], baseline=_range_baseline, ops=_MINUTES_IN_WEEK)
+def _range_dt():
+    return lambda: list(saturn.range_dt(*_WEEK, interval='minute'))
+
+
+def _range_wall_clock_baseline():
+    tz = pytz.timezone('US/Eastern')
+    start = datetime.datetime(2018, 1, 1)
+    return lambda: [tz.localize(start + datetime.timedelta(days=i)) for i in range(3650)]
+
+
+@case('range_dt_wall_clock', covers=['range_dt', 'DatetimeRange'], baseline=_range_wall_clock_baseline, ops=3650)
+def _range_dt_wall_clock():
+    start, end = saturn.datetime(2018, 1, 1, tz='US/Eastern'), saturn.datetime(2027, 12, 30, tz='US/Eastern')
+    return lambda: list(saturn.range_dt(start, end, wall_clock=True))
+
+
+@case('range_dt_lookup', covers=['range_dt', 'DatetimeRange'], ops=N)
+def _range_dt_lookup():
+    dt_range = saturn.range_dt(saturn.datetime(2000, 1, 1), saturn.datetime(2030, 1, 1), interval='minute')
+    probes = _datetimes()
+    return lambda: [dt in dt_range for dt in probes]
+
+
+@case('range_array', baseline=_range_baseline, ops=_MINUTES_IN_WEEK)
+def _range_array():
+    return lambda: saturn.range_array(*_WEEK, interval='minute', out='epoch_us')
+
+
+# Intervals
+
+def _windows(n):
+    windows = []
+    for start in _datetimes(n):
+        windows.append((start, start + datetime.timedelta(hours=_rng.randrange(1, 48))))
+    return windows
+
+
+def _overlaps_baseline():
+    bookings, queries = _windows(10000), _windows(10)
+    return lambda: [[b for b in bookings if b[0] <= end and b[1] >= start] for start, end in queries]
+
+
+@case('overlaps', baseline=_overlaps_baseline, ops=10)
+def _overlaps():
+    """Overlap queries against 10000 ranges, by scanning with overlaps."""
+    bookings, queries = _windows(10000), _windows(10)
+    return lambda: [[b for b in bookings if saturn.overlaps(b[0], b[1], start, end)] for start, end in queries]
+
+
+@case('IntervalIndex', baseline=_overlaps_baseline, ops=10)
+def _interval_index():
+    index, queries = saturn.IntervalIndex(_windows(10000)), _windows(10)
+    return lambda: [index.overlapping(start, end) for start, end in queries]
+
+
+@case('IntervalIndex_build', covers=['IntervalIndex'], ops=10000)
+def _interval_index_build():
+    windows = _windows(10000)
+    return lambda: saturn.IntervalIndex(windows)
+
+
+@case('IntervalIndex_insert_remove', covers=['IntervalIndex'], ops=2000)
+def _interval_index_insert_remove():
+    index, windows = saturn.IntervalIndex(_windows(10000)), _windows(1000)
+
+    def run():
+        for start, end in windows:
+            index.insert(start, end)
+        for start, end in windows:
+            index.remove(start, end)
+    return run
+
+
+@case('IntervalSet', ops=3)
+def _interval_set():
+    """Union, intersection and difference of 1000-range sets."""
+    a, b = saturn.IntervalSet(_windows(1000)), saturn.IntervalSet(_windows(1000))
+    return lambda: (a | b, a & b, a - b)
+
+
+# Datetime arrays
+
+def _datetime_array_add_baseline():
+    dts, hour = _datetimes(10000), datetime.timedelta(hours=1)
+    return lambda: [dt + hour for dt in dts]
+
+
+@case('DatetimeArray', baseline=_datetime_array_add_baseline, ops=10000)
+def _datetime_array_add():
+    array = saturn.DatetimeArray.from_datetimes(_datetimes(10000))
+    return lambda: array.add(hours=1)
+
+
+@case('DatetimeArray_searchsorted', covers=['DatetimeArray'], ops=N)
+def _datetime_array_searchsorted():
+    array, queries = saturn.DatetimeArray.from_datetimes(_datetimes(10000)).sort(), _datetimes()
+    return lambda: array.searchsorted(queries)
+
+
+@case('DatetimeArray_iterate', covers=['DatetimeArray'], ops=10000)
+def _datetime_array_iterate():
+    array = saturn.DatetimeArray.from_datetimes(_datetimes(10000)).move_tz('US/Eastern')
+    return lambda: list(array)
+
+
+# Validation policy: the cost of the awareness check wrappers.
+
+def _unwrapped_baseline():
+    dts = _datetimes()
+    to_iso = saturn.to_iso.__wrapped__
+    return lambda: [to_iso(dt) for dt in dts]
+
+
+@case('validation_strict', covers=['to_iso', 'validation_stats', 'reset_validation_stats'],
+      baseline=_unwrapped_baseline, ops=N)
+def _validation_strict():
+    dts = _datetimes()
+
+    def run():
+        result = [saturn.to_iso(dt) for dt in dts]
+        saturn.validation_stats()
+        saturn.reset_validation_stats()
+        return result
+    return run
+
+
+@case('set_validation', baseline=_unwrapped_baseline, ops=N)
+def _set_validation():
+    dts = _datetimes()
+
+    def run():
+        saturn.set_validation('sampled', every=100)
+        try:
+            return [saturn.to_iso(dt) for dt in dts]
+        finally:
+            saturn.set_validation('strict')
+    return run
+
+
+@case('validation_policy', baseline=_unwrapped_baseline, ops=N)
+def _validation_policy():
+    dts = _datetimes()
+
+    def run():
+        with saturn.validation_policy('off'):
+            return [saturn.to_iso(dt) for dt in dts]
+    return run
+
+
+@case('with_validation', baseline=_unwrapped_baseline, ops=N)
+def _with_validation():
+    dts = _datetimes()
+    unchecked = saturn.with_validation('off')
+    return lambda: [unchecked.to_iso(dt) for dt in dts]
+
+
+# Instrumentation
+
+@case('instrumentation', covers=['enable_instrumentation', 'disable_instrumentation', 'instrumentation_enabled',
+                                 'stats', 'reset_stats', 'stats_prometheus', 'to_iso'],
+      baseline=_to_iso_baseline, ops=N)
+def _instrumentation():
+    """to_iso while recording, and reading the results."""
+    dts = _datetimes()
+
+    def run():
+        saturn.enable_instrumentation()
+        try:
+            result = [saturn.to_iso(dt) for dt in dts]
+        finally:
+            saturn.disable_instrumentation()
+        saturn.stats_prometheus()
+        saturn.reset_stats()
+        return result
+    return run
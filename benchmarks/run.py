@@ -0,0 +1,103 @@
+"""Run the benchmark suite. From the repository root:
+
+    python -m benchmarks.run                            # Print results.
+    python -m benchmarks.run --output results.json      # Save them.
+    python -m benchmarks.run --compare results.json     # Fail on regressions.
+
+Every export of saturn/__init__.py must be covered by a case; the run fails
+otherwise. New benchmark modules go in MODULES.
+
+Rates are compared with the saved run's. Cases with a baseline compare their
+slowdown relative to it instead, which holds up better across machines. A case
+regresses if it's slower by more than its threshold: --threshold, unless the
+case sets its own.
+"""
+import argparse
+import importlib
+import json
+import platform
+import sys
+from typing import Dict, List
+
+from benchmarks import suite
+
+MODULES = ['benchmarks.cases', 'benchmarks.bench_iso', 'benchmarks.bench_import', 'benchmarks.bench_backends']
+
+DEFAULT_THRESHOLD = 0.25
+
+
+def load() -> List[suite.Case]:
+    for module in MODULES:
+        importlib.import_module(module)
+    return suite.CASES
+
+
+def regressions(results: Dict[str, dict], saved: Dict[str, dict], cases: List[suite.Case],
+                threshold: float) -> List[str]:
+    """Descriptions of cases that got slower than saved by more than their threshold."""
+    found = []
+    for c in cases:
+        new, old = results.get(c.name), saved.get(c.name)
+        if new is None or old is None:
+            continue
+        if 'slowdown' in new and 'slowdown' in old:
+            change = new['slowdown'] / old['slowdown'] - 1
+        else:
+            change = old['ops_per_sec'] / new['ops_per_sec'] - 1
+        limit = threshold if c.threshold is None else c.threshold
+        if change > limit:
+            found.append('{0}: {1:.0%} slower (threshold {2:.0%})'.format(c.name, change, limit))
+    return found
+
+
+def report(name: str, result: dict) -> str:
+    line = '{0:<32}{1:>14,.0f}{2:>12,.0f}'.format(name, result['ops_per_sec'], result['peak_bytes_per_op'])
+    if 'slowdown' in result:
+        line += '{0:>14,.0f}{1:>10.2f}x'.format(result['baseline_ops_per_sec'], result['slowdown'])
+    return line
+
+
+def main(argv: List[str]=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help="Save results to this JSON file.")
+    parser.add_argument('--compare', help="Fail if slower than the results in this JSON file.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown, as a fraction. Default {0}.".format(DEFAULT_THRESHOLD))
+    parser.add_argument('--filter', default='', help="Only run cases whose names contain this.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds per timing run.")
+    args = parser.parse_args(argv)
+
+    cases = load()
+    missing = suite.uncovered(cases)
+    if missing:
+        print('No benchmark covers: ' + ', '.join(missing), file=sys.stderr)
+        return 1
+
+    selected = [c for c in cases if args.filter in c.name]
+    print('{0:<32}{1:>14}{2:>12}{3:>14}{4:>11}'.format('case', 'ops/sec', 'peak B/op', 'baseline', 'slowdown'))
+    results = {}
+    for c in selected:
+        results[c.name] = suite.measure(c, args.repeat, args.min_time)
+        print(report(c.name, results[c.name]), flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'cases': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            saved = json.load(f)['cases']
+        found = regressions(results, saved, selected, args.threshold)
+        if found:
+            print('\nRegressions:\n  ' + '\n  '.join(found), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
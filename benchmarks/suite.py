@@ -0,0 +1,91 @@
+"""The benchmark registry and measurement. Benchmark modules register cases with
+the case decorator; run.py measures them.
+
+A case's setup function builds its inputs and returns a function to time. Each
+call of that function does `ops` operations; results are reported per operation.
+A case can name a baseline setup function, doing the same work with datetime and
+pytz directly, to compare against."""
+import gc
+import timeit
+import tracemalloc
+from types import ModuleType
+from typing import Callable, Dict, List, NamedTuple, Sequence
+
+Setup = Callable[[], Callable[[], object]]
+
+
+class Case(NamedTuple):
+    name: str
+    covers: Sequence[str]  # The saturn exports this case exercises.
+    setup: Setup
+    baseline: Setup = None
+    ops: int = 1
+    threshold: float = None  # Overrides the runner's regression threshold.
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, covers: Sequence[str]=None, baseline: Setup=None, ops: int=1,
+         threshold: float=None) -> Callable[[Setup], Setup]:
+    """Register a benchmark. covers defaults to the case's name."""
+    def register(setup: Setup) -> Setup:
+        if any(c.name == name for c in CASES):
+            raise ValueError("Duplicate benchmark name: {0}".format(name))
+        CASES.append(Case(name, tuple(covers or [name]), setup, baseline, ops, threshold))
+        return setup
+    return register
+
+
+def exports() -> List[str]:
+    """The names saturn/__init__.py exports."""
+    import saturn
+    return sorted(name for name, value in vars(saturn).items()
+                  if not name.startswith('_') and not isinstance(value, ModuleType))
+
+
+def uncovered(cases: Sequence[Case]=None) -> List[str]:
+    """Exports no registered case covers."""
+    covered = {name for c in (CASES if cases is None else cases) for name in c.covers}
+    return [name for name in exports() if name not in covered]
+
+
+def ops_per_sec(func: Callable[[], object], ops: int, repeat: int=5, min_time: float=0.2) -> float:
+    """Best rate over repeat runs, each calling func enough times to take min_time."""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+    best = min([elapsed] + timer.repeat(repeat=repeat - 1, number=number))
+    return number * ops / best
+
+
+def peak_bytes(func: Callable[[], object], ops: int) -> float:
+    """Peak memory allocated during one call, per operation."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / ops
+    finally:
+        tracemalloc.stop()
+
+
+def measure(c: Case, repeat: int=5, min_time: float=0.2) -> Dict[str, float]:
+    func = c.setup()
+    func()  # Warm caches, as in steady-state use.
+    result = {
+        'ops_per_sec': ops_per_sec(func, c.ops, repeat, min_time),
+        'peak_bytes_per_op': peak_bytes(func, c.ops),
+    }
+    if c.baseline is not None:
+        baseline = c.baseline()
+        baseline()
+        result['baseline_ops_per_sec'] = ops_per_sec(baseline, c.ops, repeat, min_time)
+        result['baseline_peak_bytes_per_op'] = peak_bytes(baseline, c.ops)
+        # Above 1 when saturn is slower than the baseline.
+        result['slowdown'] = result['baseline_ops_per_sec'] / result['ops_per_sec']
+    return result
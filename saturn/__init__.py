@@ -1,3 +1,14 @@
-from .saturn import datetime, timedelta, date, today, time, combine, range_dt, from_str, \
-    to_str, from_epoch, to_epoch, fix_naive, now, move_tz, to_iso, from_iso, split,  \
-    add, subtract, overlaps
+from .saturn import datetime, timedelta, date, today, time, combine, range_dt, DatetimeRange, range_array, from_str, \
+    from_str_many, to_str, from_epoch, to_epoch, from_epoch_us, to_epoch_us, to_epoch_ns, from_epoch_us_many, \
+    to_epoch_us_many, fix_naive, now, now_us, now_ns, move_tz, move_tz_many, localize_many, to_iso, from_iso, split,  \
+    add, subtract, overlaps, compile_format, CompiledFormat, infer_format, compile_formatter, write_formatted, get_locale, \
+    cache_info, clear_caches, timezone, warm_timezones, with_validation
+from .arrays import DatetimeArray
+from .clocks import Clock, SystemClock, CoarseClock, MonotonicClock, FrozenClock, get_clock, set_clock, \
+    using_clock
+from .files import iter_parse_file
+from .intervals import IntervalIndex, IntervalSet
+from .validation import set_validation, validation_policy, validation_stats, reset_validation_stats
+from .instrumentation import enable_instrumentation, disable_instrumentation, instrumentation_enabled, stats, \
+    reset_stats, stats_prometheus
+from .timezones import set_tz_backend, tz_backend, get_tz_backend
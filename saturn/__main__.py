@@ -0,0 +1,249 @@
+"""Rewrite timestamp columns of CSV or JSON-lines files:
+
+    python -m saturn events.csv -c created -c updated --to-tz US/Eastern --output-format epoch_us
+
+Timestamps are parsed with a from_str format, or as ISO 8601; moved to a
+timezone; and written as ISO 8601, epoch seconds or microseconds, or a to_str
+format. The input is split into byte ranges at line boundaries, converted by a
+pool of processes, and written in its original order as ranges finish.
+
+CSV rows can't contain quoted line breaks, since ranges are split at any line
+break. Rows and records with nothing to convert, and blank lines, are copied
+as they are. Converted ones keep their line ending, but are written out
+again: CSV rows with csv's minimal quoting, so quotes around their other
+fields may change; JSON records with json.dumps' spacing."""
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+from typing import Any, Callable, Iterator, List, NamedTuple, Tuple
+
+import saturn
+
+# Bytes of input per task.
+CHUNK_SIZE = 1 << 22
+
+ERRORS = ('raise', 'keep')
+
+
+class Options(NamedTuple):
+    path: str
+    kind: str  # 'csv' or 'jsonl'.
+    columns: List[str]
+    input_format: str  # 'iso', or a from_str format.
+    from_tz: str
+    to_tz: str
+    output_format: str  # 'iso', 'epoch', 'epoch_us', or a to_str format.
+    delimiter: str
+    errors: str
+
+
+def _converter(options: Options) -> Callable[[str], Any]:
+    """A function converting one timestamp string as options say."""
+    input_format, from_tz, to_tz = options.input_format, options.from_tz, options.to_tz
+    if input_format == 'iso':
+        parse = lambda value: saturn.from_iso(value, from_tz)
+    else:
+        from_str = saturn.compile_format(input_format).from_str
+        parse = lambda value: from_str(value, from_tz)
+
+    output_format = options.output_format
+    if output_format == 'iso':
+        emit = saturn.to_iso
+    elif output_format == 'epoch':
+        emit = saturn.to_epoch
+    elif output_format == 'epoch_us':
+        emit = saturn.to_epoch_us
+    else:
+        emit = saturn.compile_formatter(output_format).format
+
+    def convert(value):
+        dt = parse(value)
+        if type(dt) == saturn.date:
+            dt = saturn.datetime(dt.year, dt.month, dt.day, tz=from_tz)
+        return emit(saturn.move_tz(dt, to_tz))
+    return convert
+
+
+def _converting(options: Options) -> Callable[[Any], Any]:
+    """_converter, leaving empty values alone, and applying the errors policy."""
+    convert = _converter(options)
+    keep = options.errors == 'keep'
+
+    def convert_value(value):
+        if value is None or value == '':
+            return value
+        try:
+            return convert(str(value))
+        except Exception as e:
+            if keep:
+                return value
+            raise ValueError("Can't convert {0!r}: {1}".format(value, e)) from e
+    return convert_value
+
+
+def _header(path: str) -> Tuple[bytes, int]:
+    """A CSV file's header line, and the offset of the line after it."""
+    with open(path, 'rb') as f:
+        header = f.readline()
+        return header, f.tell()
+
+
+def ranges(path: str, start: int=0, chunk_size: int=CHUNK_SIZE) -> Iterator[Tuple[int, int]]:
+    """Split a file, from offset start, into (start, end) byte ranges of about
+    chunk_size, each ending at a line break or the end of the file."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def _read(path: str, start: int, end: int) -> str:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start).decode('utf-8')
+
+
+def _convert_csv(options: Options, indexes: List[int], text: str) -> str:
+    convert = _converting(options)
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=options.delimiter, lineterminator='')
+    for line in io.StringIO(text, newline=''):
+        body = line.rstrip('\r\n')
+        row = next(csv.reader([body], delimiter=options.delimiter), [])
+        changed = False
+        for i in indexes:
+            if i < len(row):
+                value = convert(row[i])
+                if value != row[i]:
+                    row[i], changed = value, True
+        if changed:
+            writer.writerow(row)
+            out.write(line[len(body):])
+        else:
+            out.write(line)
+    return out.getvalue()
+
+
+def _convert_jsonl(options: Options, text: str) -> str:
+    convert = _converting(options)
+    # Split at line feeds only, as ranges are: JSON strings can hold raw U+2028
+    # and other characters splitlines breaks at.
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        changed = False
+        for column in options.columns:
+            if column in record:
+                value = convert(record[column])
+                if value != record[column]:
+                    record[column], changed = value, True
+        if changed:
+            # Keep a CRLF line's carriage return.
+            lines[i] = json.dumps(record, ensure_ascii=False) + line[len(line.rstrip('\r')):]
+    return '\n'.join(lines)
+
+
+def convert_range(task: Tuple[Options, List[int], int, int]) -> bytes:
+    """Convert one byte range of the input. Runs in the pool's processes."""
+    options, indexes, start, end = task
+    text = _read(options.path, start, end)
+    if options.kind == 'csv':
+        return _convert_csv(options, indexes, text).encode('utf-8')
+    return _convert_jsonl(options, text).encode('utf-8')
+
+
+def _csv_indexes(header: bytes, options: Options) -> List[int]:
+    """Positions of the columns to convert, given by name or number."""
+    names = next(csv.reader([header.decode('utf-8').rstrip('\r\n')], delimiter=options.delimiter), [])
+    indexes = []
+    for column in options.columns:
+        if column in names:
+            indexes.append(names.index(column))
+        elif column.isdigit():
+            indexes.append(int(column))
+        else:
+            raise ValueError("No column {0!r} in the header: {1}".format(column, names))
+    return indexes
+
+
+def convert_file(options: Options, output: io.BufferedIOBase, jobs: int=None,
+                 chunk_size: int=CHUNK_SIZE) -> None:
+    """Convert options.path into output, with jobs processes; 1 converts in
+    this process."""
+    indexes, start = [], 0
+    if options.kind == 'csv':
+        header, start = _header(options.path)
+        indexes = _csv_indexes(header, options)
+        output.write(header)
+
+    tasks = ((options, indexes, begin, end) for begin, end in ranges(options.path, start, chunk_size))
+    if jobs == 1:
+        for converted in map(convert_range, tasks):
+            output.write(converted)
+        return
+
+    with multiprocessing.Pool(jobs) as pool:
+        # imap returns results in order, as soon as each and those before it finish.
+        for converted in pool.imap(convert_range, tasks):
+            output.write(converted)
+
+
+def parse_args(argv: List[str]=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m saturn', description=__doc__.split('\n\n')[0])
+    parser.add_argument('input', help="A CSV or JSON-lines file.")
+    parser.add_argument('-o', '--output', help="Where to write the result; standard output by default.")
+    parser.add_argument('-c', '--column', action='append', required=True, dest='columns',
+                        help="A column or key to convert: a CSV header name or number, or a JSON key. Repeatable.")
+    parser.add_argument('--type', choices=['csv', 'jsonl'], dest='kind',
+                        help="The input's type; by default, from its extension.")
+    parser.add_argument('-i', '--input-format', default='iso',
+                        help="'iso' (the default), or a from_str format, such as 'YYYY-MM-DD HH:mm:ss'.")
+    parser.add_argument('-f', '--from-tz', default='UTC',
+                        help="The timezone of timestamps that don't include one.")
+    parser.add_argument('-t', '--to-tz', default='UTC', help="The timezone to move timestamps to.")
+    parser.add_argument('-O', '--output-format', default='iso',
+                        help="'iso' (the default), 'epoch', 'epoch_us', or a to_str format.")
+    parser.add_argument('-d', '--delimiter', default=',', help="The CSV delimiter.")
+    parser.add_argument('--errors', choices=ERRORS, default='raise',
+                        help="On timestamps that don't parse, stop, or keep them unconverted.")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Processes to convert with; by default, one per CPU.")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Bytes of input per task.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]=None) -> int:
+    args = parse_args(argv)
+    kind = args.kind or ('jsonl' if args.input.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    options = Options(args.input, kind, args.columns, args.input_format, args.from_tz, args.to_tz,
+                      args.output_format, args.delimiter, args.errors)
+
+    output = None
+    try:
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        convert_file(options, output, args.jobs, args.chunk_size)
+    # Errors in the pool's processes are raised again here, as themselves.
+    except (ValueError, OSError, csv.Error) as e:
+        print('saturn: {0}'.format(e), file=sys.stderr)
+        return 1
+    finally:
+        if output is sys.stdout.buffer:
+            output.flush()
+        elif output is not None:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""A compact column of aware datetimes."""
+
+import datetime as _datetime
+import operator
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import abc
+from typing import Any, Iterable, Iterator, List, Union
+
+from saturn import timezones
+from saturn.saturn import DateOrDatetime, LocaleLike, _epoch_us, _epochs_view, _import_numpy, _is_numpy, \
+    _numpy_epochs_us, from_arrow, from_epoch_us, from_epoch_us_many, to_epoch_us_many
+from saturn.timezones import TzLike
+
+_MICROSECOND = _datetime.timedelta(microseconds=1)
+
+# Datetimes shown at each end of the reprs of long arrays.
+_REPR_EDGE = 3
+
+
+def _view(epochs_us: Any) -> memoryview:
+    """A memoryview of int64s over epochs_us, sharing its memory if it's a
+    contiguous buffer or NumPy array, or copying it into an array('q')."""
+    if _is_numpy(epochs_us):
+        epochs_us = _import_numpy().ascontiguousarray(_numpy_epochs_us(epochs_us))
+    else:
+        epochs_us = _epochs_view(epochs_us)
+        if not isinstance(epochs_us, memoryview):
+            epochs_us = array('q', epochs_us)
+    view = memoryview(epochs_us)
+    return view if view.format == 'q' else view.cast('B').cast('q')
+
+
+class DatetimeArray(abc.Sequence):
+    """Aware datetimes in one timezone, stored as int64 microseconds since the
+    epoch, in UTC, in one contiguous buffer: 8 bytes each, rather than a
+    datetime object each. Indexing and iterating create datetimes in tz.
+
+    Built from integer epochs: an iterable, array('q'), buffer of int64s, or
+    NumPy int64 or datetime64 array, whose memory is shared rather than copied
+    where it's contiguous. A shared array('q') or bytearray can't be resized
+    while the array holds it: append and extend raise BufferError, so pass a
+    copy to keep growing it. Use from_datetimes to build one from datetimes.
+    Arrays are immutable; operations return new ones, and move_tz and
+    contiguous slices share their buffer.
+
+    Like NumPy's, comparison operators compare elementwise, against a datetime
+    or an array of the same length, and return an array('b') of results. Use
+    equals to compare whole arrays."""
+    __slots__ = ('_us', '_tz')
+
+    def __init__(self, epochs_us: Any=(), tz: TzLike='UTC'):
+        self._us = epochs_us._us if isinstance(epochs_us, DatetimeArray) else _view(epochs_us)
+        self._tz = timezones.zone(timezones.get(tz))
+
+    @classmethod
+    def from_datetimes(cls, dts: Iterable[DateOrDatetime], tz: TzLike=None) -> 'DatetimeArray':
+        """Build an array from aware datetimes, or dates, which count from
+        midnight UTC. tz defaults to the first datetime's zone, or UTC."""
+        dts = list(dts)
+        if tz is None:
+            tzinfo = getattr(dts[0], 'tzinfo', None) if dts else None
+            tz = 'UTC' if tzinfo is None else tzinfo
+        return cls(to_epoch_us_many(dts), tz)
+
+    @property
+    def tz(self) -> _datetime.tzinfo:
+        return self._tz
+
+    @property
+    def epochs_us(self) -> memoryview:
+        """The int64 microseconds since the epoch, as a read-only view of the
+        buffer."""
+        return self._us.toreadonly()
+
+    @property
+    def nbytes(self) -> int:
+        return self._us.nbytes
+
+    def __buffer__(self, flags: int) -> memoryview:
+        return self._us.toreadonly()
+
+    def __array__(self, dtype: Any=None, copy: bool=None) -> Any:
+        """NumPy's array protocol: a read-only view of the buffer, or with
+        copy=True, a writable copy. copy=False raises ValueError if dtype needs
+        a copy."""
+        result = self.to_numpy()
+        if dtype is not None and result.dtype != _import_numpy().dtype(dtype):
+            if copy is False:
+                raise ValueError("Can't convert a DatetimeArray to {0} without copying.".format(dtype))
+            return result.astype(dtype)
+        return result.copy() if copy else result
+
+    def to_numpy(self) -> Any:
+        """A NumPy datetime64[us] array of the UTC times: a read-only view of
+        the buffer, since arrays are immutable. Copy it to modify it."""
+        result = _import_numpy().frombuffer(self._us, dtype='datetime64[us]')
+        result.flags.writeable = False
+        return result
+
+    def __len__(self) -> int:
+        return len(self._us)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[_datetime.datetime, 'DatetimeArray']:
+        if isinstance(i, slice):
+            if i.step in (None, 1):
+                return DatetimeArray(self._us[i], self._tz)
+            return DatetimeArray(array('q', self._us[i]), self._tz)
+        return from_epoch_us(self._us[i], self._tz)
+
+    def __iter__(self) -> Iterator[_datetime.datetime]:
+        return iter(from_epoch_us_many(self._us, self._tz))
+
+    def __contains__(self, dt: Any) -> bool:
+        try:
+            epoch = _epoch_us(dt)
+        except TypeError:
+            return False
+        return epoch in self._us
+
+    def __repr__(self) -> str:
+        if len(self) > 2 * _REPR_EDGE:
+            shown = self[:_REPR_EDGE].to_iso() + ['...'] + self[-_REPR_EDGE:].to_iso()
+        else:
+            shown = self.to_iso()
+        return 'DatetimeArray([{0}], tz={1!r})'.format(', '.join(shown), str(self._tz))
+
+    def __reduce__(self):
+        return self.__class__, (array('q', self._us), self._tz)
+
+    def equals(self, other: 'DatetimeArray') -> bool:
+        """Whether other holds the same instants, in the same order. Timezones
+        don't matter."""
+        return isinstance(other, DatetimeArray) and self._us == other._us
+
+    def _compare(self, other: Any, op) -> array:
+        if isinstance(other, DatetimeArray):
+            if len(other) != len(self):
+                raise ValueError("Can't compare DatetimeArrays of lengths {0} and {1}.".format(
+                    len(self), len(other)))
+            return array('b', map(op, self._us, other._us))
+        if isinstance(other, _datetime.date):
+            epoch = _epoch_us(other)
+            return array('b', [op(us, epoch) for us in self._us])
+        return NotImplemented
+
+    def __eq__(self, other: Any) -> array:
+        return self._compare(other, operator.eq)
+
+    def __ne__(self, other: Any) -> array:
+        return self._compare(other, operator.ne)
+
+    def __lt__(self, other: Any) -> array:
+        return self._compare(other, operator.lt)
+
+    def __le__(self, other: Any) -> array:
+        return self._compare(other, operator.le)
+
+    def __gt__(self, other: Any) -> array:
+        return self._compare(other, operator.gt)
+
+    def __ge__(self, other: Any) -> array:
+        return self._compare(other, operator.ge)
+
+    __hash__ = None
+
+    def add(self, days: float=0, seconds: float=0, microseconds: float=0, milliseconds: float=0,
+            minutes: float=0, hours: float=0, weeks: float=0) -> 'DatetimeArray':
+        """Add elapsed time to every datetime, as saturn.add does to one."""
+        delta = _datetime.timedelta(days=days, seconds=seconds, microseconds=microseconds,
+                                    milliseconds=milliseconds, minutes=minutes, hours=hours,
+                                    weeks=weeks) // _MICROSECOND
+        return DatetimeArray(array('q', [us + delta for us in self._us]), self._tz)
+
+    def subtract(self, days: float=0, seconds: float=0, microseconds: float=0, milliseconds: float=0,
+                 minutes: float=0, hours: float=0, weeks: float=0) -> 'DatetimeArray':
+        """Subtract elapsed time from every datetime, as saturn.subtract does
+        from one."""
+        return self.add(-days, -seconds, -microseconds, -milliseconds, -minutes, -hours, -weeks)
+
+    def move_tz(self, tz: TzLike) -> 'DatetimeArray':
+        """The same instants in another timezone, sharing the buffer."""
+        return DatetimeArray(self, tz)
+
+    def to_iso(self) -> List[str]:
+        return [dt.isoformat() for dt in self]
+
+    def to_str(self, str_format: str, locale: LocaleLike='en') -> List[str]:
+        return list(map(from_arrow.compile_formatter(str_format, locale).format, self))
+
+    def sort(self) -> 'DatetimeArray':
+        """Return a sorted copy."""
+        return DatetimeArray(array('q', sorted(self._us)), self._tz)
+
+    def argsort(self) -> array:
+        """Indexes that would sort the array."""
+        return array('q', sorted(range(len(self._us)), key=self._us.__getitem__))
+
+    def searchsorted(self, values: Any, side: str='left') -> Union[int, array]:
+        """Indexes to insert datetimes, or an iterable of them, at to keep a
+        sorted array sorted, as bisect does. With side='right', after any equal
+        datetimes."""
+        if side not in ('left', 'right'):
+            raise ValueError("side must be 'left' or 'right'.")
+        bisect = bisect_left if side == 'left' else bisect_right
+        if isinstance(values, _datetime.date):
+            return bisect(self._us, _epoch_us(values))
+        return array('q', [bisect(self._us, _epoch_us(dt)) for dt in values])
@@ -0,0 +1,173 @@
+"""Where saturn's now, now_us and now_ns get the time. The clock is the
+precise system clock unless set otherwise: globally with set_clock, or for a
+block of code with using_clock. Clocks are SystemClock; CoarseClock, which
+reuses one reading for a configurable granularity; MonotonicClock, which
+doesn't jump when the system's clock is changed; and FrozenClock, which only
+moves when told to, for tests."""
+
+import abc
+import datetime
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Union
+
+# Times are in datetime's own UTC, whatever the timezone backend, so reading
+# the clock doesn't load pytz.
+_UTC = datetime.timezone.utc
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=_UTC)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _from_us(epoch_us: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(microseconds=epoch_us)
+
+
+class Clock(abc.ABC):
+    """A source of the current time. Subclasses implement now_ns; now and
+    now_us derive from it, and may be overridden to be faster."""
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def now_ns(self) -> int:
+        """Nanoseconds since the Unix epoch."""
+
+    def now_us(self) -> int:
+        """Microseconds since the Unix epoch."""
+        return self.now_ns() // 1000
+
+    def now(self) -> datetime.datetime:
+        """The current time, as an aware datetime in UTC."""
+        return _from_us(self.now_us())
+
+
+class SystemClock(Clock):
+    """The system's wall clock, read on every call."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'SystemClock()'
+
+    def now_ns(self) -> int:
+        return time.time_ns()
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now(_UTC)
+
+
+class CoarseClock(Clock):
+    """The system's wall clock, read at most once per granularity seconds:
+    until then, calls return the same datetime and epoch, without reading
+    the clock or creating a datetime. Times lag by up to granularity. The
+    cached reading is replaced as a whole, so it's safe to share between
+    threads."""
+    __slots__ = ('granularity', '_granularity_ns', '_reading')
+
+    def __init__(self, granularity: float=0.01):
+        if granularity <= 0:
+            raise ValueError("granularity must be positive.")
+        self.granularity = granularity
+        self._granularity_ns = int(granularity * 1e9)
+        # (monotonic ns when stale, epoch ns, epoch us, datetime)
+        self._reading = (0, 0, 0, None)
+
+    def __repr__(self):
+        return 'CoarseClock(granularity={0!r})'.format(self.granularity)
+
+    def _read(self) -> tuple:
+        reading = self._reading
+        if time.monotonic_ns() < reading[0]:
+            return reading
+        ns = time.time_ns()
+        reading = self._reading = (time.monotonic_ns() + self._granularity_ns, ns, ns // 1000,
+                                   _from_us(ns // 1000))
+        return reading
+
+    def now_ns(self) -> int:
+        return self._read()[1]
+
+    def now_us(self) -> int:
+        return self._read()[2]
+
+    def now(self) -> datetime.datetime:
+        return self._read()[3]
+
+
+class MonotonicClock(Clock):
+    """The system's monotonic clock, anchored to the wall clock when created
+    or resynced. It never goes backwards, nor jumps when the wall clock is
+    changed, such as by NTP, but drifts from the wall clock until resync."""
+    __slots__ = ('_offset_ns',)
+
+    def __init__(self):
+        self.resync()
+
+    def __repr__(self):
+        return 'MonotonicClock()'
+
+    def resync(self) -> None:
+        """Re-anchor to the wall clock."""
+        self._offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def now_ns(self) -> int:
+        return time.monotonic_ns() + self._offset_ns
+
+
+class FrozenClock(Clock):
+    """A clock stopped at a time, which only moves with set and advance:
+    for deterministic tests. The time is an aware datetime or microseconds
+    since the epoch, and defaults to the current time."""
+    __slots__ = ('_us',)
+
+    def __init__(self, at: Union[datetime.datetime, int]=None):
+        self.set(time.time_ns() // 1000 if at is None else at)
+
+    def __repr__(self):
+        return 'FrozenClock({0!r})'.format(self.now().isoformat())
+
+    def set(self, at: Union[datetime.datetime, int]) -> None:
+        if isinstance(at, datetime.datetime):
+            if at.tzinfo is None or at.utcoffset() is None:
+                raise ValueError("FrozenClock needs an aware datetime.")
+            at = (at - _EPOCH) // _MICROSECOND
+        self._us = at
+
+    def advance(self, days: float=0, seconds: float=0, microseconds: float=0, milliseconds: float=0,
+                minutes: float=0, hours: float=0, weeks: float=0) -> None:
+        self._us += datetime.timedelta(days=days, seconds=seconds, microseconds=microseconds,
+                                       milliseconds=milliseconds, minutes=minutes, hours=hours,
+                                       weeks=weeks) // _MICROSECOND
+
+    def now_ns(self) -> int:
+        return self._us * 1000
+
+    def now_us(self) -> int:
+        return self._us
+
+
+default = SystemClock()
+# Set inside using_clock blocks; takes precedence over default.
+override = ContextVar('saturn_clock', default=None)
+
+
+def get_clock() -> Clock:
+    """The clock in effect here."""
+    return override.get() or default
+
+
+def set_clock(clock: Clock=None) -> None:
+    """Set the clock used outside using_clock blocks; None restores the
+    system clock."""
+    global default
+    default = SystemClock() if clock is None else clock
+
+
+@contextmanager
+def using_clock(clock: Clock) -> Iterator[Clock]:
+    """Use a clock within a with block. It applies to the current thread, or
+    asyncio task, only."""
+    token = override.set(clock)
+    try:
+        yield clock
+    finally:
+        override.reset(token)
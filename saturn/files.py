@@ -0,0 +1,97 @@
+"""Parsing timestamps out of files too large to read at once, such as logs
+and CSVs. Files are read in large buffered chunks, one line at a time, so
+memory use doesn't grow with the file's size."""
+
+import io
+import os
+from typing import IO, Any, Iterator, List, Tuple, Union
+
+from saturn.saturn import LocaleLike, _parsed_converter, from_arrow
+from saturn.timezones import TzLike
+
+ERRORS = ('raise', 'skip', 'collect')
+
+# Bytes read from the file at a time.
+CHUNK_SIZE = 1 << 20
+
+
+def _field_getter(field: Union[int, str, None], delimiter: str, header: str) -> Any:
+    """A function extracting the timestamp text from a line, or None to search
+    the whole line."""
+    if field is None:
+        return None
+    if isinstance(field, str):
+        names = [name.strip() for name in header.split(delimiter)]
+        try:
+            field = names.index(field)
+        except ValueError:
+            raise ValueError("No field named {0!r} in the header: {1}".format(field, names)) from None
+    maxsplit = field + 1
+    return lambda line: line.split(delimiter, maxsplit)[field]
+
+
+def _open(file: Union[str, os.PathLike, IO], encoding: str, chunk_size: int) -> Tuple[IO, Any]:
+    """A text stream of file's lines, and a function to call when done with it."""
+    if isinstance(file, (str, bytes, os.PathLike)):
+        stream = open(file, encoding=encoding, errors='replace', newline='', buffering=chunk_size)
+        return stream, stream.close
+    if isinstance(file, io.TextIOBase):
+        return file, lambda: None
+    # A binary file object. Detach when done, so the caller's file stays open.
+    stream = io.TextIOWrapper(file, encoding=encoding, errors='replace', newline='')
+    return stream, stream.detach
+
+
+def iter_parse_file(file: Union[str, os.PathLike, IO], str_format: str, field: Union[int, str]=None,
+                    tz: TzLike='UTC', out: str='datetime', errors: str='raise',
+                    malformed: List[Tuple[int, str]]=None, delimiter: str=None,
+                    encoding: str='utf-8', chunk_size: int=CHUNK_SIZE, locale: LocaleLike='en') -> Iterator[Any]:
+    """Parse the timestamp in each line of a file, given as a path or a text
+    or binary file object, lazily. Yield aware datetimes in tz for
+    out='datetime', or integer microseconds since the epoch for 'epoch_us'.
+    The format is compiled once, in locale; see compile_format.
+
+    With field=None the timestamp is searched for anywhere in the line, as by
+    from_str. A number picks a field of the line split on delimiter, or on
+    whitespace if delimiter is None; a name picks a field by the file's
+    header line. Fields are split with str.split, so quoted delimiters
+    before the timestamp aren't supported.
+
+    Lines that don't parse are handled by errors: 'raise' a ParserError
+    naming the line; 'skip' them; or 'collect' them, appending
+    (line number, line) to the malformed list. Blank lines are ignored."""
+    if errors not in ERRORS:
+        raise ValueError("errors must be one of {0}, not {1!r}.".format(ERRORS, errors))
+    if errors == 'collect' and malformed is None:
+        raise ValueError("errors='collect' needs a malformed list to collect lines into.")
+    if out not in ('datetime', 'epoch_us'):
+        raise ValueError("out must be 'datetime' or 'epoch_us'.")
+
+    parser = from_arrow.compile_parser(str_format, locale)
+    parse = parser.parse
+    convert = _parsed_converter(parser, tz, out)
+    # What a malformed line can raise: no match for the format, a matched but
+    # impossible date, or a missing field.
+    malformed_errors = (from_arrow.ParserError, ValueError, IndexError)
+
+    stream, close = _open(file, encoding, chunk_size)
+    try:
+        lines = enumerate(stream, 1)
+        header = next(lines, (0, ''))[1] if isinstance(field, str) else None
+        extract = _field_getter(field, delimiter, header)
+
+        for number, line in lines:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            try:
+                parsed = parse(line if extract is None else extract(line))
+            except malformed_errors as e:
+                if errors == 'raise':
+                    raise from_arrow.ParserError("Line {0}: {1}".format(number, e)) from e
+                if errors == 'collect':
+                    malformed.append((number, line))
+                continue
+            yield parsed if convert is None else convert(parsed)
+    finally:
+        close()
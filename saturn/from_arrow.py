@@ -7,9 +7,12 @@
 import calendar
 import datetime
 import re
+from functools import lru_cache
 
 import pytz
 
+from saturn import timezones
+
 
 RES = {
     'format': re.compile('(YYY?Y?|MM?M?M?|Do|DD?D?D?|d?dd?d?|HH?|hh?|mm?|ss?|SS?S?S?S?S?|ZZ?|a|A|X)'),
@@ -54,6 +57,101 @@ BASE_INPUT_RE_MAP = {
     'S': re.compile('\d'),
 }
 
+# Number of compiled format strings kept by compile_parser and compile_formatter.
+PARSER_CACHE_SIZE = 128
+FORMATTER_CACHE_SIZE = 128
+
+# Tokens whose parsed result is tz-aware.
+TZ_TOKENS = ['ZZZ', 'ZZ', 'Z', 'X']
+
+# The coarsest time unit each token's rendering depends on, for reusing the
+# rendered start of a format across datetimes; see Formatter.write_datetimes.
+# Tokens not listed depend on the seconds or finer. ZZ and Z depend on the
+# UTC offset instead.
+TOKEN_UNITS = dict(
+    [(token, 'day') for token in ['YYYY', 'YY', 'MMMM', 'MMM', 'MM', 'M', 'DDDD', 'DDD', 'DD', 'D',
+                                  'Do', 'dddd', 'ddd', 'd']] +
+    [(token, 'hour') for token in ['HH', 'H', 'hh', 'h', 'a', 'A']] +
+    [('mm', 'minute'), ('m', 'minute'), ('ZZ', 'offset'), ('Z', 'offset')]
+)
+
+# Tokens with an exact C strftime equivalent, whatever the locale. Formats of
+# only these are rendered by strftime; see Formatter. strftime only pads years
+# to four digits from 1000 on, so earlier ones use the emitters.
+STRFTIME_DIRECTIVES = {
+    'YYYY': '%Y', 'YY': '%y', 'MM': '%m', 'DD': '%d', 'DDDD': '%j',
+    'HH': '%H', 'hh': '%I', 'mm': '%M', 'ss': '%S', 'SSSSSS': '%f',
+}
+
+# Fixed-width numeric tokens: their width, the datetime field they set, and
+# what to multiply it by. Formats of only these are parsed by slicing; see
+# Parser.
+SLICED_TOKENS = {
+    'YYYY': (4, 'year', 1), 'MM': (2, 'month', 1), 'DD': (2, 'day', 1), 'HH': (2, 'hour', 1),
+    'hh': (2, 'hour', 1), 'mm': (2, 'minute', 1), 'ss': (2, 'second', 1), 'SSSSSS': (6, 'microsecond', 1),
+    'SSS': (3, 'microsecond', 1000),
+}
+
+# Datetimes formatted per write to the stream, by Formatter's write methods.
+WRITE_BATCH = 1024
+
+EPOCH_NAIVE = datetime.datetime(1970, 1, 1)
+MINUTE_US, HOUR_US, DAY_US = 60 * 10**6, 3600 * 10**6, 24 * 3600 * 10**6
+
+# Emitters of the tokens that render from integers, taking wall-clock
+# microseconds since the epoch and the UTC offset in microseconds. Like
+# token_emitters', for Formatter.write_epochs.
+EPOCH_EMITTERS = {
+    'HH': lambda local, offset: '{0:02d}'.format(local // HOUR_US % 24),
+    'H': lambda local, offset: str(local // HOUR_US % 24),
+    'mm': lambda local, offset: '{0:02d}'.format(local // MINUTE_US % 60),
+    'm': lambda local, offset: str(local // MINUTE_US % 60),
+    'ss': lambda local, offset: '{0:02d}'.format(local // 10**6 % 60),
+    's': lambda local, offset: str(local // 10**6 % 60),
+    'SSSSSS': lambda local, offset: '{0:06d}'.format(local % 10**6),
+    'SSSSS': lambda local, offset: '{0:05d}'.format(local % 10**6 // 10),
+    'SSSS': lambda local, offset: '{0:04d}'.format(local % 10**6 // 100),
+    'SSS': lambda local, offset: '{0:03d}'.format(local % 10**6 // 1000),
+    'SS': lambda local, offset: '{0:02d}'.format(local % 10**6 // 10000),
+    'S': lambda local, offset: str(local % 10**6 // 100000),
+    'X': lambda local, offset: str((local - offset) // 10**6),
+    'ZZ': lambda local, offset: _format_offset(int(offset / MINUTE_US), ':'),
+    'Z': lambda local, offset: _format_offset(int(offset / MINUTE_US), ''),
+}
+
+# Formats infer_format tries by default, most specific first.
+COMMON_FORMATS = [
+    'YYYY-MM-DDTHH:mm:ss.SSSSSSZZ',
+    'YYYY-MM-DDTHH:mm:ssZZ',
+    'YYYY-MM-DDTHH:mm:ss.SSSSSS',
+    'YYYY-MM-DDTHH:mm:ss',
+    'YYYY-MM-DD HH:mm:ss.SSSSSS',
+    'YYYY-MM-DD HH:mm:ssZZ',
+    'YYYY-MM-DD HH:mm:ss',
+    'YYYY-MM-DD HH:mm',
+    'YYYY-MM-DD',
+    'YYYY/MM/DD HH:mm:ss',
+    'YYYY/MM/DD',
+    'MM/DD/YYYY HH:mm:ss',
+    'MM/DD/YYYY h:mm:ss A',
+    'MM/DD/YYYY',
+    'DD/MM/YYYY HH:mm:ss',
+    'DD/MM/YYYY',
+    'DD.MM.YYYY HH:mm:ss',
+    'DD.MM.YYYY',
+    'ddd, DD MMM YYYY HH:mm:ss Z',
+    'D MMMM YYYY',
+    'D MMM YYYY',
+    'MMMM D, YYYY',
+    'MMM D, YYYY',
+    'YYYYMMDD',
+]
+
+# Tried by infer_format only when no COMMON_FORMATS candidate parses every
+# sample: any run of digits is a valid epoch, so it would otherwise tie with
+# compact dates such as 'YYYYMMDD'.
+FALLBACK_FORMATS = ['X']
+
 MARKERS = ['YYYY', 'MM', 'DD']
 SEPARATORS = ['-', '/', '.']
 
@@ -62,10 +160,8 @@ class ParserError(RuntimeError):
     pass
 
 
-def format_(dt, str_format):
-    locale = EnglishLocale()
-    return RES['format'].sub(lambda m: format_token(dt, m.group(0), locale),
-                             str_format)
+def format_(dt, str_format, locale='en'):
+    return compile_formatter(str_format, locale).format(dt)
 
 
 class Locale:
@@ -106,8 +202,26 @@ class Locale:
     ordinal_day_re = r'(\d+)'
 
     def __init__(self):
-
-        self._month_name_to_ordinal = None
+        # Locales are singletons, from get_locale, so their lookup tables and
+        # regexes are built once.
+        self._month_name_to_ordinal = self._name_to_ordinal(self.month_names)
+        self._month_name_to_ordinal.update(self._name_to_ordinal(self.month_abbreviations))
+        # Ordinal days of the month, by day.
+        self.ordinal_days = [self._ordinal_number(day) for day in range(32)]
+
+        # Regexes of the tokens parsed by name.
+        self.input_re_map = {
+            'MMMM': choice_re(self.month_names[1:], re.IGNORECASE),
+            'MMM': choice_re(self.month_abbreviations[1:], re.IGNORECASE),
+            'Do': re.compile(self.ordinal_day_re),
+            'dddd': choice_re(self.day_names[1:], re.IGNORECASE),
+            'ddd': choice_re(self.day_abbreviations[1:], re.IGNORECASE),
+            'd': re.compile("[1-7]"),
+            'a': choice_re((self.meridians['am'], self.meridians['pm'])),
+            # note: 'A' token accepts both 'am/pm' and 'AM/PM' formats to
+            # ensure backwards compatibility of this token
+            'A': choice_re(self.meridians.values())
+        }
 
     def describe(self, timeframe, delta=0, only_distance=False):
         """ Describes a delta within a timeframe in plain language.
@@ -155,10 +269,6 @@ class Locale:
         :param name: the month name or abbreviation.
         """
 
-        if self._month_name_to_ordinal is None:
-            self._month_name_to_ordinal = self._name_to_ordinal(self.month_names)
-            self._month_name_to_ordinal.update(self._name_to_ordinal(self.month_abbreviations))
-
         return self._month_name_to_ordinal.get(name)
 
     def year_full(self, year):
@@ -261,88 +371,310 @@ class EnglishLocale(Locale):
         return '{0}th'.format(n)
 
 
+class FrenchLocale(Locale):
+    names = ['fr', 'fr_fr', 'fr_be', 'fr_ca', 'fr_ch']
+
+    month_names = ['', 'janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet',
+                   'août', 'septembre', 'octobre', 'novembre', 'décembre']
+    month_abbreviations = ['', 'janv', 'févr', 'mars', 'avr', 'mai', 'juin', 'juil', 'août',
+                           'sept', 'oct', 'nov', 'déc']
+
+    day_names = ['', 'lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
+    day_abbreviations = ['', 'lun', 'mar', 'mer', 'jeu', 'ven', 'sam', 'dim']
+
+    ordinal_day_re = r'((?P<value>\b1(?=er\b)|[1-3]?[02-9](?=e\b)|[1-3]1(?=e\b))(er|e)\b)'
+
+    @staticmethod
+    def _ordinal_number(n):
+        if n == 1:
+            return '{0}er'.format(n)
+        return '{0}e'.format(n)
+
+
+class GermanLocale(Locale):
+    names = ['de', 'de_de', 'de_at', 'de_ch']
+
+    month_names = ['', 'Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli',
+                   'August', 'September', 'Oktober', 'November', 'Dezember']
+    month_abbreviations = ['', 'Jan', 'Feb', 'Mär', 'Apr', 'Mai', 'Jun', 'Jul', 'Aug',
+                           'Sep', 'Okt', 'Nov', 'Dez']
+
+    day_names = ['', 'Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
+    day_abbreviations = ['', 'Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
+
+    ordinal_day_re = r'((?P<value>[1-3]?\d)\.)'
+
+    @staticmethod
+    def _ordinal_number(n):
+        return '{0}.'.format(n)
+
+
+class SpanishLocale(Locale):
+    names = ['es', 'es_es', 'es_mx', 'es_ar']
+
+    meridians = {
+        'am': 'am',
+        'pm': 'pm',
+        'AM': 'AM',
+        'PM': 'PM',
+    }
+
+    month_names = ['', 'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio',
+                   'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']
+    month_abbreviations = ['', 'ene', 'feb', 'mar', 'abr', 'may', 'jun', 'jul', 'ago',
+                           'sep', 'oct', 'nov', 'dic']
+
+    day_names = ['', 'lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+    day_abbreviations = ['', 'lun', 'mar', 'mie', 'jue', 'vie', 'sab', 'dom']
+
+    ordinal_day_re = r'((?P<value>[1-3]?\d)º)'
+
+    @staticmethod
+    def _ordinal_number(n):
+        return '{0}º'.format(n)
+
+
+# Locale classes by name, and their instances: one per class.
+_locale_classes = {name: cls for cls in (EnglishLocale, FrenchLocale, GermanLocale, SpanishLocale)
+                   for name in cls.names}
+_locales = {}
+
+
+def get_locale(name='en'):
+    """Return the Locale for a name such as 'en', 'fr_FR' or 'de-DE'. Locales
+    are singletons; a Locale is returned unchanged."""
+    if isinstance(name, Locale):
+        return name
+    try:
+        cls = _locale_classes[name.lower().replace('-', '_')]
+    except KeyError:
+        raise ValueError("Unsupported locale {0!r}. Supported: {1}".format(
+            name, ', '.join(sorted(_locale_classes)))) from None
+    locale = _locales.get(cls)
+    if locale is None:
+        locale = _locales[cls] = cls()
+    return locale
+
+
 def format_token(dt, token, locale):
-    if token == 'YYYY':
-        return locale.year_full(dt.year)
-    if token == 'YY':
-        return locale.year_abbreviation(dt.year)
-
-    if token == 'MMMM':
-        return locale.month_name(dt.month)
-    if token == 'MMM':
-        return locale.month_abbreviation(dt.month)
-    if token == 'MM':
-        return '{0:02d}'.format(dt.month)
-    if token == 'M':
-        return str(dt.month)
-
-    if token == 'DDDD':
-        return '{0:03d}'.format(dt.timetuple().tm_yday)
-    if token == 'DDD':
-        return str(dt.timetuple().tm_yday)
-    if token == 'DD':
-        return '{0:02d}'.format(dt.day)
-    if token == 'D':
-        return str(dt.day)
-
-    if token == 'Do':
-        return locale._ordinal_number(dt.day)
-
-    if token == 'dddd':
-        return locale.day_name(dt.isoweekday())
-    if token == 'ddd':
-        return locale.day_abbreviation(dt.isoweekday())
-    if token == 'd':
-        return str(dt.isoweekday())
-
-    if token == 'HH':
-        return '{0:02d}'.format(dt.hour)
-    if token == 'H':
-        return str(dt.hour)
-    if token == 'hh':
-        return '{0:02d}'.format(dt.hour if 0 < dt.hour < 13 else abs(dt.hour - 12))
-    if token == 'h':
-        return str(dt.hour if 0 < dt.hour < 13 else abs(dt.hour - 12))
-
-    if token == 'mm':
-        return '{0:02d}'.format(dt.minute)
-    if token == 'm':
-        return str(dt.minute)
-
-    if token == 'ss':
-        return '{0:02d}'.format(dt.second)
-    if token == 's':
-        return str(dt.second)
-
-    if token == 'SSSSSS':
-        return str('{0:06d}'.format(int(dt.microsecond)))
-    if token == 'SSSSS':
-        return str('{0:05d}'.format(int(dt.microsecond / 10)))
-    if token == 'SSSS':
-        return str('{0:04d}'.format(int(dt.microsecond / 100)))
-    if token == 'SSS':
-        return str('{0:03d}'.format(int(dt.microsecond / 1000)))
-    if token == 'SS':
-        return str('{0:02d}'.format(int(dt.microsecond / 10000)))
-    if token == 'S':
-        return str(int(dt.microsecond / 100000))
-
-    if token == 'X':
-        return str(calendar.timegm(dt.utctimetuple()))
-
-    if token in ['ZZ', 'Z']:
-        separator = ':' if token == 'ZZ' else ''
-        tz = pytz.utc if dt.tzinfo is None else dt.tzinfo
-        total_minutes = int(tz.utcoffset(dt).total_seconds() / 60)
-
-        sign = '+' if total_minutes > 0 else '-'
-        total_minutes = abs(total_minutes)
-        hour, minute = divmod(total_minutes, 60)
-
-        return '{0}{1:02d}{2}{3:02d}'.format(sign, hour, separator, minute)
-
-    if token in ('a', 'A'):
-        return locale.meridian(dt.hour, token)
+    emit = token_emitters(locale).get(token)
+    if emit is not None:
+        return emit(dt)
+
+
+def _format_tz(dt, separator):
+    tz = pytz.utc if dt.tzinfo is None else dt.tzinfo
+    return _format_offset(int(tz.utcoffset(dt).total_seconds() / 60), separator)
+
+
+def _format_offset(total_minutes, separator):
+    sign = '+' if total_minutes > 0 else '-'
+    total_minutes = abs(total_minutes)
+    hour, minute = divmod(total_minutes, 60)
+
+    return '{0}{1:02d}{2}{3:02d}'.format(sign, hour, separator, minute)
+
+
+@lru_cache(maxsize=None)
+def token_emitters(locale):
+    """Map each format token to a function of dt that renders it; the
+    per-token equivalent of format_token. Cached per locale."""
+    return {
+        'YYYY': lambda dt: locale.year_full(dt.year),
+        'YY': lambda dt: locale.year_abbreviation(dt.year),
+
+        'MMMM': lambda dt: locale.month_name(dt.month),
+        'MMM': lambda dt: locale.month_abbreviation(dt.month),
+        'MM': lambda dt: '{0:02d}'.format(dt.month),
+        'M': lambda dt: str(dt.month),
+
+        'DDDD': lambda dt: '{0:03d}'.format(dt.timetuple().tm_yday),
+        'DDD': lambda dt: str(dt.timetuple().tm_yday),
+        'DD': lambda dt: '{0:02d}'.format(dt.day),
+        'D': lambda dt: str(dt.day),
+
+        'Do': lambda dt: locale.ordinal_days[dt.day],
+
+        'dddd': lambda dt: locale.day_name(dt.isoweekday()),
+        'ddd': lambda dt: locale.day_abbreviation(dt.isoweekday()),
+        'd': lambda dt: str(dt.isoweekday()),
+
+        'HH': lambda dt: '{0:02d}'.format(dt.hour),
+        'H': lambda dt: str(dt.hour),
+        'hh': lambda dt: '{0:02d}'.format(dt.hour if 0 < dt.hour < 13 else abs(dt.hour - 12)),
+        'h': lambda dt: str(dt.hour if 0 < dt.hour < 13 else abs(dt.hour - 12)),
+
+        'mm': lambda dt: '{0:02d}'.format(dt.minute),
+        'm': lambda dt: str(dt.minute),
+
+        'ss': lambda dt: '{0:02d}'.format(dt.second),
+        's': lambda dt: str(dt.second),
+
+        'SSSSSS': lambda dt: '{0:06d}'.format(int(dt.microsecond)),
+        'SSSSS': lambda dt: '{0:05d}'.format(int(dt.microsecond / 10)),
+        'SSSS': lambda dt: '{0:04d}'.format(int(dt.microsecond / 100)),
+        'SSS': lambda dt: '{0:03d}'.format(int(dt.microsecond / 1000)),
+        'SS': lambda dt: '{0:02d}'.format(int(dt.microsecond / 10000)),
+        'S': lambda dt: str(int(dt.microsecond / 100000)),
+
+        'X': lambda dt: str(calendar.timegm(dt.utctimetuple())),
+
+        'ZZ': lambda dt: _format_tz(dt, ':'),
+        'Z': lambda dt: _format_tz(dt, ''),
+
+        'a': lambda dt: locale.meridian(dt.hour, 'a'),
+        'A': lambda dt: locale.meridian(dt.hour, 'A'),
+    }
+
+
+class Formatter:
+    """A format string split once into literal parts and per-token emitters,
+    so it can be reused to format many datetimes."""
+
+    def __init__(self, str_format, locale='en'):
+        self.str_format = str_format
+        self.locale = get_locale(locale)
+
+        # Literal text sits at even indexes of parts, tokens at odd ones.
+        self.parts = RES['format'].split(str_format)
+        _check_meridians(self.locale, self.parts[1::2], ValueError)
+        self.emitters = _emitters(self.parts, self.locale)
+        self.strftime = _strftime_format(self.parts)
+
+    def __repr__(self):
+        return 'Formatter({0!r})'.format(self.str_format)
+
+    def format(self, dt):
+        if self.strftime is not None and isinstance(dt, datetime.datetime) and dt.year >= 1000:
+            return dt.strftime(self.strftime)
+        parts = self.parts[:]
+        for i, emit in self.emitters:
+            parts[i] = emit(dt)
+        return ''.join(parts)
+
+    def _split(self):
+        """Split parts where the tokens start depending on the seconds or
+        finer. Return the parts before; how many of (year, month, day, hour,
+        minute) they depend on; whether they depend on the UTC offset; and the
+        parts after, starting with empty literal text."""
+        emitters = token_emitters(self.locale)
+        units = [TOKEN_UNITS.get(token, 'second' if token in emitters else None) for token in self.parts[1::2]]
+        fine = units.index('second') if 'second' in units else len(units)
+        head, tail = self.parts[:2 * fine + 1], [''] + self.parts[2 * fine + 1:]
+        fields = max([{'day': 3, 'hour': 4, 'minute': 5}.get(unit, 0) for unit in units[:fine]], default=0)
+        return head, fields, 'offset' in units[:fine], tail
+
+    def write_datetimes(self, dts, write, sep):
+        """Format each of dts, followed by sep, and write them, in batches,
+        with write. Consecutive datetimes on the same day, hour or minute, as
+        the format needs, share one rendering of the format's start."""
+        head, fields, by_offset, tail = self._split()
+        head_emitters, tail_emitters = _emitters(head, self.locale), _emitters(tail, self.locale)
+
+        out, last_key, prefix = [], None, ''
+        for dt in dts:
+            key = (dt.year, dt.month, dt.day, dt.hour, dt.minute)[:fields]
+            if by_offset:
+                key += (dt.utcoffset(),)
+            if key != last_key:
+                prefix, last_key = _render(head, head_emitters, dt), key
+            out.append(prefix)
+            if tail_emitters:
+                out.append(_render(tail, tail_emitters, dt))
+            out.append(sep)
+            if len(out) >= WRITE_BATCH:
+                write(''.join(out))
+                out.clear()
+        write(''.join(out))
+
+    def write_epochs(self, local_us, offsets_us, write, sep):
+        """write_datetimes, for wall-clock times and UTC offsets given in
+        microseconds. Datetimes are only created to render the format's start,
+        once per day, hour or minute, and tokens that can't be rendered from
+        the integers."""
+        head, fields, by_offset, tail = self._split()
+        head_emitters = _emitters(head, self.locale)
+        unit = {3: DAY_US, 4: HOUR_US, 5: MINUTE_US}.get(fields)
+        tail_tokens = tail[1::2]
+        if all(token in EPOCH_EMITTERS for token in tail_tokens):
+            tail_emitters, by_epoch = [(i, EPOCH_EMITTERS[tail[i]]) for i in range(1, len(tail), 2)], True
+        else:
+            tail_emitters, by_epoch = _emitters(tail, self.locale), False
+
+        out, last_key, prefix = [], None, ''
+        for local, offset in zip(local_us, offsets_us):
+            key = local // unit if unit else 0
+            if by_offset:
+                key = (key, offset)
+            if key != last_key:
+                prefix, last_key = _render(head, head_emitters, _wall_datetime(local, offset)), key
+            out.append(prefix)
+            if tail_emitters:
+                if by_epoch:
+                    parts = tail[:]
+                    for i, emit in tail_emitters:
+                        parts[i] = emit(local, offset)
+                    out.append(''.join(parts))
+                else:
+                    out.append(_render(tail, tail_emitters, _wall_datetime(local, offset)))
+            out.append(sep)
+            if len(out) >= WRITE_BATCH:
+                write(''.join(out))
+                out.clear()
+        write(''.join(out))
+
+
+def _strftime_format(parts):
+    """The strftime format equivalent to a format split into parts, or None
+    if it has tokens strftime can't render the same."""
+    tokens = parts[1::2]
+    if not all(token in STRFTIME_DIRECTIVES for token in tokens):
+        return None
+    return ''.join(STRFTIME_DIRECTIVES[part] if i % 2 else part.replace('%', '%%')
+                   for i, part in enumerate(parts))
+
+
+def _check_meridians(locale, tokens, error):
+    """Raise error if tokens include 'a' or 'A' and the locale has no AM/PM
+    markers, rather than writing '' or ignoring them when parsing."""
+    if not locale.meridians['am']:
+        for token in tokens:
+            if token in ('a', 'A'):
+                raise error("Locale {0!r} has no AM/PM markers for token {1!r}; use a 24-hour "
+                            "format.".format(locale.names[0], token))
+
+
+def _emitters(parts, locale):
+    """(index, emitter) for each token in parts."""
+    emitters = token_emitters(locale)
+    # Tokens the regex accepts but format_token doesn't know render as ''.
+    return [(i, emitters.get(parts[i], lambda dt: '')) for i in range(1, len(parts), 2)]
+
+
+def _render(parts, emitters, dt):
+    """Formatter.format, for parts of a format."""
+    parts = parts[:]
+    for i, emit in emitters:
+        parts[i] = emit(dt)
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=None)
+def _fixed_tzinfo(offset_us):
+    return datetime.timezone(datetime.timedelta(microseconds=offset_us))
+
+
+def _wall_datetime(local_us, offset_us):
+    """A datetime from wall-clock microseconds since the epoch and a UTC
+    offset, with a fixed-offset tzinfo."""
+    return (EPOCH_NAIVE + datetime.timedelta(microseconds=local_us)).replace(tzinfo=_fixed_tzinfo(offset_us))
+
+
+@lru_cache(maxsize=FORMATTER_CACHE_SIZE)
+def compile_formatter(str_format, locale='en'):
+    """Return a Formatter for str_format, from an LRU cache keyed by format
+    string and locale."""
+    return Formatter(str_format, locale)
 
 
 def choice_re(choices, flags=0):
@@ -351,6 +683,73 @@ def choice_re(choices, flags=0):
 
 
 def parse_iso(iso_str):
+    dt = parse_iso_fast(iso_str)
+    if dt is None:
+        return parse_iso_general(iso_str)
+    return dt
+
+
+def parse_iso_fast(iso_str):
+    """Parse the common ISO 8601 / RFC 3339 shapes by position:
+    'YYYY-MM-DD[(T| )HH:MM[:SS[.ffffff]][Z|+HH:MM|+HHMM|+HH]]'. Return None for
+    anything else, so parse_iso can fall back to parse_iso_general."""
+    n = len(iso_str)
+    if n < 10 or not iso_str.isascii() or iso_str[4] != '-' or iso_str[7] != '-':
+        return None
+    year, month, day = iso_str[0:4], iso_str[5:7], iso_str[8:10]
+    if not (year.isdigit() and month.isdigit() and day.isdigit()):
+        return None
+
+    if n == 10:
+        try:
+            return datetime.datetime(int(year), int(month), int(day))
+        except ValueError:
+            return None
+
+    if n < 16 or iso_str[10] not in 'T ' or iso_str[13] != ':':
+        return None
+    hour, minute = iso_str[11:13], iso_str[14:16]
+    if not (hour.isdigit() and minute.isdigit()):
+        return None
+
+    second = microsecond = 0
+    i = 16
+    if n > 16 and iso_str[16] == ':':
+        second = iso_str[17:19]
+        if len(second) != 2 or not second.isdigit():
+            return None
+        second = int(second)
+        i = 19
+
+        if n > 19 and iso_str[19] == '.':
+            i = 20
+            while i < n and iso_str[i].isdigit():
+                i += 1
+            fraction = iso_str[20:i]
+            if not 0 < len(fraction) <= 6:
+                return None
+            microsecond = int(fraction) * 10 ** (6 - len(fraction))
+
+    tzinfo = None
+    tz_str = iso_str[i:]
+    if tz_str == 'Z':
+        tzinfo = timezones.get('UTC')
+    elif tz_str:
+        if tz_str[0] not in '+-' or not (
+                (len(tz_str) in (3, 5) and tz_str[1:].isdigit()) or
+                (len(tz_str) == 6 and tz_str[3] == ':' and tz_str[1:3].isdigit() and tz_str[4:].isdigit())):
+            return None
+        tzinfo = parse_tzinfo(tz_str)
+
+    try:
+        return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute),
+                                 second, microsecond, tzinfo)
+    except ValueError:
+        return None
+
+
+def parse_iso_general(iso_str):
+    """Parse an ISO 8601 string by guessing candidate formats, and trying each."""
     has_time = 'T' in iso_str or ' ' in iso_str.strip()
     space_divider = ' ' in iso_str.strip()
 
@@ -389,79 +788,157 @@ def parse_iso(iso_str):
     return parse_multiformat(iso_str, formats)
 
 
-def parse(string, fmt):
+def parse(string, fmt, locale='en'):
     if isinstance(fmt, list):
-        return parse_multiformat(string, fmt)
-
-    locale = EnglishLocale()
-
-    # fmt is a string of tokens like 'YYYY-MM-DD'
-    # we construct a new string by replacing each
-    # token by its pattern:
-    # 'YYYY-MM-DD' -> '(?P<YYYY>\d{4})-(?P<MM>\d{2})-(?P<DD>\d{2})'
-    tokens = []
-    offset = 0
-
-    input_re_map = BASE_INPUT_RE_MAP.copy()
-    input_re_map.update({
-        'MMMM': choice_re(locale.month_names[1:], re.IGNORECASE),
-        'MMM': choice_re(locale.month_abbreviations[1:],
-                         re.IGNORECASE),
-        'Do': re.compile(locale.ordinal_day_re),
-        'dddd': choice_re(locale.day_names[1:], re.IGNORECASE),
-        'ddd': choice_re(locale.day_abbreviations[1:],
-                         re.IGNORECASE),
-        'd': re.compile("[1-7]"),
-        'a': choice_re(
-            (locale.meridians['am'], locale.meridians['pm'])
-        ),
-        # note: 'A' token accepts both 'am/pm' and 'AM/PM' formats to
-        # ensure backwards compatibility of this token
-        'A': choice_re(locale.meridians.values())
-    })
-
-    # Extract the bracketed expressions to be reinserted later.
-    escaped_fmt = re.sub(RES['escape'], "#" , fmt)
-    escaped_data = re.findall(RES['escape'], fmt)
-
-    fmt_pattern = escaped_fmt
-
-    for m in RES['format'].finditer(escaped_fmt):
-        token = m.group(0)
+        return parse_multiformat(string, fmt, locale)
+
+    return compile_parser(fmt, locale).parse(string)
+
+
+class Parser:
+    """A format string compiled to a regex once, so it can be reused to parse
+    many strings."""
+
+    def __init__(self, fmt, locale='en'):
+        self.fmt = fmt
+        self.locale = get_locale(locale)
+
+        # fmt is a string of tokens like 'YYYY-MM-DD'
+        # we construct a new string by replacing each
+        # token by its pattern:
+        # 'YYYY-MM-DD' -> '(?P<YYYY>\d{4})-(?P<MM>\d{2})-(?P<DD>\d{2})'
+        self.tokens = []
+
+        input_re_map = BASE_INPUT_RE_MAP.copy()
+        input_re_map.update(self.locale.input_re_map)
+
+        # Extract the bracketed expressions to be reinserted later.
+        escaped_fmt = re.sub(RES['escape'], "#" , fmt)
+        escaped_data = re.findall(RES['escape'], fmt)
+
+        fmt_pattern = ''
+
+        # Literal text sits at even indexes of the split, tokens at odd ones.
+        for i, part in enumerate(RES['format'].split(escaped_fmt)):
+            if i % 2 == 0:
+                # Literal text matches itself; '#' marks a bracketed expression.
+                fmt_pattern += '#'.join(re.escape(text) for text in part.split('#'))
+                continue
+
+            token = part
+            try:
+                input_re = input_re_map[token]
+            except KeyError:
+                raise ParserError('Unrecognized token \'{0}\''.format(token))
+            input_pattern = '(?P<{0}>{1})'.format(token, input_re.pattern)
+            self.tokens.append(token)
+            fmt_pattern += input_pattern
+        _check_meridians(self.locale, self.tokens, ParserError)
+
+        final_fmt_pattern = ""
+        a = fmt_pattern.split("#")
+        b = escaped_data
+
+        # Due to the way Python splits, 'a' will always be longer
+        for i in range(len(a)):
+            final_fmt_pattern += a[i]
+            if i < len(b):
+                final_fmt_pattern += re.escape(b[i][1:-1])
+
+        self.pattern = re.compile(final_fmt_pattern, flags=re.IGNORECASE)
+        # Whether every parsed datetime carries its own tzinfo.
+        self.aware = any(token in TZ_TOKENS for token in self.tokens)
+        self.slices = _slices(fmt)
+
+    def __repr__(self):
+        return 'Parser({0!r})'.format(self.fmt)
+
+    def _parse_sliced(self, string):
+        """Parse a string of exactly the format's fixed width by slicing, or
+        return None for the regex to handle it, including raising errors."""
+        width, literals, fields = self.slices
+        if len(string) != width:
+            return None
+        for start, text in literals:
+            if not string.startswith(text, start):
+                return None
+        values = {}
+        for start, end, field, scale in fields:
+            value = string[start:end]
+            if not value.isdecimal():
+                return None
+            values[field] = int(value) * scale
         try:
-            input_re = input_re_map[token]
-        except KeyError:
-            raise ParserError('Unrecognized token \'{0}\''.format(token))
-        input_pattern = '(?P<{0}>{1})'.format(token, input_re.pattern)
-        tokens.append(token)
-        # a pattern doesn't have the same length as the token
-        # it replaces! We keep the difference in the offset variable.
-        # This works because the string is scanned left-to-right and matches
-        # are returned in the order found by finditer.
-        fmt_pattern = fmt_pattern[:m.start() + offset] + input_pattern + fmt_pattern[m.end() + offset:]
-        offset += len(input_pattern) - (m.end() - m.start())
-
-    final_fmt_pattern = ""
-    a = fmt_pattern.split("#")
-    b = escaped_data
-
-    # Due to the way Python splits, 'a' will always be longer
-    for i in range(len(a)):
-        final_fmt_pattern += a[i]
-        if i < len(b):
-            final_fmt_pattern += b[i][1:-1]
-
-    match = re.search(final_fmt_pattern, string, flags=re.IGNORECASE)
-    if match is None:
-        raise ParserError('Failed to match \'{0}\' when parsing \'{1}\''.format(final_fmt_pattern, string))
-    parts = {}
-    for token in tokens:
-        if token == 'Do':
-            value = match.group('value')
+            return datetime.datetime(values.get('year', 1), values.get('month', 1), values.get('day', 1),
+                                     values.get('hour', 0), values.get('minute', 0), values.get('second', 0),
+                                     values.get('microsecond', 0))
+        except ValueError:
+            return None
+
+    def parse(self, string):
+        if self.slices is not None:
+            parsed = self._parse_sliced(string)
+            if parsed is not None:
+                return parsed
+        match = self.pattern.search(string)
+        if match is None:
+            raise ParserError('Failed to match \'{0}\' when parsing \'{1}\''.format(self.pattern.pattern, string))
+        return self._build(match)
+
+    def parse_exact(self, string):
+        """Like parse, but the whole string must match the format."""
+        if self.slices is not None:
+            parsed = self._parse_sliced(string)
+            if parsed is not None:
+                return parsed
+        match = self.pattern.fullmatch(string)
+        if match is None:
+            raise ParserError('Failed to match \'{0}\' when parsing \'{1}\''.format(self.pattern.pattern, string))
+        return self._build(match)
+
+    def _build(self, match):
+        parts = {}
+        for token in self.tokens:
+            if token == 'Do':
+                value = match.group('value')
+            else:
+                value = match.group(token)
+            parse_token(token, value, parts, self.locale)
+        return build_datetime(parts)
+
+
+def _slices(fmt):
+    """For a format of only fixed-width numeric tokens, its width; the
+    (position, text) of its literal text; and the (start, end, field, scale)
+    of its tokens. None for other formats."""
+    # Bracketed text, and a token setting a field twice, are left to the regex.
+    if '[' in fmt or '#' in fmt:
+        return None
+    parts = RES['format'].split(fmt)
+    tokens = parts[1::2]
+    if not all(token in SLICED_TOKENS for token in tokens) or \
+            len({SLICED_TOKENS[token][1] for token in tokens}) != len(tokens):
+        return None
+
+    position, literals, fields = 0, [], []
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            if part:
+                literals.append((position, part))
+            position += len(part)
         else:
-            value = match.group(token)
-        parse_token(token, value, parts, locale)
-    return build_datetime(parts)
+            width, field, scale = SLICED_TOKENS[part]
+            fields.append((position, position + width, field, scale))
+            position += width
+    return position, literals, fields
+
+
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def compile_parser(fmt, locale='en'):
+    """Return a Parser for fmt. Parsers are kept in an LRU cache keyed by
+    format string and locale; use compile_parser.cache_info() and
+    .cache_clear() to inspect or reset it."""
+    return Parser(fmt, locale)
 
 
 def parse_token(token, value, parts, locale):
@@ -527,7 +1004,7 @@ def parse_token(token, value, parts, locale):
 def build_datetime(parts):
     timestamp = parts.get('timestamp')
 
-    if timestamp:
+    if timestamp is not None:
         return datetime.datetime.fromtimestamp(timestamp, tz=pytz.utc)
 
     am_pm = parts.get('am_pm')
@@ -544,12 +1021,12 @@ def build_datetime(parts):
                              tzinfo=parts.get('tzinfo'))
 
 
-def parse_multiformat(string, formats):
+def parse_multiformat(string, formats, locale='en'):
     _datetime = None
 
     for fmt in formats:
         try:
-            _datetime = parse(string, fmt)
+            _datetime = parse(string, fmt, locale)
             break
         except:
             pass
@@ -560,10 +1037,95 @@ def parse_multiformat(string, formats):
     return _datetime
 
 
+class MultiFormatParser:
+    """Parses strings that may use any of several formats. The format that last
+    succeeded is tried first, so a run of strings sharing a format costs one
+    attempt each."""
+
+    def __init__(self, fmts, locale='en'):
+        self.fmts = list(fmts)
+        self.parsers = [compile_parser(fmt, locale) for fmt in self.fmts]
+        self.aware = all(parser.aware for parser in self.parsers)
+        self.last = 0
+
+    def __repr__(self):
+        return 'MultiFormatParser({0!r})'.format(self.fmts)
+
+    def parse(self, string):
+        last = self.last
+        try:
+            return self.parsers[last].parse(string)
+        except Exception:
+            pass
+
+        for i, parser in enumerate(self.parsers):
+            if i == last:
+                continue
+            try:
+                dt = parser.parse(string)
+            except Exception:
+                continue
+            self.last = i
+            return dt
+
+        raise ParserError('Could not match input to any of {0} on \'{1}\''.format(self.fmts, string))
+
+
+def _format_scores(samples, candidates):
+    """(number of samples parsed, format) for each candidate parsing any."""
+    scores = []
+    for fmt in candidates:
+        parser = compile_parser(fmt, 'en')
+        score = 0
+        for sample in samples:
+            try:
+                parser.parse_exact(sample)
+            except Exception:
+                continue
+            score += 1
+        if score:
+            scores.append((score, fmt))
+    return scores
+
+
+def infer_format(samples, candidates=None):
+    """Find the format of a sample of strings. Return the candidate that parses
+    every sample, if exactly one does; otherwise a list of the candidates that
+    parse any, ranked by how many they parse. Candidates default to
+    COMMON_FORMATS, then FALLBACK_FORMATS if none of those parses every
+    sample; fallbacks rank after common formats parsing as many."""
+    samples = [sample.strip() for sample in samples]
+    if candidates is None:
+        candidates = COMMON_FORMATS
+        scores = _format_scores(samples, candidates)
+        if not any(score == len(samples) for score, fmt in scores):
+            candidates = COMMON_FORMATS + FALLBACK_FORMATS
+            scores += _format_scores(samples, FALLBACK_FORMATS)
+    else:
+        scores = _format_scores(samples, candidates)
+
+    if not scores:
+        raise ParserError('None of {0} match the samples'.format(list(candidates)))
+
+    # sorted is stable, so ties keep the candidates' order.
+    ranked = [fmt for score, fmt in sorted(scores, key=lambda s: -s[0])]
+    complete = [fmt for score, fmt in scores if score == len(samples)]
+    if len(complete) == 1:
+        return complete[0]
+    return ranked
+
+
 def parse_tzinfo(string):
-    """Find the tzinfo object associated with a string."""
+    """Find the tzinfo object associated with a string. Results are kept in
+    the timezone registry, per backend."""
+    key = (timezones.get_tz_backend(), string)
+    try:
+        return timezones._parsed[key]
+    except KeyError:
+        pass
+
     if string.upper() == 'UTC':
-        return pytz.utc
+        return timezones.get('UTC')
 
     # ISO match searches for a string in format '+04:00'
     iso_match = RES['tzinfo'].match(string)
@@ -575,14 +1137,14 @@ def parse_tzinfo(string):
         sign = -1 if sign == '-' else 1
         hours, minutes = int(hours), int(minutes)
 
-        tzinfo = datetime.timezone(sign * datetime.timedelta(hours=hours,
-                                                             minutes=minutes))
+        tzinfo = timezones.offset(sign * (hours * 60 + minutes))
 
     # If not, it might be something like 'US/Eastern' that tzinfo can parse..
     else:
-        tzinfo = pytz.timezone(string)
+        tzinfo = timezones.get(string)
 
     if tzinfo is None:
         raise ParserError('Could not parse timezone expression "{0}"', string)
 
+    timezones._parsed[key] = tzinfo
     return tzinfo
@@ -0,0 +1,220 @@
+"""Opt-in counts and timings of saturn's calls, for finding which function,
+format or timezone is behind time spent in saturn.
+
+enable_instrumentation replaces saturn's public functions, and from_arrow's
+parsing and formatting internals, with recording wrappers; disable_instrumentation
+puts the originals back. While disabled, nothing is wrapped, so there's no
+overhead. Functions imported by name before enabling, such as with
+`from saturn import to_str`, aren't instrumented."""
+
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from saturn import timezones
+from saturn.saturn import cache_info, from_arrow
+
+# Latencies are counted in buckets by their bit length in nanoseconds: bucket
+# b holds calls taking under 2 ** b ns.
+_BUCKETS = 48
+# Buckets exported to Prometheus, from 256 ns to 17 s. Every function gets the
+# same ones, so they can be aggregated.
+_PROMETHEUS_BUCKETS = range(8, 35)
+
+# Names of functions in the saturn namespace not to wrap: these manage
+# instrumentation, or would be pointless to time.
+_SKIP = {'enable_instrumentation', 'disable_instrumentation', 'instrumentation_enabled', 'stats',
+         'reset_stats', 'stats_prometheus'}
+
+
+class _FunctionStats:
+    __slots__ = ('calls', 'errors', 'total_ns', 'buckets')
+
+    def __init__(self):
+        self.calls = self.errors = self.total_ns = 0
+        self.buckets = [0] * _BUCKETS
+
+
+_functions: Dict[str, _FunctionStats] = {}
+_formats = Counter()
+_timezones = Counter()
+
+# (namespace, attribute, original) for each wrapped function, to restore on disable.
+_originals: List[Tuple[Any, str, Callable]] = []
+
+
+def _wrap(func: Callable, name: str, get_format: Callable=None) -> Callable:
+    stats = _functions.setdefault(name, _FunctionStats())
+    buckets = stats.buckets
+    clock = time.perf_counter_ns
+
+    def inner(*args, **kwargs):
+        if get_format is not None:
+            fmt = get_format(args, kwargs)
+            if fmt is not None:
+                _formats[fmt] += 1
+
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = clock() - start
+            stats.calls += 1
+            stats.total_ns += elapsed
+            buckets[min(elapsed.bit_length(), _BUCKETS - 1)] += 1
+
+    inner.__wrapped__ = func
+    for attr in ('__module__', '__name__', '__qualname__', '__doc__'):
+        try:
+            setattr(inner, attr, getattr(func, attr))
+        except AttributeError:
+            pass
+    return inner
+
+
+def _replace(namespace: Any, attr: str, wrapper: Callable) -> None:
+    _originals.append((namespace, attr, getattr(namespace, attr)))
+    setattr(namespace, attr, wrapper)
+
+
+def _counting_get(get: Callable) -> Callable:
+    """timezones.get, counting the zone names it resolves. Counting here,
+    rather than on entering saturn's functions, leaves out tz arguments,
+    such as defaults, that a call never resolves."""
+    def counted(tz, backend=None):
+        if isinstance(tz, str):
+            _timezones[tz] += 1
+        return get(tz, backend)
+
+    counted.__wrapped__ = get
+    return counted
+
+
+def _targets() -> List[Tuple[Any, str, str, Callable]]:
+    """(namespace, attribute, name, format getter) for each function to
+    instrument."""
+    import saturn
+
+    targets = []
+    for attr, value in sorted(vars(saturn).items()):
+        if attr.startswith('_') or attr in _SKIP or isinstance(value, type) or not callable(value):
+            continue
+        targets.append((saturn, attr, attr, None))
+
+    # Formats are counted where strings are actually parsed or formatted, which
+    # every path through saturn reaches once per string and format tried.
+    def self_attr(attr):
+        return lambda args, kwargs: getattr(args[0], attr)
+
+    targets += [
+        (from_arrow, 'parse', 'from_arrow.parse', None),
+        (from_arrow, 'parse_iso', 'from_arrow.parse_iso', None),
+        (from_arrow, 'format_', 'from_arrow.format_', None),
+        (from_arrow, 'parse_tzinfo', 'from_arrow.parse_tzinfo', None),
+        (from_arrow.Parser, 'parse', 'from_arrow.Parser.parse', self_attr('fmt')),
+        (from_arrow.Parser, 'parse_exact', 'from_arrow.Parser.parse_exact', self_attr('fmt')),
+        (from_arrow.MultiFormatParser, 'parse', 'from_arrow.MultiFormatParser.parse', None),
+        (from_arrow.Formatter, 'format', 'from_arrow.Formatter.format', self_attr('str_format')),
+    ]
+    return targets
+
+
+def enable_instrumentation() -> None:
+    """Start recording calls. Recorded stats are kept; see reset_stats."""
+    if _originals:
+        return
+    for namespace, attr, name, get_format in _targets():
+        _replace(namespace, attr, _wrap(getattr(namespace, attr), name, get_format))
+    _replace(timezones, 'get', _counting_get(timezones.get))
+
+
+def disable_instrumentation() -> None:
+    """Stop recording calls, restoring the uninstrumented functions."""
+    while _originals:
+        namespace, attr, original = _originals.pop()
+        setattr(namespace, attr, original)
+
+
+def instrumentation_enabled() -> bool:
+    return bool(_originals)
+
+
+def reset_stats() -> None:
+    for stats in _functions.values():
+        stats.calls = stats.errors = stats.total_ns = 0
+        stats.buckets[:] = [0] * _BUCKETS
+    _formats.clear()
+    _timezones.clear()
+
+
+def _histogram(buckets: List[int]) -> Dict[int, int]:
+    """Call counts by latency upper bound, in ns, omitting empty buckets."""
+    return {2 ** b: count for b, count in enumerate(buckets) if count}
+
+
+def stats(top: int=10) -> Dict[str, Any]:
+    """Return what's been recorded: per-function call and error counts, total
+    time and latency histograms, the most used formats and timezones, and
+    the format caches' statistics."""
+    return {
+        'functions': {
+            name: {
+                'calls': s.calls,
+                'errors': s.errors,
+                'total_ns': s.total_ns,
+                'mean_ns': s.total_ns / s.calls if s.calls else 0,
+                'histogram_ns': _histogram(s.buckets),
+            } for name, s in sorted(_functions.items()) if s.calls
+        },
+        'formats': _formats.most_common(top),
+        'timezones': _timezones.most_common(top),
+        'caches': {name: info._asdict() for name, info in cache_info().items()},
+    }
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def stats_prometheus(top: int=10) -> str:
+    """Return stats in Prometheus' text exposition format."""
+    current = stats(top)
+    lines = [
+        '# HELP saturn_call_duration_seconds Latency of saturn calls.',
+        '# TYPE saturn_call_duration_seconds histogram',
+    ]
+    for name, s in current['functions'].items():
+        function = 'function="{0}"'.format(_label(name))
+        histogram, cumulative = s['histogram_ns'], 0
+        for b in _PROMETHEUS_BUCKETS:
+            cumulative += histogram.get(2 ** b, 0)
+            lines.append('saturn_call_duration_seconds_bucket{{{0},le="{1:.9g}"}} {2}'.format(
+                function, 2 ** b / 1e9, cumulative))
+        lines.append('saturn_call_duration_seconds_bucket{{{0},le="+Inf"}} {1}'.format(function, s['calls']))
+        lines.append('saturn_call_duration_seconds_sum{{{0}}} {1:.9g}'.format(function, s['total_ns'] / 1e9))
+        lines.append('saturn_call_duration_seconds_count{{{0}}} {1}'.format(function, s['calls']))
+
+    lines += ['# HELP saturn_call_errors_total Saturn calls that raised.',
+              '# TYPE saturn_call_errors_total counter']
+    lines += ['saturn_call_errors_total{{function="{0}"}} {1}'.format(_label(name), s['errors'])
+              for name, s in current['functions'].items()]
+
+    lines += ['# HELP saturn_format_uses_total Calls using each format string.',
+              '# TYPE saturn_format_uses_total counter']
+    lines += ['saturn_format_uses_total{{format="{0}"}} {1}'.format(_label(fmt), count)
+              for fmt, count in current['formats']]
+
+    lines += ['# HELP saturn_timezone_uses_total Calls using each timezone.',
+              '# TYPE saturn_timezone_uses_total counter']
+    lines += ['saturn_timezone_uses_total{{tz="{0}"}} {1}'.format(_label(tz), count)
+              for tz, count in current['timezones']]
+
+    for field, kind in (('hits', 'counter'), ('misses', 'counter'), ('currsize', 'gauge')):
+        metric = 'saturn_format_cache_{0}'.format(field + '_total' if kind == 'counter' else 'size')
+        lines += ['# TYPE {0} {1}'.format(metric, kind)]
+        lines += ['{0}{{cache="{1}"}} {2}'.format(metric, cache, info[field])
+                  for cache, info in current['caches'].items()]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,296 @@
+"""Collections of date, time, or datetime ranges."""
+
+import datetime as _datetime
+import heapq
+import random
+from bisect import bisect_right
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from saturn.saturn import DateOrDatetime, DateOrTimeOrDatetime, DatetimeRange, _check_aware
+
+Interval = Tuple[DateOrTimeOrDatetime, DateOrTimeOrDatetime, Any]
+
+
+class _Node:
+    """A node of IntervalIndex's treap: a binary search tree ordered by key,
+    and a heap ordered by random priority, which keeps it balanced."""
+    __slots__ = ('key', 'start', 'end', 'value', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, key, start, end, value, priority):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.value = value
+        self.priority = priority
+        self.left = self.right = None
+        self.max_end = end
+
+
+def _update(node: _Node) -> _Node:
+    """Recompute the greatest end in node's subtree, after its children change."""
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+    return node
+
+
+def _split(node: _Node, key, inclusive: bool=False) -> Tuple[_Node, _Node]:
+    """Split a treap into nodes with keys below key (or at most key, if
+    inclusive), and the rest."""
+    if node is None:
+        return None, None
+    if node.key < key or (inclusive and node.key == key):
+        node.right, right = _split(node.right, key, inclusive)
+        return _update(node), right
+    left, node.left = _split(node.left, key, inclusive)
+    return left, _update(node)
+
+
+def _merge(left: _Node, right: _Node) -> _Node:
+    """Join two treaps, where every key in left is below every key in right."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+def _build(nodes: List[_Node], depth: int, max_depth: int) -> _Node:
+    """Build a balanced treap from nodes sorted by key. Priorities fall with
+    depth, so the result is a valid heap."""
+    if not nodes:
+        return None
+    middle = len(nodes) // 2
+    node = nodes[middle]
+    node.priority = 1 - (depth + random.random()) / (max_depth + 1)
+    node.left = _build(nodes[:middle], depth + 1, max_depth)
+    node.right = _build(nodes[middle + 1:], depth + 1, max_depth)
+    return _update(node)
+
+
+class IntervalIndex:
+    """An index of date, time, or datetime ranges, for finding the ones that
+    overlap a range, or contain a time. Ranges include their ends, as in
+    saturn.overlaps. Queries take O(min(n, (k + 1) log n)) time for k
+    results: subtrees that end late enough but hold no match are still
+    visited. Ranges are inserted and removed in expected O(log n).
+
+    Ranges are (start, end) or (start, end, value) tuples; value is any object
+    to carry along, such as a booking ID."""
+
+    def __init__(self, intervals: Iterable[tuple]=()):
+        self._count = 0
+        nodes = sorted((self._node(*interval) for interval in intervals), key=lambda n: n.key)
+        self._root = _build(nodes, 0, len(nodes).bit_length())
+        self._len = len(nodes)
+
+    def _node(self, start: DateOrTimeOrDatetime, end: DateOrTimeOrDatetime, value: Any=None) -> _Node:
+        _check_aware((start, end))
+        self._count += 1
+        # The count keeps keys unique, so equal ranges can be stored.
+        return _Node((start, end, self._count), start, end, value, random.random())
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self) -> Iterator[Interval]:
+        """Iterate over (start, end, value) tuples, sorted by start and end."""
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.start, node.end, node.value
+            node = node.right
+
+    def __repr__(self):
+        return 'IntervalIndex({0!r})'.format(list(self))
+
+    def insert(self, start: DateOrTimeOrDatetime, end: DateOrTimeOrDatetime, value: Any=None) -> None:
+        node = self._node(start, end, value)
+        left, right = _split(self._root, node.key)
+        self._root = _merge(_merge(left, node), right)
+        self._len += 1
+
+    def remove(self, start: DateOrTimeOrDatetime, end: DateOrTimeOrDatetime, value: Any=None) -> None:
+        """Remove one range equal to start, end and value. Raise KeyError if
+        there's none."""
+        # Ranges equal to (start, end) differ only by their count, so they end
+        # up together in the middle.
+        left, rest = _split(self._root, (start, end))
+        middle, right = _split(rest, (start, end, float('inf')))
+
+        matches = [node for node in self._in_order(middle) if node.value == value]
+        if matches:
+            before, after = _split(middle, matches[0].key)
+            _, after = _split(after, matches[0].key, inclusive=True)
+            middle = _merge(before, after)
+        self._root = _merge(_merge(left, middle), right)
+
+        if not matches:
+            raise KeyError((start, end, value))
+        self._len -= 1
+
+    def _in_order(self, node: _Node) -> Iterator[_Node]:
+        if node is not None:
+            yield from self._in_order(node.left)
+            yield node
+            yield from self._in_order(node.right)
+
+    def overlapping(self, start: DateOrTimeOrDatetime, end: DateOrTimeOrDatetime) -> List[Interval]:
+        """Return the ranges that overlap start to end, sorted by start and end."""
+        _check_aware((start, end))
+        found = []
+        self._collect(self._root, start, end, found)
+        return found
+
+    def containing(self, dt: DateOrTimeOrDatetime) -> List[Interval]:
+        """Return the ranges that contain dt, sorted by start and end."""
+        return self.overlapping(dt, dt)
+
+    def _collect(self, node: _Node, start, end, found: list) -> None:
+        """Add ranges under node that overlap start to end to found, in order.
+        The same test as saturn.overlaps: node.start <= end and node.end >= start."""
+        # Nothing under node ends late enough.
+        if node is None or node.max_end < start:
+            return
+        self._collect(node.left, start, end, found)
+        # Everything to the right starts after this node, so too late too.
+        if node.start <= end:
+            if node.end >= start:
+                found.append((node.start, node.end, node.value))
+            self._collect(node.right, start, end, found)
+
+
+class IntervalSet:
+    """A set of date or datetime ranges, kept sorted and coalesced. Ranges are
+    half-open: they include their start, but not their end, so ranges that
+    meet end to start join into one. Set operations are linear merges.
+
+    Ranges are (start, end) tuples; empty ones, with end <= start, are dropped."""
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self, intervals: Iterable[Tuple[DateOrDatetime, DateOrDatetime]]=()):
+        intervals = list(intervals)
+        for start, end in intervals:
+            _check_aware((start, end))
+        intervals.sort()
+        self._starts, self._ends = [], []
+        self._extend(intervals)
+
+    def _extend(self, intervals: Iterable[Tuple[DateOrDatetime, DateOrDatetime]]) -> None:
+        """Append ranges sorted by start, joining overlapping and touching ones."""
+        starts, ends = self._starts, self._ends
+        for start, end in intervals:
+            if not start < end:
+                continue
+            if ends and start <= ends[-1]:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+
+    @classmethod
+    def _sorted(cls, intervals: Iterable[Tuple[DateOrDatetime, DateOrDatetime]]) -> 'IntervalSet':
+        """Build a set from ranges already sorted by start, skipping the sort."""
+        result = cls.__new__(cls)
+        result._starts, result._ends = [], []
+        result._extend(intervals)
+        return result
+
+    @classmethod
+    def from_range(cls, dt_range: DatetimeRange, duration: _datetime.timedelta=None) -> 'IntervalSet':
+        """Build a set from range_dt output, with a range of length duration
+        starting at each item. duration defaults to the range's step; for ranges
+        of calendar months, each item's range ends at the next month's item."""
+        if dt_range._stride < 0:
+            dt_range = dt_range[::-1]
+        if duration is None:
+            duration = dt_range.step
+        if duration is not None:
+            return cls._sorted((dt, dt + duration) for dt in dt_range)
+        items = list(dt_range)
+        if items:
+            items.append(dt_range._at(dt_range._first + dt_range._stride * len(items)))
+        return cls._sorted(zip(items, items[1:]))
+
+    def __iter__(self) -> Iterator[Tuple[DateOrDatetime, DateOrDatetime]]:
+        return zip(self._starts, self._ends)
+
+    def __len__(self):
+        """The number of disjoint ranges."""
+        return len(self._starts)
+
+    def __repr__(self):
+        return 'IntervalSet({0!r})'.format(list(self))
+
+    def __eq__(self, other):
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __hash__(self):
+        return hash((tuple(self._starts), tuple(self._ends)))
+
+    def __contains__(self, dt: DateOrDatetime) -> bool:
+        """Whether dt falls in one of the ranges."""
+        i = bisect_right(self._starts, dt) - 1
+        return i >= 0 and dt < self._ends[i]
+
+    def duration(self) -> _datetime.timedelta:
+        """The total length of the ranges."""
+        return sum((end - start for start, end in self), _datetime.timedelta())
+
+    def union(self, other: 'IntervalSet') -> 'IntervalSet':
+        return self._sorted(heapq.merge(self, other))
+
+    def intersection(self, other: 'IntervalSet') -> 'IntervalSet':
+        result = []
+        a, b = list(self), list(other)
+        i = j = 0
+        while i < len(a) and j < len(b):
+            start = max(a[i][0], b[j][0])
+            end = min(a[i][1], b[j][1])
+            if start < end:
+                result.append((start, end))
+            # Whichever range ends first can't overlap anything further.
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return self._sorted(result)
+
+    def difference(self, other: 'IntervalSet') -> 'IntervalSet':
+        result = []
+        b = list(other)
+        j = 0
+        for start, end in self:
+            # Skip ranges of other that end before this one starts.
+            while j < len(b) and b[j][1] <= start:
+                j += 1
+            k = j
+            while k < len(b) and b[k][0] < end:
+                if b[k][0] > start:
+                    result.append((start, b[k][0]))
+                start = max(start, b[k][1])
+                k += 1
+            if start < end:
+                result.append((start, end))
+        return self._sorted(result)
+
+    def complement(self, start: DateOrDatetime, end: DateOrDatetime) -> 'IntervalSet':
+        """The parts of start to end not in this set."""
+        return IntervalSet([(start, end)]).difference(self)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
@@ -0,0 +1,38 @@
+"""Modules that load on first use rather than on import, so `import saturn`
+stays cheap for programs that never parse, format, or look up a timezone.
+This follows the LazyLoader recipe in importlib's documentation."""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a module that's loaded when one of its attributes is first used.
+    A module that's already imported is returned as is."""
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError("No module named {0!r}".format(name), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    # Normally done by the import system: make the submodule an attribute of
+    # its package.
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """Whether a module's been imported and actually loaded."""
+    # type() doesn't trigger loading; lazy modules have a special class until loaded.
+    return type(sys.modules.get(name)) is ModuleType
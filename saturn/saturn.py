@@ -1,10 +1,21 @@
 import datetime as _datetime
-from functools import partial, wraps
-from typing import Iterator, Tuple, Union
-
-import pytz
-
-from saturn import from_arrow
+import itertools
+import numbers
+from array import array
+from bisect import bisect_right
+from collections import abc
+from functools import wraps
+from types import ModuleType, SimpleNamespace
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+from saturn import clocks, timezones, validation
+from saturn.lazy import lazy_import
+from saturn.timezones import TzLike
+
+# The timezone database and the parsing and formatting engine load on first use.
+calendar = lazy_import('calendar')
+pytz = lazy_import('pytz')
+from_arrow = lazy_import('saturn.from_arrow')
 
 # No need to import datetime, date, and today if using saturn.
 timedelta = _datetime.timedelta
@@ -14,28 +25,93 @@ today = _datetime.date.today
 DateOrDatetime = Union[_datetime.date, _datetime.datetime]
 TimeOrDatetime = Union[_datetime.time, _datetime.datetime]
 DateOrTimeOrDatetime = Union[_datetime.date, _datetime.time, _datetime.datetime]
+# A locale name, such as 'en' or 'fr_FR', or a Locale from get_locale.
+LocaleLike = Union[str, 'from_arrow.Locale']
+
+_EPOCH = _datetime.datetime(1970, 1, 1, tzinfo=_datetime.timezone.utc)
+_EPOCH_NAIVE = _datetime.datetime(1970, 1, 1)
+_MICROSECOND = _datetime.timedelta(microseconds=1)
+
+# Lengths of range_dt's intervals.
+_INTERVAL_MICROSECONDS = {
+    'week': 7 * 24 * 3600 * 10**6,
+    'day': 24 * 3600 * 10**6,
+    'hour': 3600 * 10**6,
+    'minute': 60 * 10**6,
+    'second': 10**6,
+    'millisecond': 1000,
+    'microsecond': 1,
+}
 
 
 class TzNaiveError(Exception):
     pass
 
+
+def _import_numpy():
+    """NumPy is optional; only functions that return NumPy arrays import it."""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("This function requires NumPy to be installed.") from None
+    return numpy
+
 # todo reorder func arguments to be curry-friendly? Needs toolz to support annotations.
 
 
-def _check_aware_input(func, num_dt_args=1):
+def _check_aware(dts: Iterable[DateOrTimeOrDatetime]) -> None:
+    """Raise an error if any of the datetimes or times is naive."""
+    # Can't use isinstance, since isinstance([datetime object], _datetime.date)
+    # returns True.
+    for dt in dts:
+        if type(dt) != _datetime.date:
+            if not dt.tzinfo:
+                raise TzNaiveError("Must use a timezone-aware datetime. Consider saturn.fix_naive().")
+
+
+def _each_aware(dts: Iterable[_datetime.datetime]) -> Iterable[_datetime.datetime]:
+    """Yield dts, raising an error at the first naive one."""
+    for dt in dts:
+        if not dt.tzinfo:
+            raise TzNaiveError("Must use a timezone-aware datetime. Consider saturn.fix_naive().")
+        yield dt
+
+
+def _check_aware_input(func, num_dt_args=1, policy: validation.Policy=None):
     """Force a function that accepts a datetime as first argument to check for
-    timezone-awareness.  Raise an error if the input's naive."""
+    timezone-awareness.  Raise an error if the input's naive. How often it
+    checks follows the validation policy in effect, unless given one."""
+    stats, override = validation.stats, validation.override.get
+
     @wraps(func)
     def inner(*args, **kwargs):
-        dts = args[:num_dt_args]
-        # Can't use isinstance, since isinstance([datetime object], _datetime.date)
-        # returns True.
-        for dt in dts:
-            if type(dt) != _datetime.date:
-                if not dt.tzinfo:
-                    raise TzNaiveError("Must use a timezone-aware datetime. Consider saturn.fix_naive().")
-
+        if policy is None:
+            if validation.fast:
+                for dt in args[:num_dt_args]:
+                    if type(dt) != _datetime.date and not dt.tzinfo:
+                        raise TzNaiveError("Must use a timezone-aware datetime. Consider saturn.fix_naive().")
+                return func(*args, **kwargs)
+            if validation.skip:
+                return func(*args, **kwargs)
+
+        current = policy or override() or validation.default
+        if current.off and not validation.counting:
+            return func(*args, **kwargs)
+        if current.strict or current.should_check():
+            if not validation.counting:
+                _check_aware(args[:num_dt_args])
+                return func(*args, **kwargs)
+            stats.checks += 1
+            try:
+                _check_aware(args[:num_dt_args])
+            except TzNaiveError:
+                stats.failures += 1
+                raise
+        elif validation.counting:
+            stats.skipped += 1
         return func(*args, **kwargs)
+
+    inner.num_dt_args = num_dt_args
     return inner
 
 
@@ -57,9 +133,33 @@ def _check_aware_input_2args(func):
     return _check_aware_input(func, num_dt_args=2)
 
 
+def with_validation(policy: str, every: int=100) -> SimpleNamespace:
+    """Return saturn's functions, with input checks fixed at a validation
+    policy whatever the global or block setting, for a module to use as
+    `saturn = saturn.with_validation('off')`. With 'off', they're the unchecked
+    functions themselves, with no wrapper at all."""
+    import saturn as package
+
+    fixed = validation.Policy(policy, every)
+    functions = {}
+    for name, value in vars(package).items():
+        if name.startswith('_') or isinstance(value, ModuleType):
+            continue
+        # Look checked functions up here, rather than in the package, which
+        # may hold instrumented versions of them.
+        checked = globals().get(name)
+        if hasattr(checked, 'num_dt_args'):
+            if policy == 'off':
+                value = checked.__wrapped__
+            else:
+                value = _check_aware_input(checked.__wrapped__, checked.num_dt_args, fixed)
+        functions[name] = value
+    return SimpleNamespace(**functions)
+
+
 @_check_aware_output
 def datetime(year: int, month: int, day: int, hour: int=0, minute: int=0,
-             second: int=0, microsecond: int=0, tzinfo=None, tz: str='UTC') -> _datetime.datetime:
+             second: int=0, microsecond: int=0, tzinfo=None, tz: TzLike='UTC') -> _datetime.datetime:
     """Create a datetime instance, with default tzawareness at UTC. A provided
     tzinfo argument overrides a provided tz string."""
 
@@ -70,20 +170,31 @@ def datetime(year: int, month: int, day: int, hour: int=0, minute: int=0,
 
 @_check_aware_output
 def time(hour: int, minute: int=0, second: int=0,
-         microsecond: int=0, tzinfo=None, tz: str='UTC') -> _datetime.time:
+         microsecond: int=0, tzinfo=None, tz: TzLike='UTC') -> _datetime.time:
     """Create a time instance, with default tzawareness at UTC."""
     t = _datetime.time(hour, minute, second, microsecond, tzinfo)
     return t, tz
 
 
 def now() -> _datetime.datetime:
-    """Similar to datetime.datetime.utcnow, but tz-aware."""
-    # return from_datetime(datetime.datetime.utcnow().replace(tzinfo=pytz.utc))
-    return _datetime.datetime.utcnow().replace(tzinfo=pytz.utc)
+    """Similar to datetime.datetime.utcnow, but tz-aware, in datetime.timezone.utc.
+    Read from the clock in effect; see set_clock."""
+    return clocks.get_clock().now()
+
+
+def now_us() -> int:
+    """The current time in integer microseconds since the epoch, without
+    creating a datetime."""
+    return clocks.get_clock().now_us()
+
+
+def now_ns() -> int:
+    """The current time in integer nanoseconds since the epoch."""
+    return clocks.get_clock().now_ns()
 
 
 @_check_aware_output
-def combine(date_: _datetime.date, time_: _datetime.time, tz: str='UTC') -> _datetime.datetime:
+def combine(date_: _datetime.date, time_: _datetime.time, tz: TzLike='UTC') -> _datetime.datetime:
     """Similar to datetime.datetime.combine, but tz-aware.  The optional
     tz argument won't override a tz included in the time component."""
     return _datetime.datetime.combine(date_, time_), tz
@@ -97,23 +208,41 @@ def split(dt: _datetime) -> Tuple[_datetime.date, _datetime.time]:
     return dt.date(), time_
 
 
-def fix_naive(dt: TimeOrDatetime, tz: str='UTC') -> _datetime.datetime:
+def fix_naive(dt: TimeOrDatetime, tz: TzLike='UTC') -> _datetime.datetime:
     """Convert a tz-naive datetime to tz-aware. Default to UTC"""
-    return pytz.timezone(tz).localize(dt)
+    return timezones.localize(dt, tz)
+
+
+def timezone(tz: TzLike, backend: str=None) -> _datetime.tzinfo:
+    """Return the tzinfo for a timezone name, such as 'US/Eastern'. Names are
+    resolved once, and shared by every function's tz argument. backend is
+    'pytz' or 'zoneinfo'; by default, the one in effect."""
+    return timezones.get(tz, backend)
+
+
+def warm_timezones(tzs: Iterable[TzLike], backend: str=None) -> None:
+    """Resolve timezone names ahead of their first use."""
+    timezones.warm(tzs, backend)
 
 
 @_check_aware_input
-def to_str(dt: DateOrDatetime, str_format: str) -> str:
-    """Format a datetime or date as a string."""
-    return from_arrow.format_(dt, str_format)
+def to_str(dt: DateOrDatetime, str_format: str, locale: LocaleLike='en') -> str:
+    """Format a datetime or date as a string. Month and day names, meridians
+    and ordinals are in the locale, such as 'en', 'fr', 'de' or 'es'."""
+    return from_arrow.format_(dt, str_format, locale)
 
 
-def from_str(dt_str: str, str_format: str, tz: str='UTC') -> \
+def from_str(dt_str: str, str_format: str, tz: TzLike='UTC', locale: LocaleLike='en') -> \
         Union[_datetime.datetime, _datetime.datetime, _datetime.time]:
     """Format a string to datetime.  Similar to datetime.strptime. The optional
-    tz argument won't override a tz included in the string."""
-    parsed_dt = from_arrow.parse(dt_str, str_format)
+    tz argument won't override a tz included in the string. Names are read in
+    the locale, as to_str writes them."""
+    return _from_parsed(from_arrow.parse(dt_str, str_format, locale), tz)
 
+
+def _from_parsed(parsed_dt: _datetime.datetime, tz: TzLike) -> DateOrTimeOrDatetime:
+    """Helper for from_str. Convert the parser's output to a date, time, or
+    aware datetime."""
     # Return date, time, or datetime objects as appropriate.
     if not any([parsed_dt.hour, parsed_dt.minute, parsed_dt.second, parsed_dt.microsecond]):
         if parsed_dt.year == 1 and parsed_dt.month == 1 and parsed_dt.day == 1:
@@ -126,6 +255,144 @@ def from_str(dt_str: str, str_format: str, tz: str='UTC') -> \
     # We don't use the decorator here, since checking for TZ doesn't apply to Dates.
     if not parsed_dt.tzinfo:  # The time component might have a tzinfo.
         return fix_naive(parsed_dt, tz)
+    return parsed_dt
+
+
+class CompiledFormat:
+    """A from_str format string, compiled once for reuse on many strings. If
+    given a list of formats, the one that last succeeded is tried first."""
+    __slots__ = ('str_format', 'parser')
+
+    def __init__(self, str_format: Union[str, Sequence[str]], locale: LocaleLike='en'):
+        self.str_format = str_format
+        if isinstance(str_format, str):
+            self.parser = from_arrow.compile_parser(str_format, locale)
+        else:
+            self.parser = from_arrow.MultiFormatParser(str_format, locale)
+
+    def __repr__(self):
+        return 'CompiledFormat({0!r})'.format(self.str_format)
+
+    def from_str(self, dt_str: str, tz: TzLike='UTC') -> DateOrTimeOrDatetime:
+        """Same as saturn.from_str, using this format."""
+        return _from_parsed(self.parser.parse(dt_str), tz)
+
+
+def compile_format(str_format: Union[str, Sequence[str]], locale: LocaleLike='en') -> CompiledFormat:
+    """Compile a from_str format string, for parsing many strings with the same
+    format. Compiled patterns are shared with from_str through an LRU cache
+    keyed by format and locale. A list of formats compiles to a parser that
+    tries the last successful format first."""
+    return CompiledFormat(str_format, locale)
+
+
+def infer_format(samples: Iterable[str], candidates: Sequence[str]=None) -> Union[str, List[str]]:
+    """Find the from_str format of a sample of strings. Return the candidate
+    that parses every sample if only one does, otherwise a list of candidates
+    ranked by how many samples they parse. Candidates default to
+    from_arrow.COMMON_FORMATS, with epoch seconds ('X') tried only when none
+    of those parses every sample."""
+    return from_arrow.infer_format(samples, candidates)
+
+
+def from_str_many(dt_strs: Iterable[str], str_format: str, tz: TzLike='UTC',
+                  out: str='datetime', locale: LocaleLike='en') -> Union[List[_datetime.datetime], array]:
+    """Parse many strings sharing one format. Unlike from_str, every result is
+    a datetime. out='datetime' returns a list of aware datetimes; 'epoch_us' an
+    array('q') of microseconds since the Unix epoch; 'numpy' a NumPy
+    datetime64[us] array of the same values, without copying."""
+    if out not in ('datetime', 'epoch_us', 'numpy'):
+        raise ValueError("out must be 'datetime', 'epoch_us' or 'numpy'.")
+
+    parser = from_arrow.compile_parser(str_format, locale)
+    parsed = map(parser.parse, dt_strs)
+    convert = _parsed_converter(parser, tz, 'datetime' if out == 'datetime' else 'epoch_us')
+
+    if out == 'datetime':
+        return list(parsed) if convert is None else list(map(convert, parsed))
+    epochs = array('q', map(convert, parsed))
+    if out == 'numpy':
+        return _import_numpy().frombuffer(epochs, dtype='datetime64[us]')
+    return epochs
+
+
+def _parsed_converter(parser: 'from_arrow.Parser', tz: TzLike, out: str) -> Any:
+    """The function turning parser's results into aware datetimes in tz, for
+    out='datetime', or microseconds since the epoch, for 'epoch_us'. None if
+    they need no conversion. Whether they need tz applied is decided by the
+    format, once."""
+    if parser.aware:
+        if out == 'datetime':
+            return None
+        return lambda dt: (dt - _EPOCH) // _MICROSECOND
+
+    localize = timezones.localizer(tz)
+    if out == 'datetime':
+        return localize
+    if timezones.get(tz).utcoffset(None) == _datetime.timedelta(0):
+        return lambda dt: (dt - _EPOCH_NAIVE) // _MICROSECOND
+    return lambda dt: (localize(dt) - _EPOCH) // _MICROSECOND
+
+
+def compile_formatter(str_format: str, locale: LocaleLike='en') -> 'from_arrow.Formatter':
+    """Compile a to_str format string, for formatting many datetimes. The
+    result's format method is equivalent to to_str. Compiled formatters are
+    shared with to_str through an LRU cache keyed by format and locale."""
+    return from_arrow.compile_formatter(str_format, locale)
+
+
+def get_locale(name: LocaleLike='en') -> 'from_arrow.Locale':
+    """Return the Locale for a name such as 'fr', 'de_DE' or 'es-MX'. Each
+    locale's month and day name lookups and parsing regexes are built once,
+    and shared by every format using it."""
+    return from_arrow.get_locale(name)
+
+
+def write_formatted(values: Iterable[Any], str_format: str, stream: Any, tz: TzLike='UTC',
+                    sep: str='\n', locale: LocaleLike='en') -> None:
+    """Format many datetimes with a to_str format, writing each, followed by
+    sep, to a text stream such as a file or io.StringIO. values are aware
+    datetimes, checked as the validation policy says; a DatetimeArray; or microseconds since the epoch, as an
+    iterable of ints, array('q'), buffer of int64s or NumPy array, written in
+    tz. Consecutive values on the same day, hour or minute, as the format
+    needs, share the rendering of the format's start: sorted values format
+    fastest."""
+    formatter = from_arrow.compile_formatter(str_format, locale)
+    epochs = getattr(values, 'epochs_us', None)
+    if epochs is not None:
+        values, tz = epochs, values.tz
+    elif not _is_numpy(values) and not isinstance(values, (array, memoryview, bytes, bytearray)):
+        values = iter(values)
+        first = next(values, None)
+        if first is None:
+            return
+        values = itertools.chain([first], values)
+        if not isinstance(first, numbers.Integral):
+            # Check every value under the strict policy; otherwise the first,
+            # when the policy calls for a check.
+            policy = validation.current()
+            if policy.strict:
+                values = _each_aware(values)
+            elif policy.should_check():
+                _check_aware((first,))
+            formatter.write_datetimes(values, stream.write, sep)
+            return
+    local, offsets, _ = move_tz_many(values, tz)
+    if _is_numpy(local):
+        local, offsets = local.tolist(), offsets.tolist()
+    formatter.write_epochs(local, offsets, stream.write, sep)
+
+
+def cache_info() -> Dict[str, Any]:
+    """Return hit and miss statistics for saturn's format caches."""
+    return {'parser': from_arrow.compile_parser.cache_info(),
+            'formatter': from_arrow.compile_formatter.cache_info()}
+
+
+def clear_caches() -> None:
+    """Empty saturn's format caches."""
+    from_arrow.compile_parser.cache_clear()
+    from_arrow.compile_formatter.cache_clear()
 
 
 @_check_aware_input
@@ -136,7 +403,7 @@ def to_iso(dt: DateOrDatetime) -> str:
 
 
 @_check_aware_output
-def from_iso(iso_str: str, tz: str='UTC') -> _datetime.datetime:
+def from_iso(iso_str: str, tz: TzLike='UTC') -> _datetime.datetime:
     """Convert an ISO 8601 string to a datetime.  The optional
     tz argument won't override a tz included in the string."""
     return from_arrow.parse_iso(iso_str), tz
@@ -147,81 +414,513 @@ def to_epoch(dt: DateOrDatetime) -> float:
     return dt.timestamp()
 
 
-@_check_aware_output
-def from_epoch(epoch: float, tz: str='UTC') -> _datetime.datetime:
-    return _datetime.datetime.fromtimestamp(epoch), tz
+def from_epoch(epoch: float, tz: TzLike='UTC') -> _datetime.datetime:
+    """Convert seconds since the Unix epoch to a datetime in tz. The result
+    doesn't depend on the host's timezone."""
+    return _datetime.datetime.fromtimestamp(epoch, timezones.get(tz))
+
+
+@_check_aware_input
+def to_epoch_us(dt: DateOrDatetime) -> int:
+    """Return microseconds since the Unix epoch, as an exact integer. Dates
+    count from midnight UTC."""
+    return _epoch_us(dt)
 
 
-def move_tz(dt: _datetime.datetime, tz: str) -> _datetime.datetime:
+@_check_aware_input
+def to_epoch_ns(dt: DateOrDatetime) -> int:
+    """Return nanoseconds since the Unix epoch, as an exact integer. Dates
+    count from midnight UTC."""
+    return _epoch_us(dt) * 1000
+
+
+def from_epoch_us(epoch_us: int, tz: TzLike='UTC') -> _datetime.datetime:
+    """Convert microseconds since the Unix epoch to a datetime in tz."""
+    return (_EPOCH + _datetime.timedelta(microseconds=epoch_us)).astimezone(timezones.get(tz))
+
+
+def _epochs_view(values) -> Any:
+    """Integer epochs, without copying them where possible. NumPy arrays and
+    iterables of ints are returned as is; other buffers are viewed as int64s,
+    bytes being read as native-endian int64s."""
+    if _is_numpy(values):
+        return values
+    try:
+        view = memoryview(values)
+    except TypeError:
+        return values
+    if view.format == 'q':
+        return view
+    if view.itemsize == 1:
+        return view.cast('B').cast('q')
+    raise TypeError("Epoch buffers must hold int64s, not format {0!r}.".format(view.format))
+
+
+def to_epoch_us_many(dts: Iterable[DateOrDatetime]) -> Any:
+    """Convert many datetimes to microseconds since the Unix epoch. Return an
+    array('q'), or, given a NumPy datetime64 array, a NumPy int64 array; one
+    already in microseconds is viewed without copying."""
+    if _is_numpy(dts):
+        return _numpy_epochs_us(dts)
+    try:
+        return array('q', map(_epoch_us, dts))
+    except TypeError:
+        if isinstance(dts, abc.Sequence):
+            _check_aware(dts)
+        raise
+
+
+def from_epoch_us_many(epochs_us: Iterable[int], tz: TzLike='UTC', out: str='datetime') -> Any:
+    """Convert microseconds since the Unix epoch, from an iterable of ints,
+    array('q'), buffer of int64s or NumPy array, to datetimes. out='datetime'
+    returns a list of aware datetimes in tz; 'numpy' a NumPy datetime64[us]
+    array, in UTC, viewing the input without copying it."""
+    if out not in ('datetime', 'numpy'):
+        raise ValueError("out must be 'datetime' or 'numpy'.")
+    epochs_us = _epochs_view(epochs_us)
+
+    if out == 'numpy':
+        if _is_numpy(epochs_us):
+            return _numpy_epochs_us(epochs_us).view('datetime64[us]')
+        if not isinstance(epochs_us, memoryview):
+            epochs_us = array('q', epochs_us)
+        return _import_numpy().frombuffer(epochs_us, dtype='datetime64[us]')
+
+    if _is_numpy(epochs_us):
+        epochs_us = _numpy_epochs_us(epochs_us).tolist()
+    tzinfo, delta = timezones.get(tz), _datetime.timedelta
+    if timezones.transitions(tz) is None:
+        # A fixed offset: adding to the epoch in tz needs no conversion.
+        epoch = _EPOCH.astimezone(tzinfo)
+        return [epoch + delta(microseconds=us) for us in epochs_us]
+    return [(_EPOCH + delta(microseconds=us)).astimezone(tzinfo) for us in epochs_us]
+
+
+def move_tz(dt: _datetime.datetime, tz: TzLike) -> _datetime.datetime:
     """Change a datetime from one timezone to another."""
     # Datetime provides a ValueError if you use this function on a naive DT, so
     # no need to explicitly raise an error here.
-    return dt.astimezone(pytz.timezone(tz))
-
-
-def _count_timedelta(delta: _datetime.timedelta, step: int, seconds_in_interval: int) -> int:
-    """Helper function for iterate.  Finds the number of intervals in the timedelta."""
-    return int(delta.total_seconds() / (seconds_in_interval * step))
+    return dt.astimezone(timezones.get(tz))
+
+
+def _is_numpy(values) -> bool:
+    return type(values).__module__ == 'numpy'
+
+
+def _numpy_epochs_us(values) -> Any:
+    """View a NumPy array of integers or datetime64s as int64 microseconds."""
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[us]', copy=False).view('int64')
+    return values.astype('int64', copy=False)
+
+
+def _fixed_offset(tz: TzLike) -> Tuple[int, bool]:
+    """The UTC offset, in microseconds, and DST flag of a zone without
+    transitions."""
+    tzinfo = timezones.get(tz)
+    return tzinfo.utcoffset(None) // _MICROSECOND, bool(tzinfo.dst(None))
+
+
+def move_tz_many(epochs_us: Iterable[int], tz: TzLike) -> Tuple[Any, Any, Any]:
+    """Convert UTC times, as microseconds since the epoch, to wall-clock times
+    in tz, without creating datetimes. Return the wall-clock times and UTC
+    offsets, in microseconds, and whether DST was in effect. These are
+    array('q'), array('q') and array('b'), or NumPy arrays if given one.
+    Buffers of int64s are read without copying."""
+    epochs_us = _epochs_view(epochs_us)
+    table = timezones.transitions(tz)
+
+    if _is_numpy(epochs_us):
+        numpy = _import_numpy()
+        epochs = _numpy_epochs_us(epochs_us)
+        if table is None:
+            offset, dst = _fixed_offset(tz)
+            return epochs + offset, numpy.full(len(epochs), offset, 'int64'), numpy.full(len(epochs), dst)
+        i = numpy.maximum(numpy.searchsorted(numpy.array(table.utc), epochs, side='right') - 1, 0)
+        offsets = numpy.array(table.offsets)[i]
+        return epochs + offsets, offsets, (numpy.array(table.dsts) != 0)[i]
+
+    local, offsets, dsts = array('q'), array('q'), array('b')
+    if table is None:
+        offset, dst = _fixed_offset(tz)
+        local.extend(epoch + offset for epoch in epochs_us)
+        offsets.extend([offset] * len(local))
+        dsts.extend([dst] * len(local))
+        return local, offsets, dsts
+
+    utc, n = table.utc, len(table.utc)
+    # The table entry of the last epoch, and the span of UTC times it covers.
+    # Sorted or clustered inputs rarely leave it.
+    start = end = offset = dst = 0
+    for epoch in epochs_us:
+        if not start <= epoch < end:
+            i = max(bisect_right(utc, epoch) - 1, 0)
+            start = utc[i] if i else -float('inf')
+            end = utc[i + 1] if i + 1 < n else float('inf')
+            offset, dst = table.offsets[i], table.dsts[i] != 0
+        local.append(epoch + offset)
+        offsets.append(offset)
+        dsts.append(dst)
+    return local, offsets, dsts
+
+
+def localize_many(local_epochs_us: Iterable[int], tz: TzLike, nonexistent: str='shift_forward',
+                  ambiguous: str='earliest') -> Tuple[Any, Any, Any]:
+    """Convert naive wall-clock times in tz, as microseconds since the epoch,
+    to UTC, without creating datetimes. Times DST skips or repeats are resolved
+    by the nonexistent and ambiguous policies; see timezones.WallClock. Return
+    the UTC times and UTC offsets, in microseconds, and whether DST was in
+    effect, as array('q'), array('q') and array('b'), or NumPy arrays if given
+    one. Buffers of int64s are read without copying."""
+    local_epochs_us = _epochs_view(local_epochs_us)
+    table = timezones.transitions(tz)
+
+    if _is_numpy(local_epochs_us):
+        numpy = _import_numpy()
+        local = _numpy_epochs_us(local_epochs_us)
+        if table is None:
+            offset, dst = _fixed_offset(tz)
+            return local - offset, numpy.full(len(local), offset, 'int64'), numpy.full(len(local), dst)
+        return _localize_numpy(numpy, local, table, timezones.WallClock(tz, nonexistent, ambiguous))
+
+    utc, offsets, dsts = array('q'), array('q'), array('b')
+    if table is None:
+        offset, dst = _fixed_offset(tz)
+        utc.extend(epoch - offset for epoch in local_epochs_us)
+        offsets.extend([offset] * len(utc))
+        dsts.extend([dst] * len(utc))
+        return utc, offsets, dsts
+
+    resolve = timezones.WallClock(tz, nonexistent, ambiguous).resolve
+    for epoch in local_epochs_us:
+        j, utc_us = resolve(epoch)
+        utc.append(utc_us)
+        offsets.append(table.offsets[j])
+        dsts.append(table.dsts[j] != 0)
+    return utc, offsets, dsts
+
+
+def _localize_numpy(numpy, local, table: timezones.TransitionTable,
+                    wall: timezones.WallClock) -> Tuple[Any, Any, Any]:
+    """Helper for localize_many: WallClock.resolve, over a NumPy array."""
+    utc = numpy.array(table.utc)
+    offsets = numpy.array(table.offsets)
+    n = len(utc)
+    next_utc = numpy.append(utc[1:], numpy.iinfo('int64').max)
+
+    # As in WallClock.resolve, only entries next to each time's position apply.
+    i = numpy.searchsorted(utc, local, side='right') - 1
+    nearby = [i - 1, i, i + 1]
+    in_table = [(j >= 0) & (j < n) for j in nearby]
+    nearby = [numpy.clip(j, 0, n - 1) for j in nearby]
+    found = [ok & (utc[j] <= local - offsets[j]) & (local - offsets[j] < next_utc[j])
+             for ok, j in zip(in_table, nearby)]
+    count = sum(f.astype('int8') for f in found)
+
+    if wall.ambiguous == 'earliest':
+        j = numpy.where(found[0], nearby[0], numpy.where(found[1], nearby[1], nearby[2]))
+    else:
+        j = numpy.where(found[2], nearby[2], numpy.where(found[1], nearby[1], nearby[0]))
+    result = local - offsets[j]
+
+    ambiguous = count > 1
+    if wall.ambiguous == 'raise' and ambiguous.any():
+        raise pytz.AmbiguousTimeError(local[ambiguous][0])
+
+    skipped = count == 0
+    if skipped.any():
+        if wall.nonexistent == 'raise':
+            raise pytz.NonExistentTimeError(local[skipped][0])
+        # Clocks went forward at entry k, skipping the time.
+        gaps = [ok & (k > 0) & (utc[k] + offsets[k - 1] <= local) & (local < utc[k] + offsets[k])
+                for ok, k in zip(in_table, nearby)]
+        k = numpy.where(gaps[0], nearby[0], numpy.where(gaps[1], nearby[1], nearby[2]))
+        if wall.nonexistent == 'shift_forward':
+            j = numpy.where(skipped, k, j)
+            result = numpy.where(skipped, utc[k], result)
+        else:
+            j = numpy.where(skipped, k - 1, j)
+            result = numpy.where(skipped, utc[k] - 1, result)
+
+    return result, offsets[j], (numpy.array(table.dsts) != 0)[j]
+
+
+def _epoch_us(dt: DateOrDatetime) -> int:
+    """Microseconds since the Unix epoch. Dates count from midnight UTC."""
+    if type(dt) == _datetime.date:
+        return (dt - _EPOCH.date()) // _MICROSECOND
+    return (dt - _EPOCH) // _MICROSECOND
 
 
 @_check_aware_input
 def add(dt: DateOrDatetime, days: float=0, seconds: float=0, microseconds: float=0,
         milliseconds: float=0, minutes: float=0, hours: float=0, weeks: float=0) -> DateOrDatetime:
-    return dt + timedelta(days=days, seconds=seconds, microseconds=microseconds,
-                          milliseconds=milliseconds, minutes=minutes, hours=hours,
-                          weeks=weeks)
+    dt, tz = timezones.pin_offset(dt)
+    dt = dt + timedelta(days=days, seconds=seconds, microseconds=microseconds,
+                        milliseconds=milliseconds, minutes=minutes, hours=hours,
+                        weeks=weeks)
+    return dt if tz is None else dt.astimezone(tz)
 
 
 @_check_aware_input
 def subtract(dt: DateOrDatetime, days: float=0, seconds: float=0, microseconds: float=0,
              milliseconds: float=0, minutes: float=0, hours: float=0, weeks: float=0) -> DateOrDatetime:
-    return dt - timedelta(days=days, seconds=seconds,
-                          microseconds=microseconds,
-                          milliseconds=milliseconds, minutes=minutes,
-                          hours=hours,
-                          weeks=weeks)
+    dt, tz = timezones.pin_offset(dt)
+    dt = dt - timedelta(days=days, seconds=seconds,
+                        microseconds=microseconds,
+                        milliseconds=milliseconds, minutes=minutes,
+                        hours=hours,
+                        weeks=weeks)
+    return dt if tz is None else dt.astimezone(tz)
+
+
+def _add_months(dt: DateOrDatetime, months: int) -> DateOrDatetime:
+    """Move a date or datetime by a number of calendar months, clamping the day
+    to the end of shorter months."""
+    month = dt.month - 1 + months
+    year, month = dt.year + month // 12, month % 12 + 1
+    return dt.replace(year=year, month=month, day=min(dt.day, calendar.monthrange(year, month)[1]))
+
+
+def _month_diff(start: DateOrDatetime, end: DateOrDatetime) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+class DatetimeRange(abc.Sequence):
+    """An evenly spaced sequence of datetimes or dates; what range_dt returns.
+    Like the builtin range, lengths, items, slices and membership are computed
+    rather than found by iterating.
+
+    Item k of the underlying progression is base + k * unit, where unit is a
+    timedelta, or a number of calendar months. This range holds items first,
+    first + stride, ... of it. With a WallClock, base is a naive wall-clock
+    time, and each item is localized in the wall clock's zone. With tz, base
+    has a fixed UTC offset, as pytz's tzinfos do, and items are converted to
+    tz; see timezones.pin_offset."""
+    __slots__ = ('_base', '_unit', '_unit_us', '_first', '_stride', '_len', '_wall', '_tz')
+
+    def __init__(self, base: DateOrDatetime, unit: Union[_datetime.timedelta, int], length: int,
+                 first: int=0, stride: int=1, wall: timezones.WallClock=None, tz: _datetime.tzinfo=None):
+        self._base = base
+        self._unit = unit
+        # None when stepping by months.
+        self._unit_us = unit // _MICROSECOND if isinstance(unit, _datetime.timedelta) else None
+        self._first = first
+        self._stride = stride
+        self._len = length
+        self._wall = wall
+        self._tz = tz
+
+    def __repr__(self):
+        if not self._len:
+            return 'DatetimeRange([])'
+        return 'DatetimeRange([{0!r}, ..., {1!r}], length={2})'.format(self[0], self[-1], self._len)
+
+    @property
+    def step(self) -> Union[_datetime.timedelta, None]:
+        """The timedelta between items, or None for ranges of calendar months."""
+        return None if self._unit_us is None else self._unit * self._stride
+
+    def _at(self, k: int) -> DateOrDatetime:
+        """Item k of the underlying progression."""
+        if self._unit_us is None:
+            dt = _add_months(self._base, self._unit * k)
+        else:
+            dt = self._base + self._unit * k
+        if self._wall is not None:
+            return self._wall.localize(dt)
+        if self._tz is not None:
+            return dt.astimezone(self._tz)
+        return dt
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        first, stride = self._first, self._stride
+        if self._wall is not None and self._unit_us is not None:
+            # While items stay in a span of local times with one UTC offset,
+            # they're found by plain aware arithmetic from an anchor in it.
+            base, unit, wall = self._base, self._unit, self._wall
+            base_us, unit_us = (base - _EPOCH_NAIVE) // _MICROSECOND, self._unit_us
+            span_start = span_end = 0
+            anchor = None
+            for k in range(first, first + stride * self._len, stride):
+                local_us = base_us + unit_us * k
+                if span_start <= local_us < span_end:
+                    yield anchor + unit * k
+                    continue
+                yield wall.localize(base + unit * k, local_us)
+                span_start, span_end, j = wall.span
+                anchor = base.replace(tzinfo=wall.tzinfo(j))
+        elif self._wall is None and self._tz is None and self._unit_us is not None:
+            base, unit = self._base, self._unit
+            for k in range(first, first + stride * self._len, stride):
+                yield base + unit * k
+        else:
+            for k in range(first, first + stride * self._len, stride):
+                yield self._at(k)
+
+    def __reversed__(self):
+        for i in range(self._len - 1, -1, -1):
+            yield self._at(self._first + self._stride * i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indexes = range(self._len)[index]
+            return DatetimeRange(self._base, self._unit, len(indexes),
+                                 self._first + self._stride * indexes.start,
+                                 self._stride * indexes.step, self._wall, self._tz)
+
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("DatetimeRange index out of range")
+        return self._at(self._first + self._stride * index)
+
+    def _index(self, value) -> Union[int, None]:
+        """Helper for __contains__ and index. value's index, or None if it
+        isn't in the range."""
+        try:
+            local = value if self._wall is None else self._wall.wall_time(value)
+            if self._unit_us is None:
+                k = _month_diff(self._base, local) // self._unit
+            else:
+                offset = (local - self._base) // _MICROSECOND
+                k = offset // self._unit_us
+        except (AttributeError, TypeError, ValueError):  # Naive or aware, date or datetime, mismatches.
+            return None
+
+        if self._wall is None and self._unit_us is not None:
+            if offset % self._unit_us:
+                return None
+            candidates = [k]
+        else:
+            # Wall-clock and month items can move from their place in the
+            # progression, by DST shifts or clamping to the month's end.
+            candidates = [k, k + 1, k - 1]
+
+        for k in candidates:
+            index, remainder = divmod(k - self._first, self._stride)
+            if not remainder and 0 <= index < self._len and self._at(k) == value:
+                return index
+        return None
+
+    def __contains__(self, value):
+        return self._index(value) is not None
+
+    def index(self, value) -> int:
+        index = self._index(value)
+        if index is None:
+            raise ValueError("{0!r} is not in range".format(value))
+        return index
+
+    def count(self, value) -> int:
+        return int(value in self)
+
+    def __eq__(self, other):
+        if not isinstance(other, DatetimeRange):
+            return NotImplemented
+        if self._len != other._len:
+            return False
+        if self._len == 0:
+            return True
+        if self._wall is None and other._wall is None and self.step is not None and other.step is not None:
+            return self[0] == other[0] and (self._len == 1 or self.step == other.step)
+        return all(a == b for a, b in zip(self, other))
+
+    def __hash__(self):
+        if self._len == 0:
+            return hash(0)
+        return hash((self._len, self[0], self[-1]))
+
+    def to_array(self, out: str='numpy') -> Any:
+        """Return every value at once: as a NumPy datetime64[us] array, or with
+        out='epoch_us', as an array('q') of microseconds since the epoch, which
+        doesn't need NumPy. Dates count from midnight UTC, as do naive
+        datetimes, which only get here with validation off."""
+        if out not in ('numpy', 'epoch_us'):
+            raise ValueError("out must be 'numpy' or 'epoch_us'.")
+
+        epoch_us = _epoch_us
+        if self._len and getattr(self[0], 'tzinfo', False) is None:
+            epoch_us = lambda dt: (dt - _EPOCH_NAIVE) // _MICROSECOND
+
+        step = self.step
+        if self._wall is None and step is not None:
+            start_us = epoch_us(self[0]) if self._len else 0
+            step_us = step // _MICROSECOND
+            if out == 'numpy':
+                numpy = _import_numpy()
+                return (numpy.arange(self._len, dtype='int64') * step_us + start_us).view('datetime64[us]')
+            return array('q', range(start_us, start_us + self._len * step_us, step_us))
+
+        epochs = array('q', [epoch_us(dt) for dt in self])
+        if out == 'numpy':
+            return _import_numpy().frombuffer(epochs, dtype='datetime64[us]')
+        return epochs
+
+
+def _count_months(start: DateOrDatetime, end: DateOrDatetime, months: int) -> int:
+    """Helper for range_dt. The number of whole steps of `months` from start
+    that don't pass end."""
+    steps = _month_diff(start, end) // months
+    last = _add_months(start, steps * months)
+    if (last > end) if months > 0 else (last < end):
+        steps -= 1
+    return max(0, steps)
 
 
 @_check_aware_input_2args
 def range_dt(start: DateOrDatetime, end: DateOrDatetime, step: int=1,
-             interval: str='day') -> Iterator[_datetime.datetime]:
-    """Iterate over datetimes or dates, similar to builtin range."""
-    intervals = partial(_count_timedelta, (end - start), step)
-
-    if interval == 'week':
-        for i in range(intervals(3600 * 24 * 7)):
-            yield start + _datetime.timedelta(weeks=i) * step
-
-    elif interval == 'day':
-        for i in range(intervals(3600 * 24)):
-            yield start + _datetime.timedelta(days=i) * step
-
-    elif interval == 'hour':
-        for i in range(intervals(3600)):
-            yield start + _datetime.timedelta(hours=i) * step
-
-    elif interval == 'minute':
-        for i in range(intervals(60)):
-            yield start + _datetime.timedelta(minutes=i) * step
-
-    elif interval == 'second':
-        for i in range(intervals(1)):
-            yield start + _datetime.timedelta(seconds=i) * step
-
-    elif interval == 'millisecond':
-        for i in range(intervals(1 / 1000)):
-            yield start + _datetime.timedelta(milliseconds=i) * step
-
-    elif interval == 'microsecond':
-        for i in range(intervals(1e-6)):
-            yield start + _datetime.timedelta(microseconds=i) * step
-
+             interval: str='day', wall_clock: bool=False, nonexistent: str='shift_forward',
+             ambiguous: str='earliest') -> DatetimeRange:
+    """Iterate over datetimes or dates, similar to builtin range. The result
+    supports len, indexing, slicing, `in` and reversed without iterating.
+
+    With wall_clock=True, 'week', 'day' and 'month' steps keep the same local
+    time of day across DST changes, rather than the same UTC offset. Local times
+    that DST skips or repeats are resolved by the nonexistent and ambiguous
+    policies; see timezones.WallClock."""
+    if interval == 'month':
+        unit = step
+    else:
+        try:
+            unit = _datetime.timedelta(microseconds=_INTERVAL_MICROSECONDS[interval] * step)
+        except KeyError:
+            raise AttributeError("Interval must be one of {0}.".format(
+                ', '.join(list(_INTERVAL_MICROSECONDS) + ['month'])))
+
+    wall = None
+    if wall_clock:
+        if interval not in ('week', 'day', 'month'):
+            raise ValueError("wall_clock only applies to 'week', 'day' and 'month' intervals.")
+        if isinstance(start, _datetime.datetime) and timezones.transitions(start.tzinfo) is not None:
+            wall = timezones.WallClock(start.tzinfo, nonexistent, ambiguous)
+            start, end = start.replace(tzinfo=None), wall.wall_time(end)
+    tz = None
+    if wall is None:
+        start, tz = timezones.pin_offset(start)
+
+    if interval == 'month':
+        length = _count_months(start, end, unit)
     else:
-        raise AttributeError("Interval must be 'week', 'day', 'hour' 'second', \
-            'microsecond' or 'millisecond'.")
+        length = max(0, ((end - start) // _MICROSECOND) // (unit // _MICROSECOND))
+    return DatetimeRange(start, unit, length, wall=wall, tz=tz)
 
 
 def overlaps(start1: DateOrTimeOrDatetime, end1: DateOrTimeOrDatetime,
              start2: DateOrTimeOrDatetime, end2: DateOrTimeOrDatetime) -> bool:
     """Return True if the Two dts overlap False otherwise."""
     return (start1 <= end2 and end1 >= start2) or (start2 <= end1 and end2 >= start1)
+
+
+@_check_aware_input_2args
+def range_array(start: DateOrDatetime, end: DateOrDatetime, step: int=1,
+                interval: str='day', out: str='numpy') -> Any:
+    """Like range_dt, but return all values at once: as a NumPy datetime64[us]
+    array, or with out='epoch_us', as an array('q') of microseconds since the
+    epoch, which doesn't need NumPy. Dates count from midnight UTC."""
+    # The unchecked range_dt, so only this function's wrapper decides whether
+    # to check, as with_validation expects.
+    return range_dt.__wrapped__(start, end, step, interval).to_array(out)
@@ -1,5 +1,13 @@
 import datetime
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from array import array
 
+import pytest
 import pytz
 
 import saturn
@@ -8,7 +16,16 @@ import saturn
 # todo directly instead of localize/astiemzone when possible.
 
 
-def test_dt_creation():
+@pytest.fixture(params=saturn.timezones.BACKENDS)
+def tz_backend(request):
+    """Run a test with each timezone backend."""
+    if request.param == 'zoneinfo':
+        pytest.importorskip('zoneinfo')
+    with saturn.tz_backend(request.param):
+        yield request.param
+
+
+def test_dt_creation(tz_backend):
     dt = saturn.datetime(2016, 1, 1, 16, 9, 30, 10, tz='US/Eastern')
     assert dt == pytz.timezone('US/Eastern').localize(
         datetime.datetime(2016, 1, 1, 16, 9, 30, 10))
@@ -24,13 +41,13 @@ def test_saturn_creation_with_tzinfo():
     assert dt == baseline
 
 
-def test_time_creation():
+def test_time_creation(tz_backend):
     time = saturn.time(12, 30, 30, 201)
     assert time == datetime.time(12, 30, 30, microsecond=201,
                                  tzinfo=pytz.utc)
 
 
-def test_fix_naive():
+def test_fix_naive(tz_backend):
     naive = datetime.datetime(year=2016, month=12, day=9, second=2)
     fixed = saturn.fix_naive(naive)
     assert fixed == datetime.datetime(2016, 12, 9, 0, 0, 2, tzinfo=pytz.utc)
@@ -46,6 +63,48 @@ def test_move():
     assert moved == baseline_moved
 
 
+def test_move_zoneinfo():
+    zoneinfo = pytest.importorskip('zoneinfo')
+    with saturn.tz_backend('zoneinfo'):
+        dt = saturn.datetime(1293, 1, 1, tz='Asia/Gaza')
+        moved = saturn.move_tz(dt, 'Europe/Vatican')
+    # pytz rounds local mean time offsets to whole minutes; zoneinfo doesn't.
+    baseline_moved = datetime.datetime(1293, 1, 1, tzinfo=zoneinfo.ZoneInfo('Asia/Gaza')).astimezone(
+        zoneinfo.ZoneInfo('Europe/Vatican'))
+    assert moved == baseline_moved
+    assert moved.tzinfo is zoneinfo.ZoneInfo('Europe/Vatican')
+
+
+def test_timezone_registry(tz_backend):
+    saturn.warm_timezones(['US/Eastern', 'Asia/Tokyo'])
+    eastern = saturn.timezone('US/Eastern')
+    assert eastern is saturn.timezone('US/Eastern', tz_backend)
+    if tz_backend == 'pytz':
+        assert eastern is pytz.timezone('US/Eastern')
+    else:
+        assert eastern is pytest.importorskip('zoneinfo').ZoneInfo('US/Eastern')
+    assert saturn.timezone(eastern) is eastern
+
+    # tz arguments accept tzinfo objects as well as names.
+    offset = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+    assert saturn.datetime(2016, 1, 1, tz=offset) == datetime.datetime(2016, 1, 1, tzinfo=offset)
+    assert saturn.move_tz(saturn.datetime(2016, 1, 1), eastern) == saturn.datetime(2016, 1, 1)
+
+    # Parsed offsets share one tzinfo.
+    dt1 = saturn.from_iso('2016-04-29T20:12:05+05:30')
+    dt2 = saturn.from_str('2016-04-30 01:00 +05:30', 'YYYY-MM-DD HH:mm ZZ')
+    assert dt1.tzinfo is dt2.tzinfo
+
+    # Parsed zone names resolve in the backend in effect, not the one that
+    # first parsed them.
+    for backend in ['pytz', 'zoneinfo']:
+        with saturn.timezones.tz_backend(backend):
+            parsed = saturn.from_arrow.parse_tzinfo('Asia/Tokyo')
+            assert parsed is saturn.timezone('Asia/Tokyo', backend)
+    saturn.timezones.clear()
+    assert not saturn.timezones._parsed
+
+
 def test_to_str():
     format_str = 'dddd MMMM d, YYYY. hh:mm::ss. ZZ'
     formatted = saturn.to_str(saturn.datetime(2009, 2, 3, hour=20, minute=31, second=2),
@@ -53,14 +112,318 @@ def test_to_str():
     assert formatted == 'Tuesday February 2, 2009. 08:31::02. -00:00'
 
 
-def from_str():
+def test_compile_formatter():
+    dt = saturn.datetime(2009, 2, 3, 20, 31, 2, 12345, tz='US/Eastern')
+    format_str = 'dddd Do MMM, h:mm:ss.SSS a ZZ Z X DDDD YY'
+    formatter = saturn.compile_formatter(format_str)
+    assert formatter.format(dt) == saturn.to_str(dt, format_str)
+    assert formatter.format(dt) == \
+        'Tuesday 3rd Feb, 8:31:02.012 pm -05:00 -0500 1233711062 034 09'
+
+    assert saturn.compile_formatter(format_str) is formatter
+    assert saturn.cache_info()['formatter'].hits >= 1
+
+
+def test_locales(tz_backend):
+    dt = saturn.datetime(2016, 2, 1, 15, 4, tz='Europe/Paris')
+    format_str = 'dddd Do MMMM YYYY (ddd D MMM), HH:mm'
+    expected = {
+        'en': 'Monday 1st February 2016 (Mon 1 Feb), 15:04',
+        'fr': 'lundi 1er février 2016 (lun 1 févr), 15:04',
+        'de': 'Montag 1. Februar 2016 (Mo 1 Feb), 15:04',
+        'es': 'lunes 1º febrero 2016 (lun 1 feb), 15:04',
+    }
+    for locale, string in expected.items():
+        assert saturn.to_str(dt, format_str, locale=locale) == string
+        assert saturn.compile_formatter(format_str, locale).format(dt) == string
+        assert saturn.from_str(string, format_str, tz='Europe/Paris', locale=locale) == dt
+        assert saturn.compile_format(format_str, locale).from_str(string, 'Europe/Paris') == dt
+
+    assert saturn.from_str('23e décembre 2016', 'Do MMMM YYYY', locale='fr') == saturn.date(2016, 12, 23)
+    assert saturn.from_str('3. März 2016', 'Do MMMM YYYY', locale='de') == saturn.date(2016, 3, 3)
+    assert saturn.from_str('DIC 2016', 'MMM YYYY', locale='es') == saturn.date(2016, 12, 1)
+    assert saturn.to_str(dt, 'h:mm a', locale='es') == '3:04 pm'
+    with pytest.raises(saturn.from_arrow.ParserError):
+        saturn.from_str('February 2016', 'MMMM YYYY', locale='fr')
+    # French and German have no AM/PM markers, so 12-hour formats are refused.
+    for locale in ['fr', 'de']:
+        with pytest.raises(ValueError, match='AM/PM'):
+            saturn.to_str(dt, 'h:mm a', locale=locale)
+        with pytest.raises(saturn.from_arrow.ParserError, match='AM/PM'):
+            saturn.from_str('3:04 PM', 'h:mm A', locale=locale)
+
+    # Locales are singletons, whatever the spelling of their names.
+    assert saturn.get_locale('fr') is saturn.get_locale('fr-FR') is saturn.get_locale('FR_fr')
+    assert saturn.get_locale(saturn.get_locale('de')) is saturn.get_locale('de')
+    with pytest.raises(ValueError):
+        saturn.get_locale('xx')
+
+    # Compiled formats are cached by format and locale.
+    assert saturn.compile_formatter(format_str, 'fr') is saturn.compile_formatter(format_str, 'fr')
+    assert saturn.compile_formatter(format_str, 'fr') is not saturn.compile_formatter(format_str, 'de')
+    assert saturn.compile_format(format_str, 'es').parser is saturn.compile_format(format_str, 'es').parser
+
+
+def test_write_formatted(tz_backend):
+    start = saturn.datetime(1969, 12, 31, 23, tz='US/Eastern')
+    dts = [saturn.add(start, seconds=seconds, microseconds=seconds * 7) for seconds in range(0, 10**6, 997)]
+    dts += [saturn.datetime(2016, 11, 6, 5, 59, 59), saturn.datetime(2016, 11, 6, 6, 0, 1)]
+    dts = [saturn.move_tz(dt, 'US/Eastern') for dt in dts]
+    for str_format in ['YYYY-MM-DD HH:mm:ss', 'YYYY-MM-DDTHH:mm:ss.SSSSSSZZ', 'dddd Do MMM, h:mm:ss.SSS a Z X',
+                       'ss DDDD YY HH', 'YYYYMMDD', 'HH:mm [on] MMMM']:
+        expected = ''.join(saturn.to_str(dt, str_format) + '\n' for dt in dts)
+        for values in [dts, saturn.to_epoch_us_many(dts), saturn.DatetimeArray.from_datetimes(dts)]:
+            stream = io.StringIO()
+            saturn.write_formatted(values, str_format, stream, tz='US/Eastern')
+            assert stream.getvalue() == expected
+
+    stream = io.StringIO()
+    saturn.write_formatted(iter([0, 1500000]), 'HH:mm:ss.S', stream, tz='Asia/Kolkata', sep=';')
+    saturn.write_formatted([], 'HH', stream)
+    assert stream.getvalue() == '05:30:00.0;05:30:01.5;'
+
+    naive = datetime.datetime(2018, 1, 1)
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.write_formatted([naive], 'HH', io.StringIO())
+    # Under the strict default every value is checked, not just the first.
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.write_formatted([dts[0], naive], 'HH', io.StringIO())
+    with saturn.validation_policy('sampled', every=10**6):
+        saturn.write_formatted([dts[0], naive], 'HH', io.StringIO())
+    with saturn.validation_policy('off'):
+        saturn.write_formatted([naive], 'HH', io.StringIO())
+
+    numpy = pytest.importorskip('numpy')
+    stream = io.StringIO()
+    saturn.write_formatted(list(numpy.array([0, 1500000])), 'HH:mm:ss.S', stream, tz='Asia/Kolkata', sep=';')
+    assert stream.getvalue() == '05:30:00.0;05:30:01.5;'
+
+
+def test_fast_paths_match_general(tz_backend):
+    """Formats compiled to strftime or to a slicing parser give what the
+    token emitters and regex would."""
+    from_arrow = saturn.from_arrow
+    rng = random.Random(23)
+    dts = [datetime.datetime(rng.choice([1, 999, 1000, 1969, 2016, 9999]), rng.randrange(1, 13), rng.randrange(1, 29),
+                             rng.randrange(24), rng.randrange(60), rng.randrange(60), rng.randrange(10**6),
+                             tzinfo=pytz.utc) for _ in range(300)]
+    formats = ['YYYY-MM-DD HH:mm:ss', 'DD/MM/YYYY', 'YYYYMMDDTHHmmss.SSSSSS', 'hh:mm %, DDDD YY', 'YYYY-MM-DD HH:mm:ss.SSS']
+    formats += [token for token in from_arrow.STRFTIME_DIRECTIVES] + [token for token in from_arrow.SLICED_TOKENS]
+
+    for str_format in formats:
+        formatter = from_arrow.Formatter(str_format)
+        parser = from_arrow.Parser(str_format) if 'DDDD' not in str_format and '%' not in str_format else None
+        for dt in dts:
+            string = formatter.format(dt)
+            assert string == from_arrow._render(formatter.parts, formatter.emitters, dt)
+            if parser is not None:
+                assert parser.parse(string) == parser._build(parser.pattern.search(string))
+                assert parser.parse_exact(string) == parser._build(parser.pattern.fullmatch(string))
+
+    assert from_arrow.Formatter('YYYY-MM-DD HH:mm:ss').strftime == '%Y-%m-%d %H:%M:%S'
+    assert from_arrow.Formatter('MMMM D, YYYY ZZ').strftime is None
+    parser = from_arrow.Parser('YYYY-MM-DDTHH:mm:ss')
+    assert parser.slices is not None and from_arrow.Parser('YYYY-MM-DD ZZ').slices is None
+    # What slicing can't parse falls back to the regex, which may still match, or raise its errors.
+    assert parser.parse('at 2016-04-29t20:12:05.') == datetime.datetime(2016, 4, 29, 20, 12, 5)
+    for bad in ['2016-02-30T20:12:05', '2016-04-29T20:12:0x', '2016-04-29T20:1²:05']:
+        with pytest.raises((ValueError, from_arrow.ParserError)):
+            parser.parse(bad)
+
+
+def test_from_str():
     format_str = 'dddd MMMM d, YYYY. hh:mm::ss. ZZ'
     dt = saturn.from_str('Tuesday February 2, 2009. 08:31::02. -00:00', format_str)
     baseline = datetime.datetime(2009, 2, 1, 8, 31, 2, tzinfo=pytz.utc)
     assert dt == baseline
 
 
-def test_combine():
+def test_compile_format():
+    saturn.clear_caches()
+    parser = saturn.compile_format('YYYY-MM-DD HH:mm')
+    assert parser.from_str('2016-04-29 03:30') == saturn.from_str('2016-04-29 03:30', 'YYYY-MM-DD HH:mm')
+    assert parser.from_str('2016-04-29 03:30', tz='Africa/Cairo') == \
+        pytz.timezone('Africa/Cairo').localize(datetime.datetime(2016, 4, 29, 3, 30))
+
+    info = saturn.cache_info()['parser']
+    assert info.misses == 1
+    assert info.hits >= 1
+
+    saturn.clear_caches()
+    assert saturn.cache_info()['parser'].currsize == 0
+
+
+def test_from_str_many(tz_backend):
+    strs = ['2016-04-29 03:30', '2016-11-06 01:30', '1969-12-31 23:59']
+    format_str = 'YYYY-MM-DD HH:mm'
+    for tz in ['UTC', 'US/Eastern']:
+        dts = saturn.from_str_many(strs, format_str, tz=tz)
+        assert dts == [saturn.from_str(s, format_str, tz=tz) for s in strs]
+
+        epochs = saturn.from_str_many(strs, format_str, tz=tz, out='epoch_us')
+        assert list(epochs) == [round(dt.timestamp() * 10**6) for dt in dts]
+
+    aware = saturn.from_str_many(['2016-04-29 03:30 +02:00'], 'YYYY-MM-DD HH:mm ZZ',
+                                 tz='US/Eastern', out='epoch_us')
+    assert list(aware) == [1461893400 * 10**6]
+
+    # The epoch itself is a timestamp too.
+    assert list(saturn.from_str_many(['0', '1'], 'X', out='epoch_us')) == [0, 10**6]
+    assert saturn.from_arrow.parse('0', 'X') == datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+def test_from_str_many_numpy(tz_backend):
+    numpy = pytest.importorskip('numpy')
+    arr = saturn.from_str_many(['2016-04-29 03:30'], 'YYYY-MM-DD HH:mm', out='numpy')
+    assert arr.dtype == numpy.dtype('datetime64[us]')
+    assert arr[0] == numpy.datetime64('2016-04-29T03:30')
+
+
+def test_iter_parse_file(tmp_path, tz_backend):
+    log = tmp_path / 'app.log'
+    log.write_text('2016-04-29 03:30:00 INFO started\n'
+                   'garbage\n'
+                   '\n'
+                   '2016-02-30 03:30:00 ERROR impossible date\n'
+                   '2016-04-29 04:30:00 INFO stopped\r\n')
+    expected = [saturn.datetime(2016, 4, 29, 3, 30, tz='US/Eastern'), saturn.datetime(2016, 4, 29, 4, 30, tz='US/Eastern')]
+
+    malformed = []
+    parsed = saturn.iter_parse_file(str(log), 'YYYY-MM-DD HH:mm:ss', tz='US/Eastern', errors='collect',
+                                    malformed=malformed, chunk_size=16)
+    assert list(parsed) == expected
+    assert malformed == [(2, 'garbage'), (4, '2016-02-30 03:30:00 ERROR impossible date')]
+
+    with open(log, 'rb') as f:
+        epochs = list(saturn.iter_parse_file(f, 'YYYY-MM-DD HH:mm:ss', tz='US/Eastern', out='epoch_us', errors='skip'))
+        assert not f.closed
+    assert epochs == [saturn.to_epoch_us(dt) for dt in expected]
+
+    with pytest.raises(saturn.from_arrow.ParserError, match='Line 2'):
+        list(saturn.iter_parse_file(log, 'YYYY-MM-DD HH:mm:ss'))
+
+    csv = tmp_path / 'events.csv'
+    csv.write_text('id,when,what\n1,2016-04-29T03:30:00+02:00,a\n2,,b\n')
+    malformed = []
+    assert list(saturn.iter_parse_file(csv, 'YYYY-MM-DDTHH:mm:ssZZ', field='when', delimiter=',',
+                                       errors='collect', malformed=malformed)) == \
+        [saturn.datetime(2016, 4, 29, 1, 30)]
+    assert malformed == [(3, '2,,b')]
+    assert list(saturn.iter_parse_file(csv, 'YYYY-MM-DD', field=1, delimiter=',', errors='skip')) == \
+        [saturn.datetime(2016, 4, 29)]
+
+
+def test_cli(tmp_path):
+    from saturn import __main__ as cli
+
+    rows = ['{0},2016-{1:02d}-29 03:30:00,"note, {0}"'.format(i, i % 12 + 1) for i in range(200)]
+    csv = tmp_path / 'events.csv'
+    csv.write_text('id,when,note\n' + '\n'.join(rows) + '\n1000,,empty\n')
+    size = csv.stat().st_size
+    spans = list(cli.ranges(str(csv), 13, chunk_size=100))
+    assert spans[0][0] == 13 and spans[-1][1] == size
+    assert all(end == start for (_, end), (start, _) in zip(spans, spans[1:]))
+    assert all(csv.read_bytes()[end - 1:end] == b'\n' for _, end in spans)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [sys.executable, '-m', 'saturn', str(csv), '-c', 'when', '-i', 'YYYY-MM-DD HH:mm:ss',
+               '-f', 'US/Eastern', '-O', 'epoch_us', '--chunk-size', '100']
+    parallel = subprocess.run(command + ['-j', '2'], cwd=root, check=True, stdout=subprocess.PIPE).stdout
+    serial = subprocess.run(command + ['-j', '1'], cwd=root, check=True, stdout=subprocess.PIPE).stdout
+    assert parallel == serial
+    lines = parallel.decode().splitlines()
+    assert lines[0] == 'id,when,note'
+    assert lines[1] == '0,{0},"note, 0"'.format(saturn.to_epoch_us(saturn.datetime(2016, 1, 29, 3, 30, tz='US/Eastern')))
+    assert lines[-1] == '1000,,empty' and len(lines) == 202
+
+    jsonl = tmp_path / 'events.jsonl'
+    jsonl.write_text('{"t": "2016-04-29T03:30:00+00:00", "v": 1}\n{"t": "bad"}\n')
+    output = tmp_path / 'out.jsonl'
+    assert cli.main([str(jsonl), '-c', 't', '-t', 'Asia/Kolkata', '--errors', 'keep', '-j', '1', '-o', str(output)]) == 0
+    assert output.read_text() == '{"t": "2016-04-29T09:00:00+05:30", "v": 1}\n{"t": "bad"}\n'
+    assert cli.main([str(jsonl), '-c', 't', '-j', '1', '-o', str(output)]) == 1
+
+    # Missing input, unwritable output and malformed JSON are reported, not raised.
+    assert cli.main([str(tmp_path / 'missing.csv'), '-c', 'when', '-j', '1', '-o', str(output)]) == 1
+    assert cli.main([str(jsonl), '-c', 't', '-j', '1', '-o', str(tmp_path / 'no' / 'out.jsonl')]) == 1
+    jsonl.write_text('{"t": \n')
+    assert cli.main([str(jsonl), '-c', 't', '-j', '2', '-o', str(output)]) == 1
+
+    # Records are split at line feeds only.
+    jsonl.write_text('{"t": "2016-04-29T03:30:00+00:00", "n": "\u00e9\u2028x\u0085y"}\n', encoding='utf-8')
+    assert cli.main([str(jsonl), '-c', 't', '-j', '1', '-o', str(output)]) == 0
+    assert json.loads(output.read_text(encoding='utf-8')) == {'t': '2016-04-29T03:30:00+00:00',
+                                                              'n': '\u00e9\u2028x\u0085y'}
+
+    # Records without the column, and blank lines, pass through untouched;
+    # converted ones keep non-ASCII text and CRLF endings.
+    jsonl.write_bytes('{"other":   1, "n": "\u00e9"}\r\n\r\n{"t": "2016-04-29T03:30:00+00:00", "n": "\u00e9"}\r\n'
+                      .encode('utf-8'))
+    assert cli.main([str(jsonl), '-c', 't', '-t', 'Asia/Kolkata', '-j', '1', '-o', str(output)]) == 0
+    assert output.read_bytes().decode('utf-8') == \
+        '{"other":   1, "n": "\u00e9"}\r\n\r\n{"t": "2016-04-29T09:00:00+05:30", "n": "\u00e9"}\r\n'
+
+    # Rows with nothing to convert pass through untouched; converted ones keep
+    # their line endings.
+    crlf = tmp_path / 'crlf.csv'
+    crlf.write_bytes(b'id,when,note\r\n1,2016-04-29 03:30:00,"x"\r\n2,,"quoted"\r\n')
+    assert cli.main([str(crlf), '-c', 'when', '-i', 'YYYY-MM-DD HH:mm:ss', '-j', '1', '-o', str(output)]) == 0
+    assert output.read_bytes() == b'id,when,note\r\n1,2016-04-29T03:30:00+00:00,x\r\n2,,"quoted"\r\n'
+
+
+def test_from_iso(tz_backend):
+    assert saturn.from_iso('2016-04-29T20:12:05.000000+00:00') == \
+        datetime.datetime(2016, 4, 29, 20, 12, 5, tzinfo=pytz.utc)
+    assert saturn.from_iso('2016-04-29T20:12:05Z', tz='US/Eastern') == \
+        datetime.datetime(2016, 4, 29, 20, 12, 5, tzinfo=pytz.utc)
+    # 'Z' is UTC from the timezone backend in use.
+    assert saturn.from_iso('2016-04-29T20:12:05Z').tzinfo is saturn.timezones.get('UTC')
+    assert saturn.from_iso('2016-04-29 20:12', tz='US/Eastern') == \
+        pytz.timezone('US/Eastern').localize(datetime.datetime(2016, 4, 29, 20, 12))
+
+
+def test_parse_iso_fast_matches_general():
+    from saturn import from_arrow
+
+    for iso_str in ['2016-04-29', '2016-04-29T20:12', '2016-04-29 20:12:05',
+                    '2016-04-29T20:12:05.8', '2016-04-29T20:12:05.807558',
+                    '2016-04-29T20:12:05.807+05:30', '2016-04-29T20:12-0800',
+                    '2016-04-29T20:12:05+02']:
+        assert from_arrow.parse_iso_fast(iso_str) is not None
+        assert from_arrow.parse_iso_fast(iso_str) == from_arrow.parse_iso_general(iso_str)
+
+    # Unusual shapes go to the general parser.
+    for iso_str in ['2016/04/29', '2016-04', '2016-13-01', '2016-04-29T20:12:05.1234567']:
+        assert from_arrow.parse_iso_fast(iso_str) is None
+    assert from_arrow.parse_iso('2016/04/29') == datetime.datetime(2016, 4, 29)
+
+
+def test_infer_format():
+    assert saturn.infer_format(['2016-04-29 03:30', ' 2016-12-01 23:01 ']) == 'YYYY-MM-DD HH:mm'
+    assert saturn.infer_format(['29/04/2016', '03/04/2016']) == 'DD/MM/YYYY'
+    # Both day-first and month-first fit; the one parsing more samples ranks first.
+    assert saturn.infer_format(['03/04/2016', '04/05/2016'], ['DD/MM/YYYY', 'MM/DD/YYYY']) == \
+        ['DD/MM/YYYY', 'MM/DD/YYYY']
+    assert saturn.infer_format(['03/04/2016', '04/13/2016'], ['DD/MM/YYYY', 'MM/DD/YYYY']) == \
+        'MM/DD/YYYY'
+
+    # Digit-only samples: compact dates win over epoch seconds, which are only
+    # tried when no date format fits every sample.
+    assert saturn.infer_format(['20240101', '20161231']) == 'YYYYMMDD'
+    assert saturn.infer_format(['1461962213', '1461962214']) == 'X'
+    assert saturn.infer_format(['20240101', '1461962213']) == 'X'
+    assert saturn.infer_format(['20240101'], ['X', 'YYYYMMDD']) == ['X', 'YYYYMMDD']
+
+
+def test_compile_format_multiple():
+    parser = saturn.compile_format(['YYYY-MM-DD HH:mm', 'DD.MM.YYYY HH:mm'])
+    assert parser.from_str('29.04.2016 03:30') == saturn.datetime(2016, 4, 29, 3, 30)
+    assert parser.parser.last == 1
+    assert parser.from_str('2016-04-29 03:30') == saturn.datetime(2016, 4, 29, 3, 30)
+    assert parser.parser.last == 0
+
+
+def test_combine(tz_backend):
     date, time = datetime.date(2016, 3, 2), datetime.time(16, 30)
     baseline = datetime.datetime(2016, 3, 2, 16, 30, tzinfo=pytz.utc)
     assert saturn.combine(date, time) == baseline
@@ -76,4 +439,564 @@ def test_split():
     assert date == baseline_date
     assert time == baseline_time
 
-    # todo test iterate
+
+def test_epoch(tz_backend):
+    dt = saturn.datetime(2016, 4, 29, 20, 12, 5, 123457, tz='US/Eastern')
+    assert saturn.to_epoch_us(dt) == 1461975125123457
+    assert saturn.to_epoch_ns(dt) == 1461975125123457000
+    assert saturn.to_epoch_us(datetime.date(1969, 12, 31)) == -86400 * 10**6
+    # Far from the epoch, floats can't hold every microsecond.
+    far = saturn.datetime(9999, 12, 31, 23, 59, 59, 999999)
+    assert saturn.from_epoch_us(saturn.to_epoch_us(far)) == far
+
+    moved = saturn.from_epoch_us(1461975125123457, 'US/Eastern')
+    assert moved == dt and moved.utcoffset() == datetime.timedelta(hours=-4)
+    assert saturn.from_epoch(1461960725) == saturn.datetime(2016, 4, 29, 20, 12, 5)
+    assert saturn.from_epoch(1461960725, 'US/Eastern').hour == 16
+
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.to_epoch_us(datetime.datetime(2016, 1, 1))
+
+
+def test_epoch_many(tz_backend):
+    dts = [saturn.datetime(2016, 11, 6, 5, 30), saturn.datetime(2016, 11, 6, 6, 30), saturn.datetime(1901, 1, 1)]
+    epochs = saturn.to_epoch_us_many(dts)
+    assert epochs == array('q', map(saturn.to_epoch_us, dts))
+
+    for tz in ['UTC', 'US/Eastern', saturn.timezones.offset(330)]:
+        expected = [saturn.move_tz(dt, tz) for dt in dts]
+        for given in [epochs, list(epochs), epochs.tobytes(), memoryview(epochs)]:
+            result = saturn.from_epoch_us_many(given, tz)
+            assert result == expected
+            assert [r.utcoffset() for r in result] == [e.utcoffset() for e in expected]
+
+    # Buffers are read in place.
+    assert list(saturn.move_tz_many(epochs.tobytes(), 'US/Eastern')[0]) == list(saturn.move_tz_many(epochs, 'US/Eastern')[0])
+    with pytest.raises(TypeError):
+        saturn.from_epoch_us_many(array('i', [1, 2]))
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.to_epoch_us_many([datetime.datetime(2016, 1, 1)])
+
+
+def test_epoch_many_numpy(tz_backend):
+    numpy = pytest.importorskip('numpy')
+    epochs = array('q', [1461975125123457, -86400 * 10**6])
+    view = saturn.from_epoch_us_many(epochs, out='numpy')
+    assert view.dtype == numpy.dtype('datetime64[us]')
+    epochs[0] = 0
+    assert view[0] == numpy.datetime64(0, 'us')
+
+    dts = numpy.array(['2016-04-29T20:12:05.123457', '1969-12-31'], dtype='datetime64[us]')
+    as_ints = saturn.to_epoch_us_many(dts)
+    assert numpy.shares_memory(as_ints, dts)
+    assert list(as_ints) == [1461960725123457, -86400 * 10**6]
+    assert saturn.from_epoch_us_many(as_ints) == [saturn.from_epoch_us(e) for e in as_ints.tolist()]
+
+
+
+def test_range_array():
+    start, end = saturn.datetime(2016, 1, 2, 12, 30), saturn.datetime(2016, 1, 5, 12, 30)
+    for step, interval in [(1, 'day'), (4, 'hour'), (7, 'minute'), (15000, 'millisecond')]:
+        epochs = saturn.range_array(start, end, step, interval, out='epoch_us')
+        assert list(epochs) == [round(dt.timestamp() * 10**6)
+                                for dt in saturn.range_dt(start, end, step, interval)]
+
+    dates = saturn.range_array(datetime.date(2016, 1, 1), datetime.date(2016, 1, 3), out='epoch_us')
+    assert list(dates) == [1451606400 * 10**6, 1451692800 * 10**6]
+
+    numpy = pytest.importorskip('numpy')
+    arr = saturn.range_array(start, end, interval='day')
+    assert arr.dtype == numpy.dtype('datetime64[us]')
+    assert list(arr) == [numpy.datetime64('2016-01-02T12:30'), numpy.datetime64('2016-01-03T12:30'),
+                         numpy.datetime64('2016-01-04T12:30')]
+
+
+def test_range_dt(tz_backend):
+    start, end = saturn.datetime(2016, 1, 2, 12, 30), saturn.datetime(2016, 1, 5, 12, 30)
+    r = saturn.range_dt(start, end, 4, interval='hour')
+    dts = list(r)
+    assert len(r) == len(dts) == 18
+    assert dts[0] == start and dts[-1] == saturn.datetime(2016, 1, 5, 8, 30)
+    assert list(reversed(r)) == dts[::-1]
+    assert [r[i] for i in range(-len(r), len(r))] == dts + dts
+    assert list(r[3:12:2]) == dts[3:12:2]
+    assert list(r[::-3]) == dts[::-3]
+
+    assert saturn.datetime(2016, 1, 3, 4, 30) in r
+    assert r.index(saturn.datetime(2016, 1, 3, 0, 30, tz='Etc/GMT+4')) == 4
+    assert saturn.datetime(2016, 1, 3, 5, 30) not in r
+    assert end not in r
+    assert datetime.datetime(2016, 1, 3, 4, 30) not in r
+    with pytest.raises(IndexError):
+        r[18]
+
+    # Counts are exact, where float division used to drop the last element.
+    ms = saturn.range_dt(start, saturn.add(start, days=1000), 7, 'millisecond')
+    assert len(ms) == 1000 * 24 * 3600 * 1000 // 7
+    assert ms[-1] == saturn.add(start, milliseconds=7 * (len(ms) - 1))
+
+    days = saturn.range_dt(datetime.date(2016, 1, 1), datetime.date(2016, 2, 1), 7)
+    assert list(days) == [datetime.date(2016, 1, d) for d in [1, 8, 15, 22]]
+    assert datetime.date(2016, 1, 22) in days
+
+
+def test_range_dt_wall_clock(tz_backend):
+    eastern = pytz.timezone('US/Eastern')
+    start = saturn.datetime(2016, 3, 10, 9, tz='US/Eastern')
+    days = saturn.range_dt(start, saturn.datetime(2016, 3, 16, 9, tz='US/Eastern'), wall_clock=True)
+    assert list(days) == [eastern.localize(datetime.datetime(2016, 3, d, 9)) for d in range(10, 16)]
+    assert [days[i] for i in range(len(days))] == list(days)
+    assert days.index(eastern.localize(datetime.datetime(2016, 3, 14, 9))) == 4
+
+    # Without wall_clock, steps keep the starting UTC offset.
+    assert saturn.range_dt(start, saturn.datetime(2016, 3, 16, 9, tz='US/Eastern'))[4] == \
+        eastern.localize(datetime.datetime(2016, 3, 14, 10))
+
+    # 02:30 doesn't exist on March 13th, and 01:30 happens twice on November 6th.
+    start = saturn.datetime(2016, 3, 12, 2, 30, tz='US/Eastern')
+    end = saturn.datetime(2016, 3, 15, tz='US/Eastern')
+    assert saturn.range_dt(start, end, wall_clock=True)[1] == \
+        eastern.localize(datetime.datetime(2016, 3, 13, 3))
+    with pytest.raises(pytz.NonExistentTimeError):
+        list(saturn.range_dt(start, end, wall_clock=True, nonexistent='raise'))
+
+    start = saturn.datetime(2016, 11, 5, 1, 30, tz='US/Eastern')
+    end = saturn.datetime(2016, 11, 8, tz='US/Eastern')
+    # Compared in UTC: aware datetimes in repeated times never equal ones in
+    # other tzinfos, which zoneinfo's, unlike pytz's, are.
+    assert saturn.range_dt(start, end, wall_clock=True)[1].astimezone(pytz.utc) == \
+        eastern.localize(datetime.datetime(2016, 11, 6, 1, 30), is_dst=True)
+    assert saturn.range_dt(start, end, wall_clock=True, ambiguous='latest')[1].astimezone(pytz.utc) == \
+        eastern.localize(datetime.datetime(2016, 11, 6, 1, 30), is_dst=False)
+
+
+def test_range_dt_months(tz_backend):
+    start = saturn.datetime(2016, 1, 31, 9, tz='US/Eastern')
+    months = saturn.range_dt(start, saturn.datetime(2016, 5, 31, 9, tz='US/Eastern'),
+                             interval='month', wall_clock=True)
+    assert list(months) == [pytz.timezone('US/Eastern').localize(datetime.datetime(2016, m, d, 9))
+                            for m, d in [(1, 31), (2, 29), (3, 31), (4, 30)]]
+    assert months[2] in months and months.index(months[3]) == 3
+
+    quarters = saturn.range_dt(datetime.date(2016, 1, 1), datetime.date(2017, 1, 1), 3, 'month')
+    assert list(quarters) == [datetime.date(2016, m, 1) for m in [1, 4, 7, 10]]
+    assert list(quarters[::-2]) == [datetime.date(2016, 10, 1), datetime.date(2016, 4, 1)]
+
+
+def test_move_tz_many(tz_backend):
+    eastern = pytz.timezone('US/Eastern')
+    dts = [saturn.datetime(2016, 11, 6, 5, 30), saturn.datetime(2016, 11, 6, 6, 30),
+           saturn.datetime(2016, 7, 1), saturn.datetime(1901, 1, 1)]
+    epochs = [round(dt.timestamp() * 10**6) for dt in dts]
+
+    local, offsets, dsts = saturn.move_tz_many(epochs, 'US/Eastern')
+    for dt, local_us, offset, dst in zip(dts, local, offsets, dsts):
+        moved = saturn.move_tz(dt, eastern)
+        assert local_us == round(moved.replace(tzinfo=pytz.utc).timestamp() * 10**6)
+        assert offset == moved.utcoffset() // datetime.timedelta(microseconds=1)
+        assert dst == bool(moved.dst())
+
+    # Both 1:30s on November 6th are the same wall-clock time.
+    assert local[0] == local[1]
+    assert list(saturn.localize_many(local, 'US/Eastern')[0]) == [epochs[0], epochs[0]] + epochs[2:]
+    assert list(saturn.localize_many(local, eastern, ambiguous='latest')[0]) == [epochs[1], epochs[1]] + epochs[2:]
+
+
+def test_bulk_tz_numpy(tz_backend):
+    numpy = pytest.importorskip('numpy')
+    local = [1457836200 * 10**6, 1457841600 * 10**6, 1478395800 * 10**6, 1467331200 * 10**6]
+    for nonexistent, ambiguous in [('shift_forward', 'earliest'), ('shift_backward', 'latest')]:
+        expected = saturn.localize_many(local, 'US/Eastern', nonexistent, ambiguous)
+        result = saturn.localize_many(numpy.array(local), 'US/Eastern', nonexistent, ambiguous)
+        assert [list(map(int, r)) for r in result] == [list(e) for e in expected]
+
+        moved = saturn.move_tz_many(numpy.array(expected[0]).view('datetime64[us]'), 'US/Eastern')
+        assert [list(map(int, r)) for r in moved] == \
+            [list(e) for e in saturn.move_tz_many(expected[0], 'US/Eastern')]
+
+
+def test_datetime_array(tz_backend):
+    dts = [saturn.datetime(2016, 11, 6, 6, 30), saturn.datetime(2016, 1, 1), saturn.datetime(2016, 11, 6, 5, 30)]
+    utc = saturn.DatetimeArray.from_datetimes(dts)
+    assert list(utc) == dts and len(utc) == 3 and utc.nbytes == 24
+    assert utc[-1] == dts[-1] and list(utc[1:]) == dts[1:] and list(utc[::2]) == dts[::2]
+
+    eastern = utc.move_tz('US/Eastern')
+    assert eastern.epochs_us.obj is utc.epochs_us.obj
+    assert [dt.utcoffset() for dt in eastern] == [saturn.move_tz(dt, 'US/Eastern').utcoffset() for dt in dts]
+    assert eastern.to_iso() == [saturn.to_iso(saturn.move_tz(dt, 'US/Eastern')) for dt in dts]
+    assert eastern.to_str('YYYY-MM-DD HH:mm ZZ')[0] == '2016-11-06 01:30 -05:00'
+    assert saturn.DatetimeArray.from_datetimes(list(eastern)).tz == eastern.tz
+
+    assert list(eastern.add(hours=1, microseconds=1)) == [saturn.add(dt, hours=1, microseconds=1) for dt in eastern]
+    assert eastern.subtract(days=1).equals(utc.add(days=-1))
+    assert eastern.equals(utc) and not eastern.equals(utc.sort())
+    assert list(utc == eastern) == [1, 1, 1]
+    assert list(utc < saturn.datetime(2016, 11, 6, 6)) == [0, 1, 1]
+    assert list(utc.sort() >= utc) == [0, 1, 1]
+    with pytest.raises(ValueError):
+        utc < utc[1:]
+
+    ordered = utc.sort()
+    assert list(ordered) == sorted(dts) and [utc[i] for i in utc.argsort()] == sorted(dts)
+    assert ordered.searchsorted(dts[2]) == 1 and ordered.searchsorted(dts[2], side='right') == 2
+    assert list(ordered.searchsorted([saturn.datetime(2015, 1, 1), saturn.datetime(2017, 1, 1)])) == [0, 3]
+    assert dts[0] in utc and saturn.datetime(2016, 1, 2) not in utc
+
+    epochs = array('q', [0, 10**6])
+    shared = saturn.DatetimeArray(epochs, 'Asia/Kolkata')
+    epochs[1] = 2 * 10**6
+    assert shared[1] == saturn.datetime(1970, 1, 1, 0, 0, 2)
+    assert saturn.DatetimeArray(epochs.tobytes()).equals(shared)
+    # The shared array can't grow while shared; a copy can.
+    with pytest.raises(BufferError):
+        epochs.append(3 * 10**6)
+    grown = epochs[:]
+    grown.append(3 * 10**6)
+    assert len(saturn.DatetimeArray(grown)) == 3
+
+
+def test_datetime_array_numpy(tz_backend):
+    numpy = pytest.importorskip('numpy')
+    values = numpy.array(['2016-01-01', '2016-07-01T06:30:00.000001'], dtype='datetime64[us]')
+    dts = saturn.DatetimeArray(values, 'US/Eastern')
+    assert numpy.shares_memory(dts.to_numpy(), values) and numpy.shares_memory(numpy.asarray(dts), values)
+    # Views are read-only, so can't change the array; copies are writable.
+    with pytest.raises(ValueError):
+        dts.to_numpy()[0] = values[1]
+    copied = numpy.array(dts, copy=True)
+    assert not numpy.shares_memory(copied, values) and copied.flags.writeable
+    copied[0] = values[1]
+    assert dts[0] == saturn.datetime(2016, 1, 1)
+    assert numpy.shares_memory(numpy.asarray(dts, copy=False), values)
+    assert numpy.asarray(dts, dtype='int64').tolist() == values.view('int64').tolist()
+    with pytest.raises(ValueError):
+        numpy.asarray(dts, dtype='int64', copy=False)
+    assert dts[1] == saturn.datetime(2016, 7, 1, 6, 30, 0, 1)
+    assert saturn.DatetimeArray(values.view('int64')).equals(dts)
+    assert list(saturn.DatetimeArray(values.astype('datetime64[s]'))) == [saturn.datetime(2016, 1, 1),
+                                                                          saturn.datetime(2016, 7, 1, 6, 30)]
+
+
+def test_interval_index():
+    rng = random.Random(11)
+    base = saturn.datetime(2018, 1, 1)
+    intervals = []
+    for i in range(300):
+        start = saturn.add(base, minutes=rng.randrange(0, 5000))
+        intervals.append((start, saturn.add(start, minutes=rng.randrange(0, 300)), i))
+
+    index = saturn.IntervalIndex(intervals[:200])
+    for interval in intervals[200:]:
+        index.insert(*interval)
+    for interval in intervals[::3]:
+        index.remove(*interval)
+    kept = [interval for i, interval in enumerate(intervals) if i % 3]
+
+    assert len(index) == len(kept)
+    assert list(index) == sorted(kept)
+    for _ in range(100):
+        start = saturn.add(base, minutes=rng.randrange(-100, 5400))
+        end = saturn.add(start, minutes=rng.randrange(0, 200))
+        assert index.overlapping(start, end) == sorted(
+            i for i in kept if saturn.overlaps(i[0], i[1], start, end))
+        assert index.containing(start) == sorted(
+            i for i in kept if saturn.overlaps(i[0], i[1], start, start))
+
+    # Ends are included, as with overlaps.
+    assert index.containing(kept[0][1])
+
+    with pytest.raises(KeyError):
+        index.remove(*intervals[0])
+
+    times = saturn.IntervalIndex([(saturn.time(9), saturn.time(12)), (saturn.time(11), saturn.time(17))])
+    assert times.containing(saturn.time(12)) == [(saturn.time(9), saturn.time(12), None),
+                                                 (saturn.time(11), saturn.time(17), None)]
+    dates = saturn.IntervalIndex([(saturn.date(2018, 1, 1), saturn.date(2018, 1, 5))])
+    assert dates.overlapping(saturn.date(2018, 1, 5), saturn.date(2018, 1, 9))
+
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        index.insert(datetime.datetime(2018, 1, 1), base)
+
+
+def test_interval_set():
+    rng = random.Random(12)
+    base = saturn.datetime(2018, 1, 1)
+
+    def random_set():
+        intervals = []
+        for _ in range(rng.randrange(0, 30)):
+            start = rng.randrange(0, 500)
+            intervals.append((start, start + rng.randrange(0, 40)))
+        minutes = {m for start, end in intervals for m in range(start, end)}
+        return saturn.IntervalSet((saturn.add(base, minutes=s), saturn.add(base, minutes=e))
+                                  for s, e in intervals), minutes
+
+    def minutes_of(interval_set):
+        found = set()
+        for start, end in interval_set:
+            found.update(range((start - base) // datetime.timedelta(minutes=1),
+                               (end - base) // datetime.timedelta(minutes=1)))
+        return found
+
+    for _ in range(50):
+        (a, a_minutes), (b, b_minutes) = random_set(), random_set()
+        assert minutes_of(a) == a_minutes
+        assert minutes_of(a | b) == a_minutes | b_minutes
+        assert minutes_of(a & b) == a_minutes & b_minutes
+        assert minutes_of(a - b) == a_minutes - b_minutes
+        assert minutes_of(a.complement(base, saturn.add(base, minutes=300))) == set(range(300)) - a_minutes
+        assert a.duration() == datetime.timedelta(minutes=len(a_minutes))
+        for result in (a | b, a & b, a - b):
+            # Sorted and coalesced: each range ends strictly before the next starts.
+            ranges = list(result)
+            assert all(end < next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+    hours = saturn.IntervalSet([(saturn.datetime(2018, 1, 1, 9), saturn.datetime(2018, 1, 1, 17))])
+    meetings = saturn.IntervalSet([(saturn.datetime(2018, 1, 1, 10), saturn.datetime(2018, 1, 1, 11)),
+                                   (saturn.datetime(2018, 1, 1, 11), saturn.datetime(2018, 1, 1, 12))])
+    assert len(meetings) == 1
+    assert list(hours - meetings) == [(saturn.datetime(2018, 1, 1, 9), saturn.datetime(2018, 1, 1, 10)),
+                                      (saturn.datetime(2018, 1, 1, 12), saturn.datetime(2018, 1, 1, 17))]
+    assert saturn.datetime(2018, 1, 1, 9) in hours
+    assert saturn.datetime(2018, 1, 1, 17) not in hours
+
+    slots = saturn.range_dt(saturn.datetime(2018, 1, 1, 9), saturn.datetime(2018, 1, 1, 17), 2, 'hour')
+    assert saturn.IntervalSet.from_range(slots) == hours
+    assert saturn.IntervalSet.from_range(slots, datetime.timedelta(hours=1)).duration() == datetime.timedelta(hours=4)
+    months = saturn.range_dt(saturn.date(2018, 1, 1), saturn.date(2018, 4, 1), interval='month')
+    assert list(saturn.IntervalSet.from_range(months)) == [(saturn.date(2018, 1, 1), saturn.date(2018, 4, 1))]
+
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.IntervalSet([(datetime.datetime(2018, 1, 1), base)])
+
+
+def test_clocks():
+    before = saturn.now_us()
+    assert saturn.now_us() <= saturn.to_epoch_us(saturn.now()) <= saturn.now_ns() // 1000 <= saturn.now_us()
+    assert saturn.now_us() - before < 10**6
+    assert isinstance(saturn.get_clock(), saturn.SystemClock)
+
+    start = saturn.datetime(2016, 4, 29, 3, 30)
+    clock = saturn.FrozenClock(start)
+    with saturn.using_clock(clock) as frozen:
+        assert frozen is clock is saturn.get_clock()
+        assert saturn.now() == start
+        assert saturn.now().utcoffset() == datetime.timedelta(0)
+        clock.advance(hours=1, microseconds=5)
+        assert saturn.now() == saturn.add(start, hours=1, microseconds=5)
+        assert saturn.now_us() == saturn.to_epoch_us(start) + 3600 * 10**6 + 5
+        assert saturn.now_ns() == saturn.now_us() * 1000
+        clock.set(saturn.to_epoch_us(start))
+        assert saturn.now() == start
+    assert isinstance(saturn.get_clock(), saturn.SystemClock)
+    with pytest.raises(ValueError):
+        saturn.FrozenClock(datetime.datetime(2016, 1, 1))
+
+    coarse = saturn.CoarseClock(granularity=60)
+    saturn.set_clock(coarse)
+    try:
+        first = saturn.now()
+        assert saturn.now() is first
+        assert saturn.now_us() == saturn.to_epoch_us(first)
+        assert saturn.get_clock() is coarse
+    finally:
+        saturn.set_clock(None)
+    assert isinstance(saturn.get_clock(), saturn.SystemClock)
+    with pytest.raises(ValueError):
+        saturn.CoarseClock(0)
+
+    with pytest.raises(TypeError):
+        saturn.Clock()
+
+    class Ticking(saturn.Clock):
+        def __init__(self):
+            self.ns = 0
+
+        def now_ns(self):
+            self.ns += 1500
+            return self.ns
+    with saturn.using_clock(Ticking()):
+        assert saturn.now_us() == 1
+        assert saturn.now() == saturn.from_epoch_us(3)
+
+    monotonic = saturn.MonotonicClock()
+    readings = [monotonic.now_ns() for _ in range(100)]
+    assert readings == sorted(readings)
+    assert abs(monotonic.now_us() - saturn.now_us()) < 10**6
+    assert monotonic.now().tzinfo is not None
+
+
+def test_validation_policy():
+    naive = datetime.datetime(2018, 1, 1)
+    # Counting is opt-in.
+    saturn.reset_validation_stats()
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.add(naive, days=1)
+    with saturn.validation_policy('sampled', every=3):
+        saturn.to_iso(saturn.datetime(2018, 1, 1))
+    assert saturn.validation_stats() == {'checks': 0, 'failures': 0, 'skipped': 0}
+    assert saturn.saturn.validation.fast
+
+    saturn.set_validation('strict', count=True)
+    assert not saturn.saturn.validation.fast
+
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.add(naive, days=1)
+    assert saturn.validation_stats() == {'checks': 1, 'failures': 1, 'skipped': 0}
+
+    with saturn.validation_policy('off'):
+        assert saturn.add(naive, days=1) == datetime.datetime(2018, 1, 2)
+        # Blocks nest, and restore the outer policy on exit.
+        with saturn.validation_policy('strict'):
+            with pytest.raises(saturn.saturn.TzNaiveError):
+                saturn.add(naive, days=1)
+        assert saturn.add(naive, days=1)
+
+    saturn.reset_validation_stats()
+    with saturn.validation_policy('sampled', every=3):
+        for _ in range(9):
+            saturn.to_iso(saturn.datetime(2018, 1, 1))
+    assert saturn.validation_stats() == {'checks': 3, 'failures': 0, 'skipped': 6}
+
+    saturn.set_validation('off')
+    assert saturn.saturn.validation.skip and not saturn.saturn.validation.fast
+    try:
+        assert saturn.add(naive, days=1)
+        with saturn.validation_policy('strict'):
+            with pytest.raises(saturn.saturn.TzNaiveError):
+                saturn.add(naive, days=1)
+    finally:
+        saturn.set_validation('strict')
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.add(naive, days=1)
+
+    unchecked = saturn.with_validation('off')
+    assert unchecked.add is saturn.add.__wrapped__
+    assert unchecked.range_dt(naive, datetime.datetime(2018, 1, 3))[-1] == datetime.datetime(2018, 1, 2)
+    assert list(unchecked.range_array(naive, datetime.datetime(2018, 1, 3), out='epoch_us')) == \
+        [1514764800000000, 1514851200000000]
+    with pytest.raises(saturn.saturn.TzNaiveError):
+        saturn.range_array(naive, datetime.datetime(2018, 1, 3))
+    assert unchecked.datetime is saturn.datetime
+    checked = saturn.with_validation('strict')
+    with saturn.validation_policy('off'):
+        with pytest.raises(saturn.saturn.TzNaiveError):
+            checked.add(naive, days=1)
+
+    with pytest.raises(ValueError):
+        saturn.set_validation('lenient')
+    assert saturn.saturn.validation.fast
+    saturn.reset_validation_stats()
+
+
+def test_benchmarks_cover_exports():
+    run = pytest.importorskip('benchmarks.run')
+    assert run.suite.uncovered(run.load()) == []
+
+
+def test_instrumentation():
+    to_str, parse = saturn.to_str, saturn.from_arrow.Parser.parse
+    saturn.reset_stats()
+    saturn.enable_instrumentation()
+    try:
+        assert saturn.instrumentation_enabled()
+        for _ in range(3):
+            saturn.to_str(saturn.datetime(2018, 1, 1, tz='US/Eastern'), 'YYYY-MM-DD')
+            saturn.from_str('2018-01-01', 'YYYY-MM-DD', tz='Europe/Berlin')
+        with pytest.raises(saturn.saturn.TzNaiveError):
+            saturn.to_str(datetime.datetime(2018, 1, 1), 'YYYY')
+
+        stats = saturn.stats()
+        assert stats['functions']['to_str']['calls'] == 4
+        assert stats['functions']['to_str']['errors'] == 1
+        assert stats['functions']['from_arrow.Parser.parse']['calls'] == 3
+        assert sum(stats['functions']['from_str']['histogram_ns'].values()) == 3
+        # Counted once per string parsed or formatted.
+        assert stats['formats'] == [('YYYY-MM-DD', 6)]
+        # Counted where zones are resolved: from_str gives dates for date-only
+        # strings, so never resolves its tz, nor does to_str its default.
+        assert dict(stats['timezones']) == {'US/Eastern': 3}
+        saturn.from_str('2018-01-01 10:00', 'YYYY-MM-DD HH:mm', tz='Europe/Berlin')
+        assert dict(saturn.stats()['timezones']) == {'US/Eastern': 3, 'Europe/Berlin': 1}
+        assert set(stats['caches']) == {'parser', 'formatter'}
+
+        text = saturn.stats_prometheus()
+        assert 'saturn_call_duration_seconds_count{function="to_str"} 4' in text
+        assert 'saturn_call_errors_total{function="to_str"} 1' in text
+        assert 'saturn_timezone_uses_total{tz="US/Eastern"} 3' in text
+    finally:
+        saturn.disable_instrumentation()
+
+    # Disabling restores the original functions.
+    assert saturn.to_str is to_str and saturn.from_arrow.Parser.parse is parse
+    assert not hasattr(saturn.timezones.get, '__wrapped__')
+    saturn.to_str(saturn.datetime(2018, 1, 1), 'YYYY')
+    assert saturn.stats()['functions']['to_str']['calls'] == 4
+    saturn.reset_stats()
+    assert saturn.stats()['functions'] == {}
+
+
+def test_lazy_imports():
+    code = ("import saturn\n"
+            "from saturn.lazy import is_loaded\n"
+            "assert not is_loaded('pytz') and not is_loaded('saturn.from_arrow')\n"
+            "saturn.now(), saturn.now_us()\n"
+            "assert not is_loaded('pytz')\n"
+            "saturn.datetime(2018, 1, 1)\n"
+            "assert is_loaded('pytz') and not is_loaded('saturn.from_arrow')\n"
+            "assert saturn.to_str(saturn.datetime(2018, 1, 1), 'YYYY') == '2018'\n"
+            "assert is_loaded('saturn.from_arrow')\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
+
+
+def test_tz_backends_agree():
+    """Both backends give the same instants, including around DST changes."""
+    pytest.importorskip('zoneinfo')
+    utc = pytz.utc
+    naives = [datetime.datetime(2016, 3, 13, 1, 59), datetime.datetime(2016, 3, 13, 2, 30),
+              datetime.datetime(2016, 11, 6, 1, 30), datetime.datetime(2016, 11, 6, 2, 30),
+              datetime.datetime(2016, 7, 1, 12), datetime.datetime(1950, 1, 1)]
+    results = {}
+    for backend in saturn.timezones.BACKENDS:
+        with saturn.tz_backend(backend):
+            assert saturn.get_tz_backend() == backend
+            found = []
+            for tz in ['US/Eastern', 'Australia/Lord_Howe', 'Europe/London', 'UTC']:
+                for naive in naives:
+                    dt = saturn.fix_naive(naive, tz)
+                    found += [dt, saturn.add(dt, hours=25), saturn.subtract(dt, days=200),
+                              saturn.move_tz(dt, 'Asia/Kolkata'), saturn.from_str(str(naive), 'YYYY-MM-DD HH:mm:ss', tz)]
+                start = saturn.datetime(2016, 3, 12, 2, 30, tz=tz)
+                end = saturn.datetime(2016, 11, 8, tz=tz)
+                found += list(saturn.range_dt(start, end, 12, 'hour'))
+                found += list(saturn.range_dt(start, end, wall_clock=True))
+                found += list(saturn.range_dt(start, end, interval='month'))
+            # from_str gives dates for midnight.
+            results[backend] = [dt.astimezone(utc) if isinstance(dt, datetime.datetime) else dt for dt in found]
+            assert saturn.now().utcoffset() == datetime.timedelta(0)
+    assert results['pytz'] == results['zoneinfo']
+
+    before = saturn.get_tz_backend()
+    with pytest.raises(ValueError):
+        saturn.set_tz_backend('dateutil')
+    assert saturn.get_tz_backend() == before
+
+
+def test_zoneinfo_optional():
+    # Without zoneinfo, as before Python 3.9, saturn works with pytz, and
+    # choosing the zoneinfo backend fails clearly.
+    code = ("import sys\n"
+            "sys.modules['zoneinfo'] = None\n"
+            "import saturn\n"
+            "assert saturn.datetime(2018, 1, 1, tz='US/Eastern').utcoffset()\n"
+            "try:\n"
+            "    saturn.set_tz_backend('zoneinfo')\n"
+            "except ImportError as e:\n"
+            "    assert 'Python 3.9' in str(e)\n"
+            "else:\n"
+            "    raise AssertionError\n"
+            "assert saturn.get_tz_backend() == 'pytz'\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
@@ -0,0 +1,301 @@
+"""A registry of tzinfo objects. Zone names and fixed UTC offsets are resolved
+once, then shared by every later call that uses them.
+
+Zone names resolve through a backend: 'pytz', the default, or 'zoneinfo', the
+standard library's zoneinfo module (Python 3.9+), which is faster. It's set
+globally with set_tz_backend, or for a block of code with tz_backend. To use a
+backend for one call, pass a tzinfo from it instead of a name. Wall-clock
+computations use pytz's transition tables, whichever the backend."""
+
+import datetime
+from bisect import bisect_right
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from saturn.lazy import lazy_import
+
+pytz = lazy_import('pytz')
+
+TzLike = Union[str, datetime.tzinfo]
+
+BACKENDS = ('pytz', 'zoneinfo')
+
+_EPOCH_NAIVE = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+_zones = {}  # By (backend, name).
+_offsets = {}  # By minutes, or by timedelta for pin_offset.
+_transitions = {}
+_parsed = {}  # from_arrow.parse_tzinfo's results, by (backend, string).
+
+_default_backend = 'pytz'
+# Set inside tz_backend blocks; takes precedence over the default.
+_backend_override = ContextVar('saturn_tz_backend', default=None)
+
+
+def _import_zoneinfo():
+    """zoneinfo is in the standard library from Python 3.9; it's only imported
+    once the zoneinfo backend is used, so older Pythons can use pytz."""
+    try:
+        import zoneinfo
+    except ImportError:
+        raise ImportError("The zoneinfo backend requires Python 3.9 or later.") from None
+    return zoneinfo
+
+
+def _check_backend(name: str) -> str:
+    if name not in BACKENDS:
+        raise ValueError("Timezone backend must be one of {0}, not {1!r}.".format(BACKENDS, name))
+    if name == 'zoneinfo':
+        _import_zoneinfo()
+    return name
+
+
+def get_tz_backend() -> str:
+    """The name of the backend in effect here."""
+    return _backend_override.get() or _default_backend
+
+
+def set_tz_backend(name: str) -> None:
+    """Set the backend used outside tz_backend blocks: 'pytz' or 'zoneinfo'."""
+    global _default_backend
+    _default_backend = _check_backend(name)
+
+
+@contextmanager
+def tz_backend(name: str) -> Iterator[str]:
+    """Use a backend within a with block. It applies to the current thread, or
+    asyncio task, only."""
+    token = _backend_override.set(_check_backend(name))
+    try:
+        yield name
+    finally:
+        _backend_override.reset(token)
+
+
+class TransitionTable(NamedTuple):
+    """When a zone's UTC offset changes. Entry i applies from utc[i], in
+    microseconds since the epoch, until utc[i + 1]."""
+    utc: List[int]
+    offsets: List[int]  # UTC offset, in microseconds.
+    dsts: List[int]  # DST adjustment included in the offset, in microseconds.
+    tzinfos: List[datetime.tzinfo]
+
+
+def get(tz: TzLike, backend: str=None) -> datetime.tzinfo:
+    """Return the tzinfo for a zone name, such as 'US/Eastern', from backend,
+    or the backend in effect. tzinfo objects are returned unchanged."""
+    key = (backend or _backend_override.get() or _default_backend, tz)
+    try:
+        return _zones[key]
+    except KeyError:
+        pass
+
+    if isinstance(tz, datetime.tzinfo):
+        return tz
+    if key[0] == 'pytz':
+        tzinfo = pytz.timezone(tz)
+    elif key[0] == 'zoneinfo':
+        tzinfo = _import_zoneinfo().ZoneInfo(tz)
+    else:
+        raise ValueError("Timezone backend must be one of {0}, not {1!r}.".format(BACKENDS, key[0]))
+    _zones[key] = tzinfo
+    return tzinfo
+
+
+def zone(tzinfo: datetime.tzinfo) -> datetime.tzinfo:
+    """Return the zone a tzinfo belongs to. pytz attaches a separate tzinfo for
+    each of a zone's offsets to aware datetimes; this finds the zone itself."""
+    name = getattr(tzinfo, 'zone', None)
+    return tzinfo if name is None else get(name, 'pytz')
+
+
+def _pytz_zone(tzinfo: datetime.tzinfo) -> datetime.tzinfo:
+    """The pytz zone matching a zoneinfo one, whose transition table it has."""
+    key = getattr(tzinfo, 'key', None)
+    return tzinfo if key is None else get(key, 'pytz')
+
+
+def transitions(tz: TzLike) -> Union[TransitionTable, None]:
+    """Return the transition table of a zone whose offset changes, or None for
+    fixed-offset zones."""
+    tzinfo = _pytz_zone(zone(get(tz)))
+    try:
+        return _transitions[tzinfo]
+    except KeyError:
+        pass
+
+    utc_times = getattr(tzinfo, '_utc_transition_times', None)
+    if not utc_times:
+        table = None
+    else:
+        infos = tzinfo._transition_info
+        table = TransitionTable([(time - _EPOCH_NAIVE) // _MICROSECOND for time in utc_times],
+                                [info[0] // _MICROSECOND for info in infos],
+                                [info[1] // _MICROSECOND for info in infos],
+                                [tzinfo._tzinfos[info] for info in infos])
+    _transitions[tzinfo] = table
+    return table
+
+
+class WallClock:
+    """Attaches a zone with DST to naive wall-clock times, using its transition
+    table. Times skipped when clocks go forward are handled by the nonexistent
+    policy: 'shift_forward' to the first time after the gap, 'shift_backward'
+    to the last time before it, or 'raise'. Times repeated when clocks go back
+    are handled by the ambiguous policy: 'earliest', 'latest' or 'raise'.
+
+    The transition table is pytz's. Results carry the zone's tzinfo from the
+    backend it came from: for pytz, the one for their offset; for zoneinfo,
+    the zone, with fold set for the later of repeated times."""
+
+    def __init__(self, tz: TzLike, nonexistent: str='shift_forward', ambiguous: str='earliest'):
+        if nonexistent not in ('shift_forward', 'shift_backward', 'raise'):
+            raise ValueError("nonexistent must be 'shift_forward', 'shift_backward' or 'raise'.")
+        if ambiguous not in ('earliest', 'latest', 'raise'):
+            raise ValueError("ambiguous must be 'earliest', 'latest' or 'raise'.")
+
+        self.tz = zone(get(tz))
+        self.table = transitions(self.tz)
+        self.is_pytz = hasattr(self.tz, 'localize')
+        if self.table is None:
+            raise ValueError("{0!r} has no DST transitions.".format(self.tz))
+        self.nonexistent = nonexistent
+        self.ambiguous = ambiguous
+        # The last range of local times, in microseconds since the epoch, that
+        # mapped to a single table entry, as (start, end, entry index).
+        # Consecutive times usually fall in it.
+        self.span = (0, 0, 0)
+
+    def wall_time(self, dt: datetime.datetime) -> datetime.datetime:
+        """The naive wall-clock time of an aware datetime, in this zone."""
+        return dt.astimezone(self.tz).replace(tzinfo=None)
+
+    def resolve(self, local_us: int) -> Tuple[int, int]:
+        """Find the table entry for a wall-clock time, in microseconds since
+        the epoch. Return the entry's index, and the UTC instant it maps the
+        time to, in microseconds since the epoch."""
+        start, end, j = self.span
+        if start <= local_us < end:
+            return j, local_us - self.table.offsets[j]
+
+        utc, offsets = self.table.utc, self.table.offsets
+        n = len(utc)
+        # Offsets are under a day, and transitions further apart than that, so
+        # only the entries next to local_us's position can apply.
+        i = bisect_right(utc, local_us) - 1
+        nearby = range(max(i - 1, 0), min(i + 2, n))
+        found = [j for j in nearby
+                 if utc[j] <= local_us - offsets[j] and (j + 1 == n or local_us - offsets[j] < utc[j + 1])]
+
+        if len(found) == 1:
+            j = found[0]
+            # Local times with no other entry's span overlapping this one's.
+            start = utc[j] + max(offsets[j], offsets[j - 1] if j else offsets[j])
+            end = utc[j + 1] + min(offsets[j], offsets[j + 1]) if j + 1 < n else float('inf')
+            self.span = (start, end, j)
+            return j, local_us - offsets[j]
+
+        if found:
+            if self.ambiguous == 'raise':
+                raise pytz.AmbiguousTimeError(_EPOCH_NAIVE + datetime.timedelta(microseconds=local_us))
+            j = found[0] if self.ambiguous == 'earliest' else found[-1]
+            return j, local_us - offsets[j]
+
+        if self.nonexistent == 'raise':
+            raise pytz.NonExistentTimeError(_EPOCH_NAIVE + datetime.timedelta(microseconds=local_us))
+        # Clocks went forward at entry k, skipping local_us.
+        k = next(k for k in nearby if k and utc[k] + offsets[k - 1] <= local_us < utc[k] + offsets[k])
+        if self.nonexistent == 'shift_forward':
+            return k, utc[k]
+        return k - 1, utc[k] - 1
+
+    def tzinfo(self, j: int) -> datetime.tzinfo:
+        """The tzinfo for local times in table entry j, other than the later
+        of repeated times."""
+        return self.table.tzinfos[j] if self.is_pytz else self.tz
+
+    def localize(self, naive: datetime.datetime, local_us: int=None) -> datetime.datetime:
+        """Attach the zone to a naive datetime. local_us, its microseconds
+        since the epoch, can be passed if already known."""
+        if local_us is None:
+            local_us = (naive - _EPOCH_NAIVE) // _MICROSECOND
+        j, utc_us = self.resolve(local_us)
+        utc, offsets = self.table.utc, self.table.offsets
+        shifted = utc_us + offsets[j]
+        if shifted != local_us:
+            naive = _EPOCH_NAIVE + datetime.timedelta(microseconds=shifted)
+        if self.is_pytz:
+            return naive.replace(tzinfo=self.table.tzinfos[j])
+        # The later of repeated times also falls in the previous entry.
+        fold = 1 if j and shifted - offsets[j - 1] < utc[j] else 0
+        return naive.replace(tzinfo=self.tz, fold=fold)
+
+
+def offset(minutes: int) -> datetime.timezone:
+    """Return the fixed-offset tzinfo for a number of minutes east of UTC."""
+    try:
+        return _offsets[minutes]
+    except KeyError:
+        tzinfo = _offsets[minutes] = datetime.timezone(datetime.timedelta(minutes=minutes))
+        return tzinfo
+
+
+def warm(tzs: Iterable[TzLike], backend: str=None) -> None:
+    """Resolve zone names ahead of their first use."""
+    for tz in tzs:
+        get(tz, backend)
+
+
+def localizer(tz: TzLike) -> Callable[[datetime.datetime], datetime.datetime]:
+    """Return a function that attaches tz to naive datetimes or times. pytz
+    zones need localize, to pick the right UTC offset; others can use replace.
+    Either way, repeated and skipped wall-clock times get the standard time
+    offset, as with pytz's localize."""
+    tzinfo = get(tz)
+    try:
+        return tzinfo.localize
+    except AttributeError:
+        pass
+
+    def localize(dt):
+        aware = dt.replace(tzinfo=tzinfo)
+        # Only a time in DST can be the earlier of a repeated pair.
+        if aware.dst():
+            later = aware.replace(fold=1)
+            if not later.dst() and later.utcoffset() != aware.utcoffset():
+                return later
+        return aware
+    return localize
+
+
+def localize(dt: datetime.datetime, tz: TzLike) -> datetime.datetime:
+    """Attach tz to a naive datetime or time."""
+    return localizer(tz)(dt)
+
+
+def pin_offset(dt: datetime.datetime) -> Tuple[datetime.datetime, Union[datetime.tzinfo, None]]:
+    """Adding a timedelta to a datetime with a pytz tzinfo moves it by elapsed
+    time, since each of pytz's tzinfos has one offset. Zones like zoneinfo's
+    move it by wall-clock time instead. For the latter, return dt with its
+    current offset fixed, for arithmetic that matches pytz, and its zone, to
+    convert results back to. Other datetimes are returned as is, with None."""
+    tzinfo = getattr(dt, 'tzinfo', None)
+    if tzinfo is None or isinstance(tzinfo, datetime.timezone) or hasattr(tzinfo, 'localize') \
+            or not isinstance(dt, datetime.datetime):
+        return dt, None
+    utcoffset = dt.utcoffset()
+    try:
+        fixed = _offsets[utcoffset]
+    except KeyError:
+        fixed = _offsets[utcoffset] = datetime.timezone(utcoffset)
+    return dt.replace(tzinfo=fixed), tzinfo
+
+
+def clear() -> None:
+    """Empty the registry."""
+    _zones.clear()
+    _offsets.clear()
+    _transitions.clear()
+    _parsed.clear()
@@ -0,0 +1,115 @@
+"""How strictly saturn checks that the datetimes passed to it are
+timezone-aware. The policy is 'strict', to check every call; 'sampled', to
+check one call in every N; or 'off'. It's set globally with set_validation,
+or for a block of code with validation_policy.
+
+Under the default, strict checking with no block active and counting off,
+checked functions take the same fast path as before policies existed; with
+the policy set to 'off' globally, they skip the check with one test."""
+
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator
+
+POLICIES = ('strict', 'sampled', 'off')
+
+
+class Policy:
+    """A validation policy, and its count of calls for sampling."""
+    __slots__ = ('name', 'every', 'strict', 'off', '_calls')
+
+    def __init__(self, name: str='strict', every: int=100):
+        if name not in POLICIES:
+            raise ValueError("Validation policy must be one of {0}, not {1!r}.".format(POLICIES, name))
+        if every < 1:
+            raise ValueError("every must be at least 1.")
+        self.name = name
+        self.every = every
+        self.strict = name == 'strict'
+        self.off = name == 'off'
+        self._calls = itertools.count()
+
+    def __repr__(self):
+        if self.name == 'sampled':
+            return 'Policy({0!r}, every={1})'.format(self.name, self.every)
+        return 'Policy({0!r})'.format(self.name)
+
+    def should_check(self) -> bool:
+        name = self.name
+        if name == 'strict':
+            return True
+        if name == 'off':
+            return False
+        return not next(self._calls) % self.every
+
+
+class _Stats:
+    __slots__ = ('checks', 'failures', 'skipped')
+
+    def __init__(self):
+        self.checks = self.failures = self.skipped = 0
+
+
+stats = _Stats()
+default = Policy()
+# Set inside validation_policy blocks; takes precedence over default.
+override = ContextVar('saturn_validation_policy', default=None)
+# Whether checks are counted for validation_stats; see set_validation.
+counting = False
+# validation_policy blocks open in any thread or task.
+_blocks = 0
+# When no block is open anywhere and counting is off, checked functions need
+# no policy lookup: fast is set if the default policy is strict, and skip if
+# it's 'off'.
+fast = True
+skip = False
+
+
+def _update_fast() -> None:
+    global fast, skip
+    simple = not counting and not _blocks
+    fast = simple and default.strict
+    skip = simple and default.off
+
+
+def current() -> Policy:
+    """The policy in effect here."""
+    return override.get() or default
+
+
+def set_validation(policy: str, every: int=100, count: bool=False) -> None:
+    """Set the policy used outside validation_policy blocks. With 'sampled',
+    one call in every `every` is checked. With count, checks are counted for
+    validation_stats, at some cost per call."""
+    global default, counting
+    default = Policy(policy, every)
+    counting = count
+    _update_fast()
+
+
+@contextmanager
+def validation_policy(policy: str, every: int=100) -> Iterator[Policy]:
+    """Use a policy within a with block. It applies to the current thread, or
+    asyncio task, only."""
+    global _blocks
+    token = override.set(Policy(policy, every))
+    _blocks += 1
+    _update_fast()
+    try:
+        yield override.get()
+    finally:
+        override.reset(token)
+        _blocks -= 1
+        _update_fast()
+
+
+def validation_stats() -> Dict[str, int]:
+    """How many awareness checks ran, how many of those found a naive datetime,
+    and how many calls skipped checking, since the last reset, while counting
+    was on; see set_validation."""
+    return {'checks': stats.checks, 'failures': stats.failures, 'skipped': stats.skipped}
+
+
+def reset_validation_stats() -> None:
+    stats.checks = stats.failures = stats.skipped = 0
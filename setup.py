@@ -6,9 +6,10 @@ with open('README.rst') as f:
 setup(
     name="saturn",
     version="0.3.5",
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
 
     install_requires=['pytz>=2016.3'],
+    extras_require={'numpy': ['numpy']},
 
     author="David O'Connor",
     author_email="david.alan.oconnor@gmail.com",